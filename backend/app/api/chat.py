@@ -1,22 +1,114 @@
 """
 Chat and RAG endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+import logging
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from ..core.database import get_db
+from ..core.executors import ExecutorSaturatedError
+from ..services.llm_errors import LLMError
 from ..services.document_service import DocumentService
 from ..services.rag_pipeline import RAGPipeline
-from ..api.schemas import ChatRequest, ChatResponse
+from ..services.chat_sessions import ChatSessionService
+from ..utils.sse import format_sse, SSE_HEADERS
+from ..api.schemas import ChatRequest, ChatResponse, ChatSessionCreate, ChatSessionResponse
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/chat", tags=["chat"])
 document_service = DocumentService()
 rag_pipeline = RAGPipeline()
+chat_sessions = ChatSessionService(rag_pipeline.llm_service)
+
+
+def _session_context(request: ChatRequest, document, user_id: int, db: Session):
+    """
+    Resolve the conversation state for a chat request
+    
+    Returns:
+        (chat session or None, conversation summary, chat history)
+    """
+    if not request.session_id:
+        return None, None, request.chat_history
+    
+    session = chat_sessions.get(db, request.session_id, user_id)
+    if not session or session.document_id != document.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat session not found"
+        )
+    
+    summary, history = chat_sessions.prompt_context(session)
+    return session, summary, history
+
+
+@router.post("/sessions", response_model=ChatSessionResponse)
+async def create_chat_session(
+    request: ChatSessionCreate,
+    user_id: int = 1,  # TODO: Get from auth token
+    db: Session = Depends(get_db)
+):
+    """
+    Start a server-side conversation about a document
+    
+    Pass the returned session_id to /chat/ or /chat/stream instead of
+    chat_history. Older turns are folded into a rolling summary, so prompt
+    size stays flat as the conversation grows.
+    """
+    document = document_service.get_document(request.document_id, user_id, db)
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    session = chat_sessions.create(db, user_id, document.id)
+    return chat_sessions.to_dict(session)
+
+
+@router.get("/sessions/{session_id}", response_model=ChatSessionResponse)
+async def get_chat_session(
+    session_id: str,
+    user_id: int = 1,  # TODO: Get from auth token
+    db: Session = Depends(get_db)
+):
+    """Get the rolling summary and verbatim turns of a chat session"""
+    session = chat_sessions.get(db, session_id, user_id)
+    
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat session not found"
+        )
+    
+    return chat_sessions.to_dict(session)
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_chat_session(
+    session_id: str,
+    user_id: int = 1,  # TODO: Get from auth token
+    db: Session = Depends(get_db)
+):
+    """Delete a chat session"""
+    deleted = chat_sessions.delete(db, session_id, user_id)
+    
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat session not found"
+        )
+    
+    return {"message": "Chat session deleted successfully"}
 
 
 @router.post("/", response_model=ChatResponse)
 async def chat_with_document(
     request: ChatRequest,
+    background_tasks: BackgroundTasks,
     user_id: int = 1,  # TODO: Get from auth token
     db: Session = Depends(get_db)
 ):
@@ -26,6 +118,7 @@ async def chat_with_document(
     - Retrieves relevant context from the document
     - Generates contextual answer using LLM
     - Returns answer with source references
+    - With session_id, uses the session's rolling summary instead of chat_history
     """
     # Verify document belongs to user
     document = document_service.get_document(request.document_id, user_id, db)
@@ -36,14 +129,18 @@ async def chat_with_document(
             detail="Document not found"
         )
     
+    session, conversation_summary, chat_history = _session_context(request, document, user_id, db)
+    
     try:
         # Query using RAG pipeline with conversation history
-        response = rag_pipeline.query(
+        response = await rag_pipeline.query(
             collection_name=document.collection_name,
             question=request.question,
             n_results=5,
             include_sources=request.include_sources,
-            chat_history=request.chat_history
+            chat_history=chat_history,
+            conversation_summary=conversation_summary,
+            session_id=session.id if session else None
         )
         
         if "error" in response:
@@ -52,8 +149,20 @@ async def chat_with_document(
                 detail=response["error"]
             )
         
+        if session:
+            await chat_sessions.record_turn(db, session, request.question, response["answer"])
+            background_tasks.add_task(chat_sessions.fold, session.id)
+            response["session_id"] = session.id
+        
         return response
         
+    except (HTTPException, LLMError):
+        raise
+    except ExecutorSaturatedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
@@ -62,3 +171,85 @@ async def chat_with_document(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to process question: {str(e)}"
         )
+
+
+@router.post("/stream")
+async def stream_chat_with_document(
+    request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    user_id: int = 1,  # TODO: Get from auth token
+    db: Session = Depends(get_db)
+):
+    """
+    Ask questions about a document, streaming the answer as server-sent events
+    
+    - `sources` event first, as soon as retrieval finishes, with estimated token usage
+    - `token` events with answer text as the LLM produces it
+    - `done` when the answer is complete, or `error` if generation fails
+    - Disconnecting cancels the upstream LLM request
+    - With session_id, the turn is recorded once `done` has been sent
+    """
+    document = document_service.get_document(request.document_id, user_id, db)
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    session, conversation_summary, chat_history = _session_context(request, document, user_id, db)
+    
+    events = rag_pipeline.stream_query(
+        collection_name=document.collection_name,
+        question=request.question,
+        n_results=5,
+        include_sources=request.include_sources,
+        chat_history=chat_history,
+        conversation_summary=conversation_summary,
+        session_id=session.id if session else None
+    )
+    
+    # Run retrieval before the response starts so its errors keep their status codes
+    try:
+        first_event = await events.__anext__()
+    except ExecutorSaturatedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except LLMError:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to process question: {str(e)}"
+        )
+    
+    async def event_stream():
+        # Starlette cancels this generator when the client disconnects,
+        # which closes events and with it the upstream request
+        answer_parts = []
+        try:
+            yield format_sse(*first_event)
+            async for event, data in events:
+                if event == "token":
+                    answer_parts.append(data["text"])
+                elif event == "done" and session:
+                    await chat_sessions.record_turn(db, session, request.question, "".join(answer_parts))
+                    data = {**data, "session_id": session.id}
+                yield format_sse(event, data)
+        except Exception as e:
+            logger.error(f"Chat stream failed: {e}")
+            yield format_sse("error", {"detail": str(e)})
+        finally:
+            await events.aclose()
+    
+    # Runs after the stream ends; a no-op if no turn was recorded
+    if session:
+        background_tasks.add_task(chat_sessions.fold, session.id)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
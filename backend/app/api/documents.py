@@ -1,30 +1,43 @@
 """
 Document upload and management endpoints
 """
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, BackgroundTasks, status
 from sqlalchemy.orm import Session
 from typing import List
+import os
+from ..core.config import settings
 from ..core.database import get_db
-from ..services.document_service import DocumentService
-from ..api.schemas import DocumentResponse, ErrorResponse
+from ..core.executors import pdf_executor, embedding_executor, ExecutorSaturatedError
+from ..services.document_service import DocumentService, FileTooLargeError
+from ..services.ingestion_queue import IngestionQueue
+from ..services.summary_tree import SummaryTreeBuilder
+from ..api.schemas import (
+    DocumentResponse, DocumentReplaceResponse, IngestionJobResponse,
+    BulkUploadResponse, DocumentTopicResponse, ErrorResponse
+)
 
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 document_service = DocumentService()
+summary_tree_builder = SummaryTreeBuilder(document_service.vector_store)
+ingestion_queue = IngestionQueue(
+    document_service,
+    summary_builder=summary_tree_builder if settings.SUMMARY_TREE_ENABLED else None
+)
 
 
-@router.post("/upload", response_model=DocumentResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/upload", response_model=IngestionJobResponse, status_code=status.HTTP_202_ACCEPTED)
 async def upload_document(
     file: UploadFile = File(...),
     user_id: int = 1,  # TODO: Get from auth token
     db: Session = Depends(get_db)
 ):
     """
-    Upload and process a PDF document
+    Upload a PDF document for background processing
     
     - Accepts PDF files
-    - Extracts text and creates embeddings
-    - Stores in vector database
+    - Stores the file and queues an ingestion job
+    - Poll /documents/jobs/{job_id} for progress
     """
     # Validate file type
     if not file.filename.endswith('.pdf'):
@@ -33,20 +46,153 @@ async def upload_document(
             detail="Only PDF files are supported"
         )
     
+    stored = None
+    job = None
     try:
-        document = await document_service.upload_and_process(
-            file=file,
+        stored = await document_service.save_upload(file)
+        job = ingestion_queue.create_job(
+            db=db,
             user_id=user_id,
-            db=db
+            original_filename=file.filename,
+            file_path=stored["file_path"],
+            file_size=stored["file_size"],
+            content_hash=stored["content_hash"]
+        )
+        await ingestion_queue.enqueue(job.id)
+        return job
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
         )
-        return document
     except Exception as e:
+        # No worker will ever process the stored file
+        if job is not None:
+            ingestion_queue.fail_job(job.id, f"Failed to queue document: {str(e)}")
+        if stored and os.path.exists(stored["file_path"]):
+            os.remove(stored["file_path"])
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to process document: {str(e)}"
+            detail=f"Failed to queue document: {str(e)}"
         )
 
 
+@router.post("/bulk-upload", response_model=BulkUploadResponse)
+async def bulk_upload_documents(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    user_id: int = 1,  # TODO: Get from auth token
+    db: Session = Depends(get_db)
+):
+    """
+    Upload and process many PDFs at once
+    
+    - Accepts multiple PDF files and/or zip archives of PDFs
+    - Ingests files concurrently with shared embedding batches
+    - Returns per-file results and timings
+    - Summary trees, if enabled, are built in the background afterwards
+    """
+    if len(files) > settings.BULK_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BULK_MAX_FILES} files per request"
+        )
+    
+    saved = []
+    rejected = []
+    
+    for file in files:
+        filename = file.filename or ""
+        try:
+            if filename.lower().endswith('.zip'):
+                archive = await document_service.save_upload(file, max_size=settings.MAX_ARCHIVE_SIZE)
+                try:
+                    members = await pdf_executor.run(
+                        document_service.extract_archive, archive["file_path"]
+                    )
+                finally:
+                    os.remove(archive["file_path"])
+                
+                for member in members:
+                    (rejected if "error" in member else saved).append(member)
+            elif filename.lower().endswith('.pdf'):
+                stored = await document_service.save_upload(file)
+                stored["original_filename"] = filename
+                saved.append(stored)
+            else:
+                rejected.append({
+                    "original_filename": filename,
+                    "error": "Only PDF and ZIP files are supported"
+                })
+        except Exception as e:
+            rejected.append({"original_filename": filename, "error": str(e)})
+    
+    if len(saved) > settings.BULK_MAX_FILES:
+        for item in saved:
+            os.remove(item["file_path"])
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BULK_MAX_FILES} PDFs per request"
+        )
+    
+    summary = None
+    try:
+        summary = await document_service.process_bulk(saved, user_id, db)
+    except ExecutorSaturatedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to process documents: {str(e)}"
+        )
+    finally:
+        # Files that did not become documents have nothing pointing at them
+        completed = {
+            saved[i]["file_path"]
+            for i, result in enumerate(summary["results"] if summary else [])
+            if result["status"] == "completed"
+        }
+        for item in saved:
+            if item["file_path"] not in completed and os.path.exists(item["file_path"]):
+                os.remove(item["file_path"])
+    
+    if settings.SUMMARY_TREE_ENABLED:
+        for result in summary["results"]:
+            if result["status"] == "completed":
+                background_tasks.add_task(summary_tree_builder.build_in_background, result["document_id"])
+    
+    summary["results"].extend(
+        {"filename": item["original_filename"], "status": "rejected", "error": item["error"]}
+        for item in rejected
+    )
+    summary["total_files"] += len(rejected)
+    
+    return summary
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job(
+    job_id: str,
+    user_id: int = 1,  # TODO: Get from auth token
+    db: Session = Depends(get_db)
+):
+    """
+    Get stage and progress of an ingestion job
+    """
+    job = ingestion_queue.get_job(job_id, user_id, db)
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ingestion job not found"
+        )
+    
+    return job
+
+
 @router.get("/", response_model=List[DocumentResponse])
 async def get_documents(
     user_id: int = 1,  # TODO: Get from auth token
@@ -79,6 +225,106 @@ async def get_document(
     return document
 
 
+@router.get("/{document_id}/topics", response_model=List[DocumentTopicResponse])
+async def get_document_topics(
+    document_id: int,
+    user_id: int = 1,  # TODO: Get from auth token
+    db: Session = Depends(get_db)
+):
+    """
+    Get the topic map of a document
+    
+    - Topics are k-means clusters of the chunk embeddings, in reading order
+    - Each topic lists its size, page span and most representative chunk
+    - Pass a topic_id to /quiz to draw questions from one topic
+    """
+    document = document_service.get_document(document_id, user_id, db)
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    try:
+        return await embedding_executor.run(
+            document_service.vector_store.get_topics, document.collection_name
+        )
+    except ExecutorSaturatedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.post("/{document_id}/replace", response_model=DocumentReplaceResponse)
+async def replace_document(
+    document_id: int,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    user_id: int = 1,  # TODO: Get from auth token
+    db: Session = Depends(get_db)
+):
+    """
+    Replace a document with a revised PDF
+    
+    - Only pages whose content changed are re-chunked and re-embedded
+    - Vectors of removed pages are deleted
+    - The document keeps its ID and collection
+    - The summary tree, if enabled, is rebuilt in the background
+    """
+    if not file.filename.endswith('.pdf'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only PDF files are supported"
+        )
+    
+    document = document_service.get_document(document_id, user_id, db)
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    try:
+        stored = await document_service.save_upload(file)
+        result = await pdf_executor.run(
+            document_service.replace_document,
+            document=document,
+            file_path=stored["file_path"],
+            original_filename=file.filename,
+            db=db,
+            file_size=stored["file_size"],
+            content_hash=stored["content_hash"]
+        )
+        
+        if settings.SUMMARY_TREE_ENABLED:
+            background_tasks.add_task(summary_tree_builder.build_in_background, document_id)
+        
+        return result
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except ExecutorSaturatedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to replace document: {str(e)}"
+        )
+
+
 @router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_document(
     document_id: int,
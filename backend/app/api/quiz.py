@@ -1,17 +1,26 @@
 """
 Quiz generation endpoints
 """
+import logging
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict
 from pydantic import BaseModel
 from ..core.database import get_db
+from ..core.executors import ExecutorSaturatedError
+from ..services.llm_errors import LLMError
 from ..services.document_service import DocumentService
 from ..services.rag_pipeline import RAGPipeline
+from ..services.vector_store import TopicNotFoundError
 from ..services.llm_service import LLMService
+from ..utils.llm_json import extract_json_object
+from ..utils.sse import format_sse, SSE_HEADERS
 from ..api.schemas import QuizRequest, QuizResponse
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/quiz", tags=["quiz"])
 document_service = DocumentService()
 rag_pipeline = RAGPipeline()
@@ -43,7 +52,8 @@ async def generate_quiz(
     
     - Creates multiple choice, fill-in-the-blank, and short answer questions
     - Adjustable difficulty level
-    - Can focus on specific topics
+    - Can focus on specific topics, or on a topic_id from /documents/{id}/topics
+    - Results are cached per document; set regenerate to create a fresh one
     """
     # Verify document belongs to user
     document = document_service.get_document(request.document_id, user_id, db)
@@ -56,12 +66,15 @@ async def generate_quiz(
     
     try:
         # Generate quiz using RAG pipeline
-        response = rag_pipeline.generate_quiz(
+        response = await rag_pipeline.generate_quiz(
             collection_name=document.collection_name,
             num_questions=request.num_questions,
             difficulty=request.difficulty,
             topic=request.topic,
-            question_types=request.question_types
+            question_types=request.question_types,
+            db=db,
+            regenerate=request.regenerate,
+            topic_id=request.topic_id
         )
         
         if "error" in response:
@@ -72,6 +85,18 @@ async def generate_quiz(
         
         return response
         
+    except (HTTPException, LLMError):
+        raise
+    except TopicNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except ExecutorSaturatedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -79,6 +104,75 @@ async def generate_quiz(
         )
 
 
+@router.post("/stream")
+async def stream_quiz(
+    request: QuizRequest,
+    user_id: int = 1,  # TODO: Get from auth token
+    db: Session = Depends(get_db)
+):
+    """
+    Generate quiz questions, streaming each one as server-sent events
+    
+    - `start` once the source content has been retrieved
+    - `question` event with {index, question} as soon as each question is complete
+    - `done` with count, truncated flag and metadata; questions already sent
+      are kept even if the end of the response is malformed
+    - `error` if generation fails midway
+    """
+    document = document_service.get_document(request.document_id, user_id, db)
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    events = rag_pipeline.stream_quiz(
+        collection_name=document.collection_name,
+        num_questions=request.num_questions,
+        difficulty=request.difficulty,
+        topic=request.topic,
+        question_types=request.question_types,
+        db=db,
+        regenerate=request.regenerate,
+        topic_id=request.topic_id
+    )
+    
+    # Run retrieval before the response starts so its errors keep their status codes
+    try:
+        first_event = await events.__anext__()
+    except TopicNotFoundError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except ExecutorSaturatedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except LLMError:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate quiz: {str(e)}"
+        )
+    
+    async def event_stream():
+        try:
+            yield format_sse(*first_event)
+            async for event, data in events:
+                yield format_sse(event, data)
+        except Exception as e:
+            logger.error(f"Quiz stream failed: {e}")
+            yield format_sse("error", {"detail": str(e)})
+        finally:
+            await events.aclose()
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @router.post("/grade", response_model=GradeAnswerResponse)
 async def grade_short_answer(request: GradeAnswerRequest):
     """
@@ -108,26 +202,11 @@ Provide your evaluation in JSON format:
 
 Be fair but strict. Award full points if all key concepts are covered even if wording differs."""
 
-        response = llm_service.generate(prompt, max_tokens=500, temperature=0.3)
-        
-        # Parse JSON response
-        import json
-        import re
-        
-        # Remove markdown code blocks if present
-        cleaned_response = response.strip()
-        if cleaned_response.startswith('```'):
-            match = re.search(r'```(?:json)?\s*\n?(.*?)\n?```', cleaned_response, re.DOTALL)
-            if match:
-                cleaned_response = match.group(1).strip()
+        response = await llm_service.agenerate(prompt, max_tokens=500, temperature=0.3, task="grading")
         
-        # Extract JSON
-        json_start = cleaned_response.find('{')
-        json_end = cleaned_response.rfind('}') + 1
-        if json_start != -1 and json_end > json_start:
-            result = json.loads(cleaned_response[json_start:json_end])
-            return result
-        else:
+        try:
+            return extract_json_object(response)
+        except ValueError:
             return {
                 "score": 50,
                 "feedback": "Could not grade automatically. Please review manually.",
@@ -135,6 +214,13 @@ Be fair but strict. Award full points if all key concepts are covered even if wo
                 "points_missed": request.key_points
             }
             
+    except LLMError:
+        raise
+    except ExecutorSaturatedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -29,8 +29,11 @@ class DocumentResponse(BaseModel):
     filename: str
     original_filename: str
     file_size: int
+    content_hash: Optional[str] = None
     total_pages: int
     total_chunks: int
+    boilerplate_lines_removed: Optional[int] = 0
+    duplicate_chunks_removed: Optional[int] = 0
     collection_name: str
     text_preview: str
     created_at: datetime
@@ -40,12 +43,55 @@ class DocumentResponse(BaseModel):
         from_attributes = True
 
 
+class DocumentReplaceResponse(BaseModel):
+    document: DocumentResponse
+    pages_reused: int
+    pages_reembedded: int
+    pages_removed: int
+    chunks_added: int
+    chunks_removed: int
+
+
+class IngestionJobResponse(BaseModel):
+    id: str
+    status: str
+    stage: str
+    progress: float
+    original_filename: str
+    document_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class BulkUploadItem(BaseModel):
+    filename: str
+    status: str  # completed, failed, rejected
+    document_id: Optional[int] = None
+    total_chunks: Optional[int] = None
+    error: Optional[str] = None
+    timings: Dict[str, float] = {}
+
+
+class BulkUploadResponse(BaseModel):
+    results: List[BulkUploadItem]
+    total_files: int
+    succeeded: int
+    embedding_batches: int
+    embedding_seconds: float
+    total_seconds: float
+
+
 # Chat/RAG schemas
 class ChatRequest(BaseModel):
     document_id: int
     question: str
     include_sources: bool = True
     chat_history: Optional[List[Dict[str, str]]] = []
+    session_id: Optional[str] = None  # Server-side session; replaces chat_history when set
 
 
 class ChatResponse(BaseModel):
@@ -53,6 +99,25 @@ class ChatResponse(BaseModel):
     question: str
     sources_count: int
     sources: Optional[List[Dict]] = None
+    cached: bool = False  # Answer reused from a similar earlier question
+    usage: Optional[Dict[str, int]] = None  # Estimated prompt tokens and context packing stats
+    session_id: Optional[str] = None
+    retrieval: Optional[str] = None  # full, or reused / reranked from the session's last retrieval
+
+
+class ChatSessionCreate(BaseModel):
+    document_id: int
+
+
+class ChatSessionResponse(BaseModel):
+    session_id: str
+    document_id: int
+    summary: str  # Rolling summary of turns no longer kept verbatim
+    recent_turns: List[Dict[str, str]]
+    turn_count: int
+    summarized_turns: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
 
 
 # Summary schemas
@@ -60,6 +125,8 @@ class SummaryRequest(BaseModel):
     document_id: int
     summary_type: str = Field(default="concise", pattern="^(concise|detailed|bullet_points)$")
     page_number: Optional[int] = None
+    regenerate: bool = False  # Bypass the generation cache and summary tree
+    mode: str = Field(default="retrieval", pattern="^(retrieval|map_reduce)$")  # map_reduce reads every chunk
 
 
 class SummaryResponse(BaseModel):
@@ -67,6 +134,30 @@ class SummaryResponse(BaseModel):
     summary_type: str
     page_number: Optional[int]
     chunks_used: int
+    cached: bool = False
+    source: str = "retrieval"  # Or "summary_tree" when precomputed at ingestion, or "map_reduce"
+    llm_calls: Optional[int] = None  # Upstream calls made by map_reduce
+
+
+class SummaryTreeNodeResponse(BaseModel):
+    level: int
+    position: int
+    page_start: int
+    page_end: int
+    is_root: bool
+    summary_type: str
+    summary: str
+    
+    class Config:
+        from_attributes = True
+
+
+class DocumentTopicResponse(BaseModel):
+    topic_id: int
+    size: int
+    page_start: int
+    page_end: int
+    representative: Dict  # text and metadata of the chunk closest to the topic centroid
 
 
 # Quiz schemas
@@ -75,12 +166,16 @@ class QuizRequest(BaseModel):
     num_questions: int = Field(default=5, ge=1, le=20)
     difficulty: str = Field(default="medium", pattern="^(easy|medium|hard)$")
     topic: Optional[str] = None
+    topic_id: Optional[int] = None  # Topic map entry to draw questions from (see /documents/{id}/topics)
     question_types: Optional[List[str]] = Field(default=None, description="Types: mcq, fill_blank, short_answer, or mix for all")
+    regenerate: bool = False  # Bypass the generation cache
 
 
 class QuizResponse(BaseModel):
     questions: List[Dict]
     metadata: Optional[Dict] = None
+    truncated: bool = False  # Response was cut off; only complete questions returned
+    cached: bool = False
 
 
 # Study Plan schemas
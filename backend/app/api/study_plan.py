@@ -7,6 +7,8 @@ from typing import List
 from datetime import datetime
 import json
 from ..core.database import get_db
+from ..core.executors import ExecutorSaturatedError
+from ..services.llm_errors import LLMError
 from ..models.study_plan import StudyPlan
 from ..services.llm_service import LLMService
 from ..api.schemas import StudyPlanRequest, StudyPlanResponse
@@ -40,7 +42,7 @@ async def create_study_plan(
     
     try:
         # Generate study plan using LLM
-        plan_data = llm_service.generate_study_plan(
+        plan_data = await llm_service.agenerate_study_plan(
             syllabus=request.syllabus,
             total_days=total_days,
             difficulty=request.difficulty_level,
@@ -72,8 +74,13 @@ async def create_study_plan(
         
         return study_plan
         
-    except HTTPException:
+    except (HTTPException, LLMError):
         raise
+    except ExecutorSaturatedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         db.rollback()
         raise HTTPException(
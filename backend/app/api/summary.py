@@ -1,17 +1,27 @@
 """
 Summary generation endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+import logging
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from typing import List
 from ..core.database import get_db
+from ..core.executors import ExecutorSaturatedError
+from ..services.llm_errors import LLMError
 from ..services.document_service import DocumentService
 from ..services.rag_pipeline import RAGPipeline
-from ..api.schemas import SummaryRequest, SummaryResponse
+from ..services.summary_tree import SummaryTreeBuilder
+from ..utils.sse import format_sse, SSE_HEADERS
+from ..api.schemas import SummaryRequest, SummaryResponse, SummaryTreeNodeResponse
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/summary", tags=["summary"])
 document_service = DocumentService()
 rag_pipeline = RAGPipeline()
+summary_tree_builder = SummaryTreeBuilder(rag_pipeline.vector_store, rag_pipeline.llm_service)
 
 
 @router.post("/", response_model=SummaryResponse)
@@ -25,6 +35,10 @@ async def generate_summary(
     
     - Supports different summary types: concise, detailed, bullet_points
     - Can summarize entire document or specific page
+    - Results are cached per document; set regenerate to create a fresh one
+    - Documents with a summary tree are answered from it without retrieval
+    - mode=map_reduce summarizes every chunk in parallel groups instead of
+      the top retrieved chunks
     """
     # Verify document belongs to user
     document = document_service.get_document(request.document_id, user_id, db)
@@ -44,10 +58,14 @@ async def generate_summary(
     
     try:
         # Generate summary using RAG pipeline
-        response = rag_pipeline.generate_summary(
+        response = await rag_pipeline.generate_summary(
             collection_name=document.collection_name,
             summary_type=request.summary_type,
-            page_number=request.page_number
+            page_number=request.page_number,
+            db=db,
+            regenerate=request.regenerate,
+            document_id=document.id,
+            mode=request.mode
         )
         
         if "error" in response:
@@ -58,8 +76,133 @@ async def generate_summary(
         
         return response
         
+    except (HTTPException, LLMError):
+        raise
+    except ExecutorSaturatedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate summary: {str(e)}"
+        )
+
+
+@router.post("/stream")
+async def stream_summary(
+    request: SummaryRequest,
+    user_id: int = 1,  # TODO: Get from auth token
+    db: Session = Depends(get_db)
+):
+    """
+    Generate a summary, streaming progress as server-sent events
+    
+    - `progress` events with {completed, total} LLM calls in map_reduce mode
+    - `done` with the summary response
+    - `error` if generation fails
+    """
+    document = document_service.get_document(request.document_id, user_id, db)
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    if request.page_number and request.page_number > document.total_pages:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Page number exceeds document pages ({document.total_pages})"
+        )
+    
+    events = rag_pipeline.stream_summary(
+        collection_name=document.collection_name,
+        summary_type=request.summary_type,
+        page_number=request.page_number,
+        db=db,
+        regenerate=request.regenerate,
+        document_id=document.id,
+        mode=request.mode
+    )
+    
+    # Errors before the first event keep their status codes
+    try:
+        first_event = await events.__anext__()
+    except ExecutorSaturatedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except LLMError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate summary: {str(e)}"
         )
+    
+    if first_event[0] == "error":
+        await events.aclose()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=first_event[1]["detail"]
+        )
+    
+    async def event_stream():
+        try:
+            yield format_sse(*first_event)
+            async for event, data in events:
+                yield format_sse(event, data)
+        except Exception as e:
+            logger.error(f"Summary stream failed: {e}")
+            yield format_sse("error", {"detail": str(e)})
+        finally:
+            await events.aclose()
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.get("/{document_id}/tree", response_model=List[SummaryTreeNodeResponse])
+async def get_summary_tree(
+    document_id: int,
+    user_id: int = 1,  # TODO: Get from auth token
+    db: Session = Depends(get_db)
+):
+    """
+    Get the precomputed summary tree of a document, top level first
+    """
+    document = document_service.get_document(document_id, user_id, db)
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    return SummaryTreeBuilder.get_tree(db, document_id)
+
+
+@router.post("/{document_id}/tree", status_code=status.HTTP_202_ACCEPTED)
+async def build_summary_tree(
+    document_id: int,
+    background_tasks: BackgroundTasks,
+    user_id: int = 1,  # TODO: Get from auth token
+    db: Session = Depends(get_db)
+):
+    """
+    Build or rebuild a document's summary tree in the background
+    
+    Useful for documents ingested while SUMMARY_TREE_ENABLED was off.
+    """
+    document = document_service.get_document(document_id, user_id, db)
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    background_tasks.add_task(summary_tree_builder.build_in_background, document_id)
+    return {"document_id": document_id, "status": "building"}
@@ -2,7 +2,7 @@
 Application configuration and settings
 """
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Dict, Any
 import os
 
 
@@ -18,7 +18,7 @@ class Settings(BaseSettings):
     
     # LLM API Keys
     OPENAI_API_KEY: str = ""
-    GOOGLE_API_KEY: str
+    GOOGLE_API_KEY: str = ""  # Not needed with DEFAULT_LLM=mock
     
     # ChromaDB
     CHROMA_DB_PATH: str = "./chroma_db"
@@ -26,13 +26,125 @@ class Settings(BaseSettings):
     # File Upload
     UPLOAD_DIR: str = "./uploads"
     MAX_FILE_SIZE: int = 10485760  # 10MB
+    UPLOAD_CHUNK_SIZE: int = 1048576  # 1MB read/write block when streaming uploads
+    
+    # Chunking
+    CHUNK_SIZE: int = 1000
+    CHUNK_OVERLAP: int = 200
+    
+    # Extraction cache (per-page PDF text keyed by file hash)
+    EXTRACTION_CACHE_DIR: str = "./extraction_cache"
+    
+    # Ingestion de-duplication
+    DEDUP_ENABLED: bool = True
+    BOILERPLATE_MIN_PAGE_RATIO: float = 0.5  # Line repeated on >= this share of pages
+    DEDUP_SIMILARITY_THRESHOLD: float = 0.85  # Estimated Jaccard for near-duplicate chunks
+    
+    # Background ingestion
+    INGESTION_WORKERS: int = 2
+    INGESTION_SATURATED_RETRIES: int = 5  # Times a job is put back while the PDF pool is full
+    INGESTION_RETRY_BASE_DELAY: float = 1.0  # Seconds, doubling per attempt
+    INGESTION_RETRY_MAX_DELAY: float = 30.0
+    
+    # Bulk upload
+    BULK_MAX_FILES: int = 100
+    BULK_INGEST_CONCURRENCY: int = 4  # Shared by extraction and embedding batches
+    MAX_ARCHIVE_SIZE: int = 524288000  # 500MB
+    MAX_BULK_UPLOAD_SIZE: int = 1073741824  # 1GB per bulk-upload request
+    EMBEDDING_BATCH_SIZE: int = 64
+    
+    # Thread pools for blocking work (see app/core/executors.py)
+    EMBEDDING_WORKERS: int = 2  # Embedding and vector search
+    PDF_WORKERS: int = 2  # PDF parsing and ingestion
+    LLM_WORKERS: int = 16  # Synchronous LLM SDK calls
+    EXECUTOR_MAX_QUEUE: int = 100  # Waiting tasks per pool before requests get 503
+    
+    # Async LLM clients
+    GEMINI_MAX_CONCURRENCY: int = 32  # In-flight upstream calls per provider
+    OPENAI_MAX_CONCURRENCY: int = 32
+    LLM_MAX_CONNECTIONS: int = 100
+    LLM_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_TIMEOUT: float = 120.0  # Seconds per call
+    LLM_CONNECT_TIMEOUT: float = 10.0
+    
+    # LLM retries, hedging and circuit breaking (per provider)
+    LLM_MAX_RETRIES: int = 2  # Extra attempts after 429, 5xx, timeout or connection errors
+    LLM_RETRY_BASE_DELAY: float = 0.5  # Seconds; full-jitter exponential backoff
+    LLM_RETRY_MAX_DELAY: float = 8.0
+    LLM_HEDGE_ENABLED: bool = False  # Send a backup request when a call runs past the latency percentile
+    LLM_HEDGE_PERCENTILE: float = 95.0
+    LLM_HEDGE_MIN_SAMPLES: int = 20  # Successful calls observed before hedging starts
+    LLM_BREAKER_FAILURES: int = 5  # Consecutive transient failures that open the circuit (0 disables)
+    LLM_BREAKER_COOLDOWN: float = 30.0  # Seconds before a trial call
+    
+    # Multi-provider routing (per-task policies; see app/services/llm_router.py)
+    LLM_ROUTING_ENABLED: bool = False  # Otherwise every call goes to DEFAULT_LLM
+    LLM_ROUTES: Dict[str, Dict[str, Any]] = {}  # Task -> {"strategy": "fastest"|"preferred", "backends": ["provider:model", ...]}
+    LLM_ROUTER_WINDOW: int = 50  # Recent calls per backend for the error rate
+    LLM_ROUTER_MAX_ERROR_RATE: float = 0.5  # Backends above this are skipped while another is healthy
+    
+    # Offline mock LLM (DEFAULT_LLM=mock) for benchmarks and load tests
+    MOCK_LLM_LATENCY_DISTRIBUTION: str = "lognormal"  # fixed, uniform, normal or lognormal
+    MOCK_LLM_LATENCY_MS: float = 800.0  # Mean time to first token
+    MOCK_LLM_LATENCY_SPREAD: float = 0.5  # Relative spread (sigma for normal/lognormal)
+    MOCK_LLM_TOKENS_PER_SECOND: float = 80.0  # Generation rate after the first token (0 = instant)
+    MOCK_LLM_RESPONSE_WORDS: int = 150  # Length of plain-text answers
+    MOCK_LLM_ERROR_RATE: float = 0.0  # Share of calls failing with an injected 503
+    MOCK_LLM_SEED: int = 0  # Latency and error draws repeat for the same seed
+    MOCK_LLM_MAX_CONCURRENCY: int = 256
+    
+    # Generation cache (summaries and quizzes)
+    GENERATION_CACHE_ENABLED: bool = True
+    GENERATION_CACHE_TTL: int = 604800  # 7 days
+    GENERATION_CACHE_MAX_ENTRIES: int = 5000
+    
+    # Share one upstream call between identical concurrent summary, quiz and study plan requests
+    SINGLE_FLIGHT_ENABLED: bool = True
+    
+    # Semantic answer cache (chat questions without history)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92  # Cosine similarity for reusing an answer
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 500  # Per document
+    
+    # Summary tree precomputed at ingestion
+    SUMMARY_TREE_ENABLED: bool = False
+    SUMMARY_TREE_SECTION_CHARS: int = 12000  # Text per leaf section
+    SUMMARY_TREE_FANOUT: int = 6  # Children rolled up into each parent
+    SUMMARY_TREE_CONCURRENCY: int = 4  # Parallel LLM calls per document
+    
+    # Map-reduce summarization over every chunk
+    MAP_REDUCE_GROUP_TOKENS: int = 8000  # Minimum estimated tokens per group
+    MAP_REDUCE_MAX_GROUP_TOKENS: int = 16000  # Longer documents get more groups, in extra waves
+    MAP_REDUCE_CONCURRENCY: int = 16  # Parallel group summaries per request
+    MAP_REDUCE_MAX_CALLS: int = 32  # Upstream calls per summary, including the reduce
+    MAP_REDUCE_REDUCE_FANIN: int = 16  # Partial summaries merged per reduce call
+    
+    # Topic map (k-means over each collection's embeddings, built at ingestion)
+    TOPIC_MAX_TOPICS: int = 20
+    TOPIC_KMEANS_ITERATIONS: int = 25
+    
+    # Chat context packing
+    CONTEXT_TOKEN_BUDGET: int = 1000  # Estimated tokens of retrieved text per answer prompt
+    
+    # Chat sessions (rolling conversation summary)
+    CHAT_RECENT_TURNS: int = 1  # Exchanges kept verbatim after each summary update
+    CHAT_MAX_PENDING_TURNS: int = 4  # Verbatim exchanges kept if summarizing falls behind
+    CHAT_TURN_CHARS: int = 1500  # Per message in prompts
+    CHAT_SUMMARY_MAX_TOKENS: int = 400
+    
+    # Follow-up retrieval reuse within a chat session
+    SESSION_RETRIEVAL_ENABLED: bool = True
+    SESSION_RETRIEVAL_REUSE_THRESHOLD: float = 0.92  # Similarity to the last question for reusing its chunks as-is
+    SESSION_RETRIEVAL_RERANK_RATIO: float = 0.8  # Fraction of the retrieving question's centroid similarity needed to re-rank locally
+    SESSION_RETRIEVAL_MAX_SESSIONS: int = 1000
     
     # CORS
     ALLOWED_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:5173"]
     
     # LLM Settings
-    DEFAULT_LLM: str = "gemini"
+    DEFAULT_LLM: str = "gemini"  # gemini, openai or mock
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    LEGACY_EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"  # Assumed for old collections that don't record their model
     
     class Config:
         env_file = ".env"
@@ -45,3 +157,4 @@ settings = Settings()
 # Ensure upload directory exists
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 os.makedirs(settings.CHROMA_DB_PATH, exist_ok=True)
+os.makedirs(settings.EXTRACTION_CACHE_DIR, exist_ok=True)
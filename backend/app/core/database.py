@@ -1,11 +1,14 @@
 """
 Database connection and session management
 """
-from sqlalchemy import create_engine
+import logging
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
 
+logger = logging.getLogger(__name__)
+
 # Create database engine
 engine = create_engine(
     settings.DATABASE_URL,
@@ -32,6 +35,38 @@ def get_db():
         db.close()
 
 
+def _add_missing_columns():
+    """
+    Add model columns missing from existing tables
+    
+    create_all only creates new tables, so a database created before a
+    column was added would fail every query on that table. New columns are
+    added as nullable, and their indexes are created if absent. Safe to run
+    on every start.
+    """
+    inspector = inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"
+                ))
+                logger.info(f"Added column {table.name}.{column.name}")
+            
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+
 def init_db():
-    """Initialize database tables"""
+    """Initialize database tables and add columns introduced since they were created"""
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
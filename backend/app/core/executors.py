@@ -0,0 +1,134 @@
+"""
+Bounded thread pools for blocking work called from async endpoints
+
+Each kind of blocking work gets its own pool so that, for example, a burst
+of slow LLM calls cannot starve embedding lookups:
+
+- embedding: SentenceTransformer encoding and vector search
+- pdf: PDF parsing, chunking and ingestion
+- llm: synchronous LLM SDK calls
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+from .config import settings
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when a pool's queue is full"""
+    pass
+
+
+class BoundedExecutor:
+    """Thread pool with a bounded backlog and queue-depth metrics"""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        """
+        Initialize executor
+
+        Args:
+            name: Pool name used in metrics and thread names
+            max_workers: Number of worker threads
+            max_queue: Maximum tasks waiting for a worker before new ones are rejected
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """
+        Run a blocking callable in this pool and await its result
+
+        Args:
+            fn: Blocking callable
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            Return value of fn
+
+        Raises:
+            ExecutorSaturatedError: If max_queue tasks are already waiting
+        """
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturatedError(f"{self.name} pool is busy, try again shortly")
+            self.queued += 1
+
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self.total_wait_seconds += started - submitted
+
+            try:
+                result = fn(*args, **kwargs)
+                succeeded = True
+                return result
+            except Exception:
+                succeeded = False
+                raise
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.total_run_seconds += time.perf_counter() - started
+                    if succeeded:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, task)
+
+    def stats(self) -> Dict:
+        """Snapshot of pool metrics"""
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(1000 * self.total_wait_seconds / finished, 2) if finished else 0.0,
+                "avg_run_ms": round(1000 * self.total_run_seconds / finished, 2) if finished else 0.0
+            }
+
+    def shutdown(self):
+        """Stop accepting work and wait for running tasks"""
+        self._executor.shutdown(wait=True)
+
+
+# Shared pools
+embedding_executor = BoundedExecutor("embedding", settings.EMBEDDING_WORKERS, settings.EXECUTOR_MAX_QUEUE)
+pdf_executor = BoundedExecutor("pdf", settings.PDF_WORKERS, settings.EXECUTOR_MAX_QUEUE)
+llm_executor = BoundedExecutor("llm", settings.LLM_WORKERS, settings.EXECUTOR_MAX_QUEUE)
+
+executors = {
+    "embedding": embedding_executor,
+    "pdf": pdf_executor,
+    "llm": llm_executor
+}
+
+
+def get_executor_stats() -> Dict:
+    """Metrics for every pool"""
+    return {name: executor.stats() for name, executor in executors.items()}
@@ -0,0 +1,82 @@
+"""
+Reject oversized uploads before their body is read
+
+FastAPI parses multipart forms before the endpoint runs, and Starlette
+spools every file part to a temporary file while doing so. A size check in
+the endpoint therefore only fires after the whole body has been received.
+This middleware refuses an upload whose Content-Length is over its route's
+limit straight away, and stops reading a body sent without one as soon as
+it passes the limit.
+"""
+import re
+from typing import Optional
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import settings
+
+# Room for multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+SINGLE_UPLOAD_PATH = re.compile(r"^/api/documents/(upload|\d+/replace)/?$")
+BULK_UPLOAD_PATH = re.compile(r"^/api/documents/bulk-upload/?$")
+
+
+def upload_limit(path: str) -> Optional[int]:
+    """
+    Request body limit for an upload route
+
+    Args:
+        path: Request path
+
+    Returns:
+        Maximum body size in bytes, or None if the route is not limited
+    """
+    if SINGLE_UPLOAD_PATH.match(path):
+        return settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD
+    if BULK_UPLOAD_PATH.match(path):
+        return settings.MAX_BULK_UPLOAD_SIZE
+    return None
+
+
+class UploadSizeLimitMiddleware:
+    """ASGI middleware enforcing upload_limit on POST bodies"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        limit = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            limit = upload_limit(scope["path"])
+
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Request body exceeds maximum size of {limit} bytes"
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={"detail": detail}
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            # Covers chunked bodies; FastAPI re-raises HTTPException from form parsing
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=detail
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -2,10 +2,21 @@
 Main FastAPI application
 """
 import logging
-from fastapi import FastAPI
+import math
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from .core.config import settings
 from .core.database import init_db
+from .core.executors import executors, get_executor_stats
+from .core.upload_limits import UploadSizeLimitMiddleware
+from .services.llm_providers import get_provider_stats, close_providers
+from .services.llm_errors import LLMError
+from .services.generation_cache import generation_cache
+from .services.answer_cache import answer_cache
+from .services.session_retrieval import session_retrieval_cache
+from .services.llm_service import generation_flights
+from .services.llm_router import llm_router
 from .api import documents, chat, summary, quiz, study_plan
 
 logger = logging.getLogger(__name__)
@@ -19,6 +30,9 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Refuse oversized uploads before reading them (added first so CORS wraps its 413s)
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -36,15 +50,40 @@ app.include_router(quiz.router, prefix="/api")
 app.include_router(study_plan.router, prefix="/api")
 
 
+@app.exception_handler(LLMError)
+async def llm_error_handler(request: Request, exc: LLMError):
+    """Report provider failures as 502/503/504 with a machine-readable error code"""
+    headers = {}
+    if exc.retry_after is not None:
+        headers["Retry-After"] = str(math.ceil(exc.retry_after))
+    
+    logger.warning(f"LLM failure on {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=exc.http_status,
+        content={"detail": str(exc), "error": exc.code},
+        headers=headers
+    )
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize database on startup"""
     init_db()
+    await documents.ingestion_queue.start()
     logger.info(f"🚀 {settings.APP_NAME} is starting...")
     logger.info(f"📚 Database: Connected")
     logger.info(f"🤖 LLM Provider: {settings.DEFAULT_LLM}")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers"""
+    await documents.ingestion_queue.stop()
+    await close_providers()
+    for executor in executors.values():
+        executor.shutdown()
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -64,6 +103,21 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Thread pools, LLM provider health and routing, request coalescing, caches and chat session metrics"""
+    return {
+        "executors": get_executor_stats(),
+        "llm_providers": get_provider_stats(),
+        "llm_router": llm_router.stats() if settings.LLM_ROUTING_ENABLED else {"enabled": False},
+        "single_flight": generation_flights.stats(),
+        "generation_cache": generation_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "chat_sessions": chat.chat_sessions.stats(),
+        "session_retrieval": session_retrieval_cache.stats()
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -4,5 +4,9 @@ Database models
 from .user import User
 from .document import Document
 from .study_plan import StudyPlan
+from .ingestion_job import IngestionJob
+from .generation_cache import GenerationCacheEntry
+from .summary_node import SummaryNode
+from .chat_session import ChatSession
 
-__all__ = ["User", "Document", "StudyPlan"]
+__all__ = ["User", "Document", "StudyPlan", "IngestionJob", "GenerationCacheEntry", "SummaryNode", "ChatSession"]
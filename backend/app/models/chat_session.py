@@ -0,0 +1,30 @@
+"""
+Chat session model for server-side conversation state
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from datetime import datetime
+from ..core.database import Base
+
+
+class ChatSession(Base):
+    """
+    Conversation about one document
+
+    Older turns are folded into a rolling summary; only the turns not yet
+    folded (normally just the last exchange) are kept verbatim.
+    """
+    __tablename__ = "chat_sessions"
+
+    id = Column(String, primary_key=True, index=True)  # UUID hex
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+
+    # Conversation state
+    summary = Column(Text, default="")  # Rolling summary of folded turns
+    recent_turns = Column(Text, default="[]")  # JSON list of {question, answer}, oldest first
+    turn_count = Column(Integer, default=0)  # All turns, folded or not
+    summarized_turns = Column(Integer, default=0)  # Turns no longer kept verbatim (folded or dropped)
+
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
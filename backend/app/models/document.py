@@ -17,13 +17,18 @@ class Document(Base):
     original_filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
     file_size = Column(Integer)  # in bytes
+    content_hash = Column(String, index=True)  # SHA-256 of file content
     
     # Content metadata
     total_pages = Column(Integer)
     total_chunks = Column(Integer)
+    page_hashes = Column(Text)  # JSON list of per-page content hashes
+    boilerplate_lines_removed = Column(Integer, default=0)
+    duplicate_chunks_removed = Column(Integer, default=0)
     
     # ChromaDB collection ID
     collection_name = Column(String, unique=True, index=True)
+    index_fingerprint = Column(String)  # Settings the collection was built with
     
     # Extracted text preview
     text_preview = Column(Text)
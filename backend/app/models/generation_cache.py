@@ -0,0 +1,30 @@
+"""
+Generation cache model for reusable summary and quiz results
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from datetime import datetime
+from ..core.database import Base
+
+
+class GenerationCacheEntry(Base):
+    """Cached LLM generation results keyed by collection, parameters, prompt version and model"""
+    __tablename__ = "generation_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String, unique=True, index=True, nullable=False)  # SHA-256 of the key fields
+
+    # Key fields, kept for inspection and invalidation
+    collection_name = Column(String, index=True, nullable=False)
+    kind = Column(String, nullable=False)  # summary, quiz
+    params = Column(Text)  # JSON string of request parameters
+    prompt_version = Column(Integer)
+    model = Column(String)
+
+    # Result
+    result = Column(Text, nullable=False)  # JSON string
+    hits = Column(Integer, default=0)
+
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
+    expires_at = Column(DateTime, index=True)
@@ -0,0 +1,31 @@
+"""
+Ingestion job model for background document processing
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float
+from datetime import datetime
+from ..core.database import Base
+
+
+class IngestionJob(Base):
+    """Ingestion job table tracking upload processing state"""
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(String, primary_key=True, index=True)  # UUID hex
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=True)
+
+    # Uploaded file
+    original_filename = Column(String, nullable=False)
+    file_path = Column(String, nullable=False)
+    file_size = Column(Integer)  # in bytes
+    content_hash = Column(String)  # SHA-256 computed while streaming the upload
+
+    # Processing state
+    status = Column(String, default="pending", index=True)  # pending, running, completed, failed
+    stage = Column(String, default="queued")  # queued, extracting, embedding, summarizing, done
+    progress = Column(Float, default=0.0)  # 0.0 - 1.0
+    error = Column(Text)
+
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
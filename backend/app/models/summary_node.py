@@ -0,0 +1,33 @@
+"""
+Summary node model for precomputed hierarchical document summaries
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from datetime import datetime
+from ..core.database import Base
+
+
+class SummaryNode(Base):
+    """
+    One node of a document's summary tree
+
+    Level 0 nodes summarize consecutive pages (a section); each higher level
+    rolls up groups of nodes below it, up to a single document-level root.
+    """
+    __tablename__ = "summary_nodes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+
+    # Position in the tree
+    level = Column(Integer, nullable=False)  # 0 = section, highest = document
+    position = Column(Integer, nullable=False)  # Order within the level
+    page_start = Column(Integer, nullable=False)
+    page_end = Column(Integer, nullable=False)
+    is_root = Column(Boolean, default=False)  # Document-level node
+
+    # Content
+    summary_type = Column(String, nullable=False)  # concise, detailed, bullet_points
+    summary = Column(Text, nullable=False)
+
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
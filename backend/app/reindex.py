@@ -0,0 +1,172 @@
+"""
+Rebuild document collections after changing chunking or embedding settings
+
+Usage:
+    python -m app.reindex [--workers 4] [--chunk-size 800] [--chunk-overlap 150]
+                          [--embedding-model all-mpnet-base-v2] [--force]
+
+Each document is rebuilt into a fresh collection, then its Document row is
+switched to the new collection in a single commit, so live queries only ever
+see a complete index. The row also records the settings fingerprint, which
+makes the command resumable: documents already at the target fingerprint are
+skipped on the next run.
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .core.database import SessionLocal, init_db
+from .models.document import Document
+from .services.document_service import DocumentService
+from .services.generation_cache import generation_cache
+
+
+def format_duration(seconds: float) -> str:
+    """Format seconds as e.g. 1h02m or 3m15s"""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{(seconds % 3600) // 60:02d}m"
+    return f"{seconds // 60}m{seconds % 60:02d}s"
+
+
+def reindex_document(service: DocumentService, document_id: int) -> int:
+    """
+    Rebuild one document's collection and swap it in
+
+    Args:
+        service: Document service configured with the target settings
+        document_id: Document to rebuild
+
+    Returns:
+        Number of chunks in the new collection, or None if the document
+        has been deleted since the run started
+    """
+    db = SessionLocal()
+    new_collection = None
+    try:
+        document = db.query(Document).filter(Document.id == document_id).first()
+        if document is None:
+            return None
+        old_collection = document.collection_name
+
+        # Page text comes from the extraction cache when the hash is known
+        prepared = service.prepare_chunks(
+            document.file_path,
+            document.original_filename,
+            document.content_hash
+        )
+        new_collection = service.index_chunks(
+            prepared=prepared,
+            user_id=document.user_id,
+            original_filename=document.original_filename
+        )
+
+        # Swap: one commit moves the document to the complete new collection
+        extraction_result = prepared["extraction_result"]
+        document.collection_name = new_collection
+        document.content_hash = extraction_result["file_hash"]
+        document.total_pages = extraction_result["total_pages"]
+        document.total_chunks = len(prepared["chunks"])
+        document.page_hashes = json.dumps(prepared["page_hashes"])
+        document.boilerplate_lines_removed = prepared["boilerplate_removed"]
+        document.duplicate_chunks_removed = prepared["duplicates_removed"]
+        document.index_fingerprint = service.index_fingerprint
+        generation_cache.invalidate_collection(db, old_collection)
+        db.commit()
+
+        service.vector_store.delete_collection(old_collection)
+
+        return len(prepared["chunks"])
+    except Exception:
+        db.rollback()
+        # Don't leave the unused rebuild behind (e.g. the document was deleted mid-build)
+        if new_collection is not None:
+            service.vector_store.delete_collection(new_collection)
+        raise
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild document collections")
+    parser.add_argument("--workers", type=int, default=4, help="Documents rebuilt in parallel")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Override CHUNK_SIZE")
+    parser.add_argument("--chunk-overlap", type=int, default=None, help="Override CHUNK_OVERLAP")
+    parser.add_argument("--embedding-model", default=None, help="Override EMBEDDING_MODEL")
+    parser.add_argument("--force", action="store_true", help="Rebuild even up-to-date documents")
+    args = parser.parse_args()
+
+    init_db()
+    service = DocumentService(
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        embedding_model_name=args.embedding_model
+    )
+    fingerprint = service.index_fingerprint
+
+    db = SessionLocal()
+    try:
+        query = db.query(Document.id).order_by(Document.id)
+        if not args.force:
+            query = query.filter(
+                (Document.index_fingerprint == None) | (Document.index_fingerprint != fingerprint)  # noqa: E711
+            )
+        document_ids = [row.id for row in query.all()]
+    finally:
+        db.close()
+
+    total = len(document_ids)
+    print(f"Re-indexing {total} documents (fingerprint {fingerprint}, {args.workers} workers)")
+
+    if not total:
+        return
+
+    started = time.perf_counter()
+    done = 0
+    failed = 0
+    chunks_done = 0
+    lock = threading.Lock()
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(reindex_document, service, document_id): document_id
+            for document_id in document_ids
+        }
+
+        for future in as_completed(futures):
+            document_id = futures[future]
+
+            with lock:
+                done += 1
+                try:
+                    chunks = future.result()
+                    if chunks is None:
+                        status = "skipped (deleted)"
+                    else:
+                        chunks_done += chunks
+                        status = f"{chunks} chunks"
+                except Exception as e:
+                    failed += 1
+                    status = f"FAILED: {e}"
+
+                elapsed = time.perf_counter() - started
+                rate = done / elapsed if elapsed else 0.0
+                eta = (total - done) / rate if rate else 0.0
+                print(
+                    f"[{done}/{total}] document {document_id}: {status} | "
+                    f"{rate:.2f} docs/s, {chunks_done / elapsed:.0f} chunks/s, "
+                    f"ETA {format_duration(eta)}"
+                )
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Done: {done - failed} rebuilt, {failed} failed, {chunks_done} chunks "
+        f"in {format_duration(elapsed)}"
+    )
+    if failed:
+        print("Re-run the command to retry failed documents")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Semantic answer cache for chat questions
+Paraphrases of an answered question reuse its answer instead of calling the LLM
+"""
+import threading
+import numpy as np
+from typing import Optional, Dict, List
+from ..core.config import settings
+
+
+class _CollectionAnswers:
+    """Cached question embeddings and answers for one collection"""
+
+    def __init__(self, dimension: int):
+        self.embeddings = np.zeros((0, dimension), dtype=np.float32)
+        self.questions: List[str] = []
+        self.responses: List[Dict] = []
+        self.last_used: List[int] = []
+
+
+class SemanticAnswerCache:
+    """
+    Per-collection cache of answers keyed by question embedding
+
+    A question hits when its cosine similarity to a cached question is at
+    least the threshold. Embeddings come from VectorStore.encode_query, so a
+    lookup costs one matrix-vector product and no extra encoding.
+    """
+
+    # Misses within this distance below the threshold are counted as near misses
+    NEAR_MISS_MARGIN = 0.05
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        enabled: Optional[bool] = None
+    ):
+        """
+        Initialize cache
+
+        Args:
+            threshold: Minimum cosine similarity for a hit (defaults to settings)
+            max_entries: Answers kept per collection before least recently used are evicted
+            enabled: Whether lookups and stores happen at all
+        """
+        self.threshold = threshold or settings.SEMANTIC_CACHE_THRESHOLD
+        self.max_entries = max_entries or settings.SEMANTIC_CACHE_MAX_ENTRIES
+        self.enabled = settings.SEMANTIC_CACHE_ENABLED if enabled is None else enabled
+
+        self._collections: Dict[str, _CollectionAnswers] = {}
+        self._lock = threading.Lock()
+        self._clock = 0
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.near_misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def lookup(self, collection_name: str, query_embedding: np.ndarray) -> Optional[Dict]:
+        """
+        Find a cached answer for a similar question
+
+        Args:
+            collection_name: Document collection
+            query_embedding: Unit-normalized question embedding
+
+        Returns:
+            Cached response plus matched_question and similarity, or None
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entries = self._collections.get(collection_name)
+
+            if entries is None or not entries.questions or entries.embeddings.shape[1] != len(query_embedding):
+                self.misses += 1
+                return None
+
+            similarities = entries.embeddings @ query_embedding
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+
+            if similarity < self.threshold:
+                self.misses += 1
+                if similarity >= self.threshold - self.NEAR_MISS_MARGIN:
+                    self.near_misses += 1
+                return None
+
+            self._clock += 1
+            entries.last_used[best] = self._clock
+            self.hits += 1
+
+            return {
+                **entries.responses[best],
+                "matched_question": entries.questions[best],
+                "similarity": round(similarity, 4)
+            }
+
+    def store(self, collection_name: str, query_embedding: np.ndarray, question: str, response: Dict):
+        """
+        Cache an answer
+
+        Args:
+            collection_name: Document collection
+            query_embedding: Unit-normalized question embedding
+            question: Question as asked
+            response: Answer, sources and sources_count to replay on a hit
+        """
+        if not self.enabled:
+            return
+
+        embedding = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+
+        with self._lock:
+            entries = self._collections.get(collection_name)
+            if entries is None or entries.embeddings.shape[1] != embedding.shape[1]:
+                entries = _CollectionAnswers(embedding.shape[1])
+                self._collections[collection_name] = entries
+
+            if len(entries.questions) >= self.max_entries:
+                oldest = int(np.argmin(entries.last_used))
+                entries.embeddings = np.delete(entries.embeddings, oldest, axis=0)
+                del entries.questions[oldest]
+                del entries.responses[oldest]
+                del entries.last_used[oldest]
+                self.evictions += 1
+
+            self._clock += 1
+            entries.embeddings = np.vstack([entries.embeddings, embedding])
+            entries.questions.append(question)
+            entries.responses.append(response)
+            entries.last_used.append(self._clock)
+            self.stores += 1
+
+    def invalidate(self, collection_name: str):
+        """Drop every cached answer for a collection"""
+        with self._lock:
+            self._collections.pop(collection_name, None)
+
+    def stats(self) -> Dict:
+        """Snapshot of cache metrics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "threshold": self.threshold,
+                "max_entries_per_collection": self.max_entries,
+                "collections": len(self._collections),
+                "entries": sum(len(e.questions) for e in self._collections.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "near_misses": self.near_misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions
+            }
+
+
+# Shared instance so every router and service sees the same answers
+answer_cache = SemanticAnswerCache()
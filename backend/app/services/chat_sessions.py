@@ -0,0 +1,247 @@
+"""
+Server-side chat sessions with a rolling conversation summary
+Prompts carry a compact summary of older turns plus the last exchange
+"""
+import asyncio
+import json
+import logging
+import uuid
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, List, Tuple
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.chat_session import ChatSession
+from .llm_service import LLMService
+from .session_retrieval import session_retrieval_cache
+
+logger = logging.getLogger(__name__)
+
+
+class ChatSessionService:
+    """
+    Store chat turns and fold older ones into a rolling summary
+
+    After each turn the session keeps CHAT_RECENT_TURNS exchanges verbatim;
+    fold() merges anything older into the summary with one short LLM call.
+    If folding lags or fails, at most CHAT_MAX_PENDING_TURNS verbatim turns
+    are kept, so prompts stay bounded however long the conversation runs.
+    """
+
+    def __init__(self, llm_service: Optional[LLMService] = None):
+        """
+        Initialize service
+
+        Args:
+            llm_service: LLM used to update summaries
+        """
+        self.llm_service = llm_service or LLMService()
+        self.recent_turns = max(1, settings.CHAT_RECENT_TURNS)
+        self.max_pending_turns = max(self.recent_turns, settings.CHAT_MAX_PENDING_TURNS)
+        self.turn_chars = settings.CHAT_TURN_CHARS
+        self.summary_max_tokens = settings.CHAT_SUMMARY_MAX_TOKENS
+
+        # Per session: "fold" allows one fold at a time, "write" serializes
+        # updates of recent_turns. Entries are dropped once nobody uses them.
+        self._locks: Dict[str, Dict] = {}
+
+        # Metrics
+        self.folds = 0
+        self.fold_failures = 0
+        self.dropped_turns = 0
+
+    def create(self, db: Session, user_id: int, document_id: int) -> ChatSession:
+        """Start a new session about a document"""
+        session = ChatSession(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            document_id=document_id,
+            summary="",
+            recent_turns="[]",
+            turn_count=0,
+            summarized_turns=0
+        )
+
+        db.add(session)
+        db.commit()
+        db.refresh(session)
+
+        return session
+
+    def get(self, db: Session, session_id: str, user_id: int) -> Optional[ChatSession]:
+        """Get session by ID"""
+        return db.query(ChatSession).filter(
+            ChatSession.id == session_id,
+            ChatSession.user_id == user_id
+        ).first()
+
+    def delete(self, db: Session, session_id: str, user_id: int) -> bool:
+        """Delete a session"""
+        session = self.get(db, session_id, user_id)
+        if not session:
+            return False
+
+        db.delete(session)
+        db.commit()
+        session_retrieval_cache.forget(session_id)
+        return True
+
+    @asynccontextmanager
+    async def _locked(self, session_id: str, kind: str):
+        """Hold the session's "fold" or "write" lock"""
+        entry = self._locks.get(session_id)
+        if entry is None:
+            entry = {"fold": asyncio.Lock(), "write": asyncio.Lock(), "users": 0}
+            self._locks[session_id] = entry
+
+        entry["users"] += 1
+        try:
+            async with entry[kind]:
+                yield
+        finally:
+            entry["users"] -= 1
+            if entry["users"] == 0 and self._locks.get(session_id) is entry:
+                del self._locks[session_id]
+
+    @staticmethod
+    def turns(session: ChatSession) -> List[Dict]:
+        """Verbatim turns of a session, oldest first"""
+        return json.loads(session.recent_turns or "[]")
+
+    def _clip(self, text: str) -> str:
+        """Shorten a turn for prompts"""
+        if len(text) <= self.turn_chars:
+            return text
+        return text[:self.turn_chars].rstrip() + " [...]"
+
+    def prompt_context(self, session: ChatSession) -> Tuple[Optional[str], List[Dict]]:
+        """
+        Conversation state to put in an answer prompt
+
+        Args:
+            session: Chat session
+
+        Returns:
+            (rolling summary or None, recent turns as chat_history messages)
+        """
+        history = []
+        for turn in self.turns(session)[-self.max_pending_turns:]:
+            history.append({"type": "user", "content": self._clip(turn["question"])})
+            history.append({"type": "assistant", "content": self._clip(turn["answer"])})
+
+        return session.summary or None, history
+
+    async def record_turn(self, db: Session, session: ChatSession, question: str, answer: str):
+        """
+        Append an exchange to the session
+
+        Call fold() afterwards (e.g. as a background task) to summarize
+        turns beyond the verbatim window.
+        """
+        async with self._locked(session.id, "write"):
+            # Another request or a fold may have changed the turns since session was loaded
+            db.refresh(session)
+            turns = self.turns(session)
+            turns.append({"question": question, "answer": answer})
+
+            # Folding has fallen behind (or failed): drop the oldest turns
+            overflow = len(turns) - self.max_pending_turns
+            if overflow > 0:
+                turns = turns[overflow:]
+                session.summarized_turns = (session.summarized_turns or 0) + overflow
+                self.dropped_turns += overflow
+                logger.warning(f"Chat session {session.id}: dropped {overflow} unsummarized turns")
+
+            session.recent_turns = json.dumps(turns)
+            session.turn_count = (session.turn_count or 0) + 1
+            db.commit()
+
+    def _fold_prompt(self, summary: str, turns: List[Dict]) -> str:
+        """Build the prompt that merges turns into the running summary"""
+        exchanges = "\n\n".join(
+            f"Student: {self._clip(turn['question'])}\nAssistant: {self._clip(turn['answer'])}"
+            for turn in turns
+        )
+        previous = summary or "(no earlier conversation)"
+        words = int(self.summary_max_tokens * 0.6)
+
+        return f"""You maintain a running summary of a tutoring conversation about a study document.
+
+Current summary:
+{previous}
+
+New exchanges:
+{exchanges}
+
+Rewrite the summary to include the new exchanges in at most {words} words. Keep what the student asked about, the key facts given in answers, and anything the student found confusing. Output only the summary."""
+
+    async def fold(self, session_id: str):
+        """
+        Merge turns older than the verbatim window into the summary
+
+        Safe to call after every turn; does nothing when there is nothing to
+        fold. Uses its own database session so it can run after the response.
+        """
+        async with self._locked(session_id, "fold"):
+            db = SessionLocal()
+            try:
+                session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+                if not session:
+                    return
+
+                turns = self.turns(session)
+                to_fold = turns[:-self.recent_turns]
+                if not to_fold:
+                    return
+
+                try:
+                    summary = await self.llm_service.agenerate(
+                        self._fold_prompt(session.summary, to_fold),
+                        max_tokens=self.summary_max_tokens,
+                        temperature=0.3,
+                        task="chat"
+                    )
+                except Exception as e:
+                    self.fold_failures += 1
+                    logger.warning(f"Chat session {session_id}: summary update failed: {e}")
+                    return
+
+                async with self._locked(session_id, "write"):
+                    # Turns may have been added (or the oldest dropped) while the LLM was running
+                    db.refresh(session)
+                    remaining = self.turns(session)
+                    folded = 0
+                    for turn in to_fold:
+                        if remaining[:1] == [turn]:
+                            remaining = remaining[1:]
+                            folded += 1
+
+                    session.summary = summary.strip()
+                    session.recent_turns = json.dumps(remaining)
+                    session.summarized_turns = (session.summarized_turns or 0) + folded
+                    db.commit()
+                self.folds += 1
+            finally:
+                db.close()
+
+    def to_dict(self, session: ChatSession) -> Dict:
+        """Session state for API responses"""
+        return {
+            "session_id": session.id,
+            "document_id": session.document_id,
+            "summary": session.summary or "",
+            "recent_turns": self.turns(session),
+            "turn_count": session.turn_count or 0,
+            "summarized_turns": session.summarized_turns or 0,
+            "created_at": session.created_at,
+            "updated_at": session.updated_at
+        }
+
+    def stats(self) -> Dict:
+        """Snapshot of folding metrics"""
+        return {
+            "folds": self.folds,
+            "fold_failures": self.fold_failures,
+            "dropped_turns": self.dropped_turns,
+            "pending_folds": sum(1 for entry in self._locks.values() if entry["fold"].locked())
+        }
@@ -4,23 +4,540 @@ Handles PDF upload, processing, and storage
 """
 import os
 import uuid
+import time
+import asyncio
+import hashlib
+import json
+import logging
+import zipfile
+import numpy as np
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict, Callable, List
 from sqlalchemy.orm import Session
 from fastapi import UploadFile
 from ..models.document import Document
+from ..models.chat_session import ChatSession
 from ..utils.pdf_processor import PDFProcessor
+from ..utils.extraction_cache import ExtractionCache
+from ..utils.chunk_dedup import ChunkDeduplicator
 from .vector_store import VectorStore
+from .generation_cache import generation_cache
+from .answer_cache import answer_cache
+from .session_retrieval import session_retrieval_cache
+from .summary_tree import SummaryTreeBuilder
 from ..core.config import settings
+from ..core.executors import pdf_executor, embedding_executor
+
+logger = logging.getLogger(__name__)
+
+
+class FileTooLargeError(Exception):
+    """Raised when an upload exceeds MAX_FILE_SIZE"""
+    pass
 
 
 class DocumentService:
     """Service for document management"""
     
-    def __init__(self):
-        """Initialize document service"""
-        self.pdf_processor = PDFProcessor()
-        self.vector_store = VectorStore()
+    def __init__(
+        self,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        embedding_model_name: Optional[str] = None
+    ):
+        """
+        Initialize document service
+        
+        Args:
+            chunk_size: Characters per chunk (defaults to settings)
+            chunk_overlap: Overlap between chunks (defaults to settings)
+            embedding_model_name: Embedding model for new collections (defaults to settings)
+        """
+        self.pdf_processor = PDFProcessor(
+            chunk_size=chunk_size or settings.CHUNK_SIZE,
+            chunk_overlap=chunk_overlap if chunk_overlap is not None else settings.CHUNK_OVERLAP,
+            extraction_cache=ExtractionCache()
+        )
+        self.deduplicator = ChunkDeduplicator(
+            min_page_ratio=settings.BOILERPLATE_MIN_PAGE_RATIO,
+            similarity_threshold=settings.DEDUP_SIMILARITY_THRESHOLD
+        )
+        self.vector_store = VectorStore(embedding_model_name=embedding_model_name)
+    
+    @property
+    def index_fingerprint(self) -> str:
+        """Identify the extraction/chunking/embedding settings a collection is built with"""
+        params = "|".join(str(p) for p in (
+            self.pdf_processor.EXTRACTOR_VERSION,
+            self.pdf_processor.chunk_size,
+            self.pdf_processor.chunk_overlap,
+            settings.DEDUP_ENABLED,
+            settings.BOILERPLATE_MIN_PAGE_RATIO,
+            settings.DEDUP_SIMILARITY_THRESHOLD,
+            self.vector_store.embedding_model_name
+        ))
+        return hashlib.sha256(params.encode('utf-8')).hexdigest()[:16]
+    
+    async def save_upload(self, file: UploadFile, max_size: Optional[int] = None) -> Dict:
+        """
+        Stream an uploaded file to the upload directory
+        
+        The file is written in fixed-size chunks while its hash is computed,
+        so memory use is constant regardless of file size.
+        
+        Args:
+            file: Uploaded PDF file
+            max_size: Size limit in bytes (defaults to MAX_FILE_SIZE)
+            
+        Returns:
+            Dictionary with stored filename, path, size and content hash
+            
+        Raises:
+            FileTooLargeError: If the file exceeds the size limit
+        """
+        max_size = max_size or settings.MAX_FILE_SIZE
+        
+        # Generate unique filename
+        file_extension = os.path.splitext(file.filename)[1]
+        unique_filename = f"{uuid.uuid4()}{file_extension}"
+        file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
+        
+        digest = hashlib.sha256()
+        file_size = 0
+        
+        try:
+            with open(file_path, "wb") as f:
+                while True:
+                    block = await file.read(settings.UPLOAD_CHUNK_SIZE)
+                    if not block:
+                        break
+                    
+                    file_size += len(block)
+                    if file_size > max_size:
+                        raise FileTooLargeError(
+                            f"File exceeds maximum size of {max_size} bytes"
+                        )
+                    
+                    digest.update(block)
+                    f.write(block)
+        except Exception:
+            # Don't leave partial uploads behind
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
+        
+        return {
+            "filename": unique_filename,
+            "file_path": file_path,
+            "file_size": file_size,
+            "content_hash": digest.hexdigest()
+        }
+    
+    def extract_archive(self, archive_path: str) -> List[Dict]:
+        """
+        Unpack the PDFs in a zip archive into the upload directory
+        
+        Each member is streamed to disk with the same size limit and
+        hashing as single uploads. Members that fail are reported inline.
+        
+        Args:
+            archive_path: Path of the stored zip file
+            
+        Returns:
+            List of dictionaries like save_upload, plus original_filename
+            (or original_filename and error for rejected members)
+        """
+        extracted = []
+        
+        with zipfile.ZipFile(archive_path) as archive:
+            members = [
+                m for m in archive.infolist()
+                if not m.is_dir()
+                and m.filename.lower().endswith('.pdf')
+                and not os.path.basename(m.filename).startswith('.')
+                and '__MACOSX' not in m.filename
+            ]
+            
+            if len(members) > settings.BULK_MAX_FILES:
+                raise Exception(f"Archive contains more than {settings.BULK_MAX_FILES} PDFs")
+            
+            for member in members:
+                original_filename = os.path.basename(member.filename)
+                unique_filename = f"{uuid.uuid4()}.pdf"
+                file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
+                digest = hashlib.sha256()
+                file_size = 0
+                
+                try:
+                    # Declared size can lie, so the limit is enforced while copying too
+                    if member.file_size > settings.MAX_FILE_SIZE:
+                        raise FileTooLargeError(
+                            f"File exceeds maximum size of {settings.MAX_FILE_SIZE} bytes"
+                        )
+                    
+                    with archive.open(member) as src, open(file_path, "wb") as dest:
+                        for block in iter(lambda: src.read(settings.UPLOAD_CHUNK_SIZE), b""):
+                            file_size += len(block)
+                            if file_size > settings.MAX_FILE_SIZE:
+                                raise FileTooLargeError(
+                                    f"File exceeds maximum size of {settings.MAX_FILE_SIZE} bytes"
+                                )
+                            digest.update(block)
+                            dest.write(block)
+                    
+                    extracted.append({
+                        "original_filename": original_filename,
+                        "filename": unique_filename,
+                        "file_path": file_path,
+                        "file_size": file_size,
+                        "content_hash": digest.hexdigest()
+                    })
+                except Exception as e:
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                    extracted.append({"original_filename": original_filename, "error": str(e)})
+        
+        return extracted
+    
+    @staticmethod
+    def _hash_pages(page_texts: List[Dict]) -> List[str]:
+        """Hash each page's raw text so revisions can be diffed page by page"""
+        return [
+            hashlib.sha256(page["text"].encode('utf-8')).hexdigest()[:16]
+            for page in page_texts
+        ]
+    
+    def prepare_chunks(
+        self,
+        file_path: str,
+        original_filename: str,
+        content_hash: Optional[str] = None
+    ) -> Dict:
+        """
+        Extract and chunk a stored PDF (blocking)
+        
+        Args:
+            file_path: Path of the stored PDF
+            original_filename: Name the user uploaded the file as
+            content_hash: SHA-256 of the file (computed if omitted)
+            
+        Returns:
+            Dictionary with extraction result, chunks and de-duplication counts
+        """
+        # Extract text from PDF
+        extraction_result = self.pdf_processor.extract_text(file_path, file_hash=content_hash)
+        
+        if not extraction_result["success"]:
+            raise Exception(f"PDF extraction failed: {extraction_result['error']}")
+        
+        page_texts = extraction_result["page_texts"]
+        boilerplate_removed = 0
+        duplicates_removed = 0
+        
+        # Strip headers/footers repeated across pages before chunking
+        if settings.DEDUP_ENABLED:
+            page_texts, boilerplate_removed = self.deduplicator.strip_repeated_lines(page_texts)
+        
+        # Create chunks
+        chunks = self.pdf_processor.create_page_chunks(page_texts)
+        
+        # Collapse near-duplicate chunks so they are never embedded
+        if settings.DEDUP_ENABLED:
+            chunks, duplicates_removed = self.deduplicator.remove_near_duplicates(chunks)
+        
+        logger.info(
+            f"{original_filename}: removed {boilerplate_removed} boilerplate lines, "
+            f"{duplicates_removed} near-duplicate chunks, kept {len(chunks)} chunks"
+        )
+        
+        return {
+            "extraction_result": extraction_result,
+            "page_hashes": self._hash_pages(extraction_result["page_texts"]),
+            "chunks": chunks,
+            "boilerplate_removed": boilerplate_removed,
+            "duplicates_removed": duplicates_removed
+        }
+    
+    def index_chunks(
+        self,
+        prepared: Dict,
+        user_id: int,
+        original_filename: str,
+        embeddings: Optional[np.ndarray] = None
+    ) -> str:
+        """
+        Embed prepared chunks into a new collection
+        
+        Args:
+            prepared: Output of prepare_chunks
+            user_id: User ID
+            original_filename: Name the user uploaded the file as
+            embeddings: Precomputed chunk embeddings (encoded if omitted)
+            
+        Returns:
+            Name of the new collection
+        """
+        # Create collection in ChromaDB
+        collection_name = f"doc_{uuid.uuid4().hex[:16]}"
+        self.vector_store.create_collection(collection_name)
+        
+        # Add chunks to vector store
+        try:
+            self.vector_store.add_chunks(
+                collection_name=collection_name,
+                chunks=prepared["chunks"],
+                metadata={
+                    "user_id": user_id,
+                    "filename": original_filename
+                },
+                embeddings=embeddings
+            )
+        except Exception:
+            self.vector_store.delete_collection(collection_name)
+            raise
+        
+        return collection_name
+    
+    def store_document(
+        self,
+        prepared: Dict,
+        file_path: str,
+        original_filename: str,
+        user_id: int,
+        db: Session,
+        file_size: Optional[int] = None,
+        embeddings: Optional[np.ndarray] = None
+    ) -> Document:
+        """
+        Index prepared chunks in a new collection and create the record
+        
+        Args:
+            prepared: Output of prepare_chunks
+            file_path: Path of the stored PDF
+            original_filename: Name the user uploaded the file as
+            user_id: User ID
+            db: Database session
+            file_size: File size in bytes (read from disk if omitted)
+            embeddings: Precomputed chunk embeddings (encoded if omitted)
+            
+        Returns:
+            Created document record
+        """
+        extraction_result = prepared["extraction_result"]
+        chunks = prepared["chunks"]
+        
+        if file_size is None:
+            file_size = os.path.getsize(file_path)
+        
+        collection_name = self.index_chunks(
+            prepared=prepared,
+            user_id=user_id,
+            original_filename=original_filename,
+            embeddings=embeddings
+        )
+        
+        # Create database record
+        document = Document(
+            user_id=user_id,
+            filename=os.path.basename(file_path),
+            original_filename=original_filename,
+            file_path=file_path,
+            file_size=file_size,
+            content_hash=extraction_result["file_hash"],
+            total_pages=extraction_result["total_pages"],
+            total_chunks=len(chunks),
+            page_hashes=json.dumps(prepared["page_hashes"]),
+            boilerplate_lines_removed=prepared["boilerplate_removed"],
+            duplicate_chunks_removed=prepared["duplicates_removed"],
+            collection_name=collection_name,
+            index_fingerprint=self.index_fingerprint,
+            text_preview=extraction_result["full_text"][:500],
+            processed_at=datetime.utcnow()
+        )
+        
+        try:
+            db.add(document)
+            db.commit()
+        except Exception:
+            # No record points at the collection, so nothing would ever delete it
+            db.rollback()
+            self.vector_store.delete_collection(collection_name)
+            raise
+        db.refresh(document)
+        
+        return document
+    
+    def process_file(
+        self,
+        file_path: str,
+        original_filename: str,
+        user_id: int,
+        db: Session,
+        file_size: Optional[int] = None,
+        content_hash: Optional[str] = None,
+        progress_callback: Optional[Callable[[str, float], None]] = None
+    ) -> Document:
+        """
+        Extract, chunk and embed a stored PDF and create its record
+        
+        Blocking: call from a worker thread, not the event loop.
+        
+        Args:
+            file_path: Path of the stored PDF
+            original_filename: Name the user uploaded the file as
+            user_id: User ID
+            db: Database session
+            file_size: File size in bytes (read from disk if omitted)
+            content_hash: SHA-256 of the file (computed if omitted)
+            progress_callback: Called with (stage, progress) as work advances
+            
+        Returns:
+            Created document record
+        """
+        def report(stage: str, progress: float):
+            if progress_callback:
+                progress_callback(stage, progress)
+        
+        try:
+            report("extracting", 0.1)
+            prepared = self.prepare_chunks(file_path, original_filename, content_hash)
+            
+            report("embedding", 0.5)
+            document = self.store_document(
+                prepared=prepared,
+                file_path=file_path,
+                original_filename=original_filename,
+                user_id=user_id,
+                db=db,
+                file_size=file_size
+            )
+            
+            report("done", 1.0)
+            return document
+            
+        except Exception as e:
+            # Cleanup on error
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise Exception(f"Document upload failed: {str(e)}")
+    
+    async def process_bulk(
+        self,
+        files: List[Dict],
+        user_id: int,
+        db: Session
+    ) -> Dict:
+        """
+        Ingest many stored PDFs concurrently
+        
+        Extraction runs per file and embedding runs over batches that span
+        documents; both share one concurrency limit.
+        
+        Args:
+            files: Dictionaries from save_upload plus original_filename
+            user_id: User ID
+            db: Database session
+            
+        Returns:
+            Per-file results with timings and overall statistics
+        """
+        semaphore = asyncio.Semaphore(settings.BULK_INGEST_CONCURRENCY)
+        started = time.perf_counter()
+        
+        results = [
+            {"filename": item["original_filename"], "status": "pending", "timings": {}}
+            for item in files
+        ]
+        prepared = [None] * len(files)
+        
+        # Stage 1: extract and chunk files in parallel
+        async def prepare(i: int, item: Dict):
+            async with semaphore:
+                t0 = time.perf_counter()
+                try:
+                    prepared[i] = await pdf_executor.run(
+                        self.prepare_chunks,
+                        item["file_path"],
+                        item["original_filename"],
+                        item.get("content_hash")
+                    )
+                except Exception as e:
+                    results[i]["status"] = "failed"
+                    results[i]["error"] = str(e)
+                results[i]["timings"]["extraction_seconds"] = round(time.perf_counter() - t0, 3)
+        
+        await asyncio.gather(*(prepare(i, item) for i, item in enumerate(files)))
+        
+        # Stage 2: embed chunks of all documents in shared batches
+        ready = [i for i in range(len(files)) if prepared[i] is not None]
+        texts = [chunk.text for i in ready for chunk in prepared[i]["chunks"]]
+        batch_size = settings.EMBEDDING_BATCH_SIZE
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        
+        async def embed(batch: List[str]) -> np.ndarray:
+            async with semaphore:
+                return await embedding_executor.run(self.vector_store.embed_texts, batch)
+        
+        t0 = time.perf_counter()
+        tasks = [asyncio.create_task(embed(batch)) for batch in batches]
+        try:
+            embedded = await asyncio.gather(*tasks)
+        except Exception as e:
+            # Batches span documents, so every file waiting on them fails
+            for task in tasks:
+                task.cancel()
+            for i in ready:
+                results[i]["status"] = "failed"
+                results[i]["error"] = f"Embedding failed: {str(e)}"
+            ready = []
+            embedded = []
+        embedding_seconds = round(time.perf_counter() - t0, 3)
+        embeddings = np.concatenate(embedded) if embedded else None
+        
+        # Stage 3: store each document with its slice of the embeddings.
+        # Storing saves the collection, builds its topic map and commits, so it runs
+        # in the ingestion pool; one at a time, since the DB session is shared.
+        offset = 0
+        for i in ready:
+            item = files[i]
+            count = len(prepared[i]["chunks"])
+            t0 = time.perf_counter()
+            
+            try:
+                document = await pdf_executor.run(
+                    self.store_document,
+                    prepared=prepared[i],
+                    file_path=item["file_path"],
+                    original_filename=item["original_filename"],
+                    user_id=user_id,
+                    db=db,
+                    file_size=item.get("file_size"),
+                    embeddings=embeddings[offset:offset + count] if count else None
+                )
+                results[i]["status"] = "completed"
+                results[i]["document_id"] = document.id
+                results[i]["total_chunks"] = document.total_chunks
+            except Exception as e:
+                db.rollback()
+                results[i]["status"] = "failed"
+                results[i]["error"] = str(e)
+            
+            results[i]["timings"]["storage_seconds"] = round(time.perf_counter() - t0, 3)
+            offset += count
+        
+        # Remove files that could not be ingested
+        for i, result in enumerate(results):
+            if result["status"] == "failed" and os.path.exists(files[i]["file_path"]):
+                os.remove(files[i]["file_path"])
+        
+        return {
+            "results": results,
+            "total_files": len(files),
+            "succeeded": sum(1 for r in results if r["status"] == "completed"),
+            "embedding_batches": len(batches),
+            "embedding_seconds": embedding_seconds,
+            "total_seconds": round(time.perf_counter() - started, 3)
+        }
     
     async def upload_and_process(
         self,
@@ -29,7 +546,7 @@ class DocumentService:
         db: Session
     ) -> Document:
         """
-        Upload PDF and process it
+        Upload PDF and process it inline
         
         Args:
             file: Uploaded PDF file
@@ -39,69 +556,183 @@ class DocumentService:
         Returns:
             Created document record
         """
-        try:
-            # Generate unique filename
-            file_extension = os.path.splitext(file.filename)[1]
-            unique_filename = f"{uuid.uuid4()}{file_extension}"
-            file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
-            
-            # Save file
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
+        stored = await self.save_upload(file)
+        return await pdf_executor.run(
+            self.process_file,
+            file_path=stored["file_path"],
+            original_filename=file.filename,
+            user_id=user_id,
+            db=db,
+            file_size=stored["file_size"],
+            content_hash=stored["content_hash"]
+        )
+    
+    def replace_document(
+        self,
+        document: Document,
+        file_path: str,
+        original_filename: str,
+        db: Session,
+        file_size: Optional[int] = None,
+        content_hash: Optional[str] = None
+    ) -> Dict:
+        """
+        Replace a document with a revised PDF, re-embedding only changed pages
+        
+        Pages are matched by content hash, so unchanged pages keep their
+        vectors even if they moved. Changed pages are re-chunked and
+        embedded, and vectors of pages that disappeared are deleted. The
+        Document row is updated in place. Blocking: call from a worker thread.
+        
+        Args:
+            document: Existing document record
+            file_path: Path of the stored revised PDF
+            original_filename: Name the user uploaded the revision as
+            db: Database session
+            file_size: File size in bytes (read from disk if omitted)
+            content_hash: SHA-256 of the file (computed if omitted)
             
-            file_size = len(content)
+        Returns:
+            Dictionary with the updated document and page/chunk change counts
+        """
+        old_file_path = document.file_path
+        collection_name = document.collection_name
+        
+        try:
+            if file_size is None:
+                file_size = os.path.getsize(file_path)
             
-            # Extract text from PDF
-            extraction_result = self.pdf_processor.extract_text(file_path)
+            extraction_result = self.pdf_processor.extract_text(file_path, file_hash=content_hash)
             
             if not extraction_result["success"]:
                 raise Exception(f"PDF extraction failed: {extraction_result['error']}")
             
-            # Create chunks
+            page_texts = extraction_result["page_texts"]
+            new_hashes = self._hash_pages(page_texts)
+            
+            # Stored vectors are only reusable if built with the current settings
+            old_hashes = []
+            if document.page_hashes and document.index_fingerprint == self.index_fingerprint:
+                old_hashes = json.loads(document.page_hashes)
+            
+            old_pages_by_hash = {}
+            for page_number, page_hash in enumerate(old_hashes, start=1):
+                old_pages_by_hash.setdefault(page_hash, []).append(page_number)
+            
+            # Match new pages to unchanged old pages
+            page_mapping = {}
+            changed_pages = []
+            for page_number, page_hash in enumerate(new_hashes, start=1):
+                if old_pages_by_hash.get(page_hash):
+                    page_mapping[old_pages_by_hash[page_hash].pop(0)] = page_number
+                else:
+                    changed_pages.append(page_number)
+            
+            removed_pages = [
+                page for pages in old_pages_by_hash.values() for page in pages
+            ]
+            
+            # Boilerplate is detected over the whole revision, then only changed pages are chunked
+            boilerplate_removed = 0
+            duplicates_removed = 0
+            if settings.DEDUP_ENABLED:
+                page_texts, boilerplate_removed = self.deduplicator.strip_repeated_lines(page_texts)
+            
             chunks = self.pdf_processor.create_page_chunks(
-                extraction_result["page_texts"]
+                [page_texts[page - 1] for page in changed_pages]
             )
             
-            # Create collection in ChromaDB
-            collection_name = f"doc_{uuid.uuid4().hex[:16]}"
-            self.vector_store.create_collection(collection_name)
+            if settings.DEDUP_ENABLED:
+                # New chunks must not duplicate what the reused pages already index
+                existing_texts = []
+                if old_hashes and page_mapping:
+                    existing_texts = [
+                        chunk["text"]
+                        for chunk in self.vector_store.get_chunks(collection_name)
+                        if chunk["page_number"] in page_mapping
+                    ]
+                chunks, duplicates_removed = self.deduplicator.remove_near_duplicates(
+                    chunks, existing_texts
+                )
             
-            # Add chunks to vector store
-            self.vector_store.add_chunks(
-                collection_name=collection_name,
+            # Embed before touching the live collection
+            embeddings = self.vector_store.embed_texts([chunk.text for chunk in chunks]) if chunks else None
+            
+            # Build the revised collection in memory; the live one changes only once the DB is ready
+            if not old_hashes:
+                # Nothing reusable: drop every existing vector
+                removed_pages = list(range(1, (document.total_pages or 0) + 1))
+            revised, chunks_removed = self.vector_store.stage_page_update(
+                collection_name,
+                removed_pages=removed_pages,
+                page_mapping=page_mapping,
                 chunks=chunks,
                 metadata={
-                    "user_id": user_id,
-                    "filename": file.filename
-                }
+                    "user_id": document.user_id,
+                    "filename": original_filename
+                },
+                embeddings=embeddings,
+                clear=not old_hashes
             )
             
-            # Create database record
-            document = Document(
-                user_id=user_id,
-                filename=unique_filename,
-                original_filename=file.filename,
-                file_path=file_path,
-                file_size=file_size,
-                total_pages=extraction_result["total_pages"],
-                total_chunks=len(chunks),
-                collection_name=collection_name,
-                text_preview=extraction_result["full_text"][:500],
-                processed_at=datetime.utcnow()
-            )
+            # Update the record in place
+            document.filename = os.path.basename(file_path)
+            document.original_filename = original_filename
+            document.file_path = file_path
+            document.file_size = file_size
+            document.content_hash = extraction_result["file_hash"]
+            document.total_pages = extraction_result["total_pages"]
+            document.total_chunks = len(revised)
+            document.page_hashes = json.dumps(new_hashes)
+            # Boilerplate is counted over the whole revision; duplicates only over its new
+            # chunks, so they add to the count for the reused vectors
+            document.boilerplate_lines_removed = boilerplate_removed
+            if old_hashes:
+                duplicates_removed += document.duplicate_chunks_removed or 0
+            document.duplicate_chunks_removed = duplicates_removed
+            document.index_fingerprint = self.index_fingerprint
+            document.text_preview = extraction_result["full_text"][:500]
+            document.processed_at = datetime.utcnow()
             
-            db.add(document)
-            db.commit()
+            # Summaries and quizzes for the old revision are stale
+            generation_cache.invalidate_collection(db, collection_name)
+            SummaryTreeBuilder.delete_tree(db, document.id)
+            db.flush()
+            
+            # One swap and save; put the old collection back if the commit fails
+            previous = self.vector_store.put_collection(collection_name, revised)
+            try:
+                db.commit()
+            except Exception:
+                self.vector_store.put_collection(collection_name, previous)
+                raise
             db.refresh(document)
             
-            return document
+            answer_cache.invalidate(collection_name)
+            session_retrieval_cache.invalidate(collection_name)
+            
+            if old_file_path != file_path and os.path.exists(old_file_path):
+                os.remove(old_file_path)
+            
+            logger.info(
+                f"Replaced document {document.id}: {len(page_mapping)} pages reused, "
+                f"{len(changed_pages)} re-embedded, {len(removed_pages)} removed"
+            )
+            
+            return {
+                "document": document,
+                "pages_reused": len(page_mapping),
+                "pages_reembedded": len(changed_pages),
+                "pages_removed": len(removed_pages),
+                "chunks_added": len(chunks),
+                "chunks_removed": chunks_removed
+            }
             
         except Exception as e:
-            # Cleanup on error
+            db.rollback()
             if os.path.exists(file_path):
                 os.remove(file_path)
-            raise Exception(f"Document upload failed: {str(e)}")
+            raise Exception(f"Document replacement failed: {str(e)}")
     
     def get_document(self, document_id: int, user_id: int, db: Session) -> Optional[Document]:
         """Get document by ID"""
@@ -131,7 +762,12 @@ class DocumentService:
             if os.path.exists(document.file_path):
                 os.remove(document.file_path)
             
-            # Delete from database
+            # Delete cached generations, answers, summary tree and chat sessions, then the record
+            generation_cache.invalidate_collection(db, document.collection_name)
+            answer_cache.invalidate(document.collection_name)
+            session_retrieval_cache.invalidate(document.collection_name)
+            SummaryTreeBuilder.delete_tree(db, document.id)
+            db.query(ChatSession).filter(ChatSession.document_id == document.id).delete()
             db.delete(document)
             db.commit()
             
@@ -0,0 +1,213 @@
+"""
+Persistent cache for generated summaries and quizzes
+Identical requests for the same document reuse the stored result
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Optional, Dict
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..models.generation_cache import GenerationCacheEntry
+
+
+class GenerationCache:
+    """Database-backed result cache with TTL and LRU size limit"""
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        enabled: Optional[bool] = None
+    ):
+        """
+        Initialize cache
+
+        Args:
+            ttl_seconds: Lifetime of an entry (defaults to settings)
+            max_entries: Entries kept before least recently used ones are evicted
+            enabled: Whether lookups and stores happen at all
+        """
+        self.ttl_seconds = ttl_seconds or settings.GENERATION_CACHE_TTL
+        self.max_entries = max_entries or settings.GENERATION_CACHE_MAX_ENTRIES
+        self.enabled = settings.GENERATION_CACHE_ENABLED if enabled is None else enabled
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(
+        collection_name: str,
+        kind: str,
+        params: Dict,
+        prompt_version: int,
+        model: str
+    ) -> str:
+        """
+        Build the cache key
+
+        Args:
+            collection_name: Document collection the result was generated from
+            kind: Result type (summary, quiz)
+            params: Request parameters that affect the result
+            prompt_version: Version of the prompt template
+            model: Provider and model name
+
+        Returns:
+            Hex digest identifying the result
+        """
+        payload = json.dumps(
+            [collection_name, kind, params, prompt_version, model],
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, db: Session, cache_key: str) -> Optional[Dict]:
+        """
+        Look up a cached result
+
+        Args:
+            db: Database session
+            cache_key: Key from make_key
+
+        Returns:
+            Cached result, or None on a miss or expired entry
+        """
+        if not self.enabled:
+            return None
+
+        entry = db.query(GenerationCacheEntry).filter(
+            GenerationCacheEntry.cache_key == cache_key
+        ).first()
+        now = datetime.utcnow()
+
+        if entry and entry.expires_at and entry.expires_at <= now:
+            db.delete(entry)
+            db.commit()
+            entry = None
+
+        if not entry:
+            self.misses += 1
+            return None
+
+        entry.hits = (entry.hits or 0) + 1
+        entry.last_used_at = now
+        db.commit()
+
+        self.hits += 1
+        return json.loads(entry.result)
+
+    def set(
+        self,
+        db: Session,
+        cache_key: str,
+        collection_name: str,
+        kind: str,
+        params: Dict,
+        prompt_version: int,
+        model: str,
+        result: Dict
+    ):
+        """
+        Store a result, evicting least recently used entries over the limit
+
+        Args:
+            db: Database session
+            cache_key: Key from make_key
+            collection_name: Document collection
+            kind: Result type
+            params: Request parameters
+            prompt_version: Version of the prompt template
+            model: Provider and model name
+            result: JSON-serializable result
+        """
+        if not self.enabled:
+            return
+
+        now = datetime.utcnow()
+        entry = db.query(GenerationCacheEntry).filter(
+            GenerationCacheEntry.cache_key == cache_key
+        ).first()
+
+        if not entry:
+            entry = GenerationCacheEntry(cache_key=cache_key)
+            db.add(entry)
+
+        entry.collection_name = collection_name
+        entry.kind = kind
+        entry.params = json.dumps(params, sort_keys=True)
+        entry.prompt_version = prompt_version
+        entry.model = model
+        entry.result = json.dumps(result)
+        entry.hits = 0
+        entry.created_at = now
+        entry.last_used_at = now
+        entry.expires_at = now + timedelta(seconds=self.ttl_seconds)
+        db.commit()
+        self.stores += 1
+
+        self._evict(db)
+
+    def _evict(self, db: Session):
+        """Delete expired entries and the least recently used ones over max_entries"""
+        now = datetime.utcnow()
+        expired = db.query(GenerationCacheEntry).filter(
+            GenerationCacheEntry.expires_at <= now
+        ).delete(synchronize_session=False)
+
+        overflow = db.query(GenerationCacheEntry).count() - self.max_entries
+        if overflow > 0:
+            oldest = db.query(GenerationCacheEntry.id).order_by(
+                GenerationCacheEntry.last_used_at
+            ).limit(overflow).all()
+            db.query(GenerationCacheEntry).filter(
+                GenerationCacheEntry.id.in_([row.id for row in oldest])
+            ).delete(synchronize_session=False)
+        else:
+            overflow = 0
+
+        if expired or overflow:
+            db.commit()
+            self.evictions += expired + overflow
+
+    def invalidate_collection(self, db: Session, collection_name: str) -> int:
+        """
+        Delete every result generated from a collection
+
+        Does not commit, so it can share the caller's transaction.
+
+        Args:
+            db: Database session
+            collection_name: Document collection
+
+        Returns:
+            Number of entries deleted
+        """
+        deleted = db.query(GenerationCacheEntry).filter(
+            GenerationCacheEntry.collection_name == collection_name
+        ).delete(synchronize_session=False)
+        self.invalidations += deleted
+        return deleted
+
+    def stats(self) -> Dict:
+        """Snapshot of cache metrics"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+
+# Shared instance so routers and services report one set of metrics
+generation_cache = GenerationCache()
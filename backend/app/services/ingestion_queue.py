@@ -0,0 +1,277 @@
+"""
+Background ingestion job queue
+Uploads are persisted as jobs and processed by a bounded worker pool
+"""
+import asyncio
+import logging
+import uuid
+from typing import Optional, List, Dict
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.executors import pdf_executor, ExecutorSaturatedError
+from ..models.ingestion_job import IngestionJob
+from .document_service import DocumentService
+from .summary_tree import SummaryTreeBuilder
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionQueue:
+    """Queue and process document ingestion jobs in the background"""
+
+    # Share of job progress reported by processing when a summary tree follows
+    PROCESSING_SHARE = 0.8
+
+    def __init__(
+        self,
+        document_service: DocumentService,
+        num_workers: Optional[int] = None,
+        summary_builder: Optional[SummaryTreeBuilder] = None
+    ):
+        """
+        Initialize ingestion queue
+
+        Args:
+            document_service: Service that performs the actual processing
+            num_workers: Number of concurrent jobs (defaults to settings)
+            summary_builder: Builds each document's summary tree after
+                processing (no tree if None)
+        """
+        self.document_service = document_service
+        self.summary_builder = summary_builder
+        self.num_workers = num_workers or settings.INGESTION_WORKERS
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        
+        # Jobs put back because the PDF pool was full: job ID -> attempts so far
+        self._deferred: Dict[str, int] = {}
+
+    async def start(self):
+        """Start workers and re-enqueue jobs left unfinished by a previous run"""
+        if self.workers:
+            return
+
+        self.queue = asyncio.Queue()
+
+        db = SessionLocal()
+        try:
+            pending = db.query(IngestionJob).filter(
+                IngestionJob.status.in_(["pending", "running"])
+            ).order_by(IngestionJob.created_at).all()
+
+            for job in pending:
+                # Jobs interrupted mid-run restart from the beginning, or from
+                # summarizing if the document was already stored
+                job.status = "pending"
+                job.stage = "queued"
+                job.progress = 0.0
+                self.queue.put_nowait(job.id)
+
+            db.commit()
+
+            if pending:
+                logger.info(f"Resuming {len(pending)} pending ingestion jobs")
+        finally:
+            db.close()
+
+        self.workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.num_workers)
+        ]
+
+    async def stop(self):
+        """Cancel workers; unfinished jobs stay pending in the database"""
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def create_job(
+        self,
+        db: Session,
+        user_id: int,
+        original_filename: str,
+        file_path: str,
+        file_size: int,
+        content_hash: Optional[str] = None
+    ) -> IngestionJob:
+        """
+        Persist a new pending job
+
+        Args:
+            db: Database session
+            user_id: User ID
+            original_filename: Name the user uploaded the file as
+            file_path: Path of the stored PDF
+            file_size: File size in bytes
+            content_hash: SHA-256 of the file, if already known
+
+        Returns:
+            Created job record
+        """
+        job = IngestionJob(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            original_filename=original_filename,
+            file_path=file_path,
+            file_size=file_size,
+            content_hash=content_hash,
+            status="pending",
+            stage="queued",
+            progress=0.0
+        )
+
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        return job
+
+    async def enqueue(self, job_id: str):
+        """Hand a persisted job to the worker pool"""
+        await self.queue.put(job_id)
+
+    def get_job(self, job_id: str, user_id: int, db: Session) -> Optional[IngestionJob]:
+        """Get job by ID"""
+        return db.query(IngestionJob).filter(
+            IngestionJob.id == job_id,
+            IngestionJob.user_id == user_id
+        ).first()
+
+    async def _worker(self, worker_id: int):
+        """Take jobs off the queue and run them in the PDF pool"""
+        while True:
+            job_id = await self.queue.get()
+            try:
+                document_id = await pdf_executor.run(self._run_job, job_id)
+                self._deferred.pop(job_id, None)
+                if document_id is not None:
+                    await self._summarize(job_id, document_id)
+            except ExecutorSaturatedError as e:
+                self._defer(job_id, e)
+            except Exception as e:
+                logger.error(f"Ingestion worker {worker_id} failed on job {job_id}: {e}")
+                self.fail_job(job_id, f"Ingestion failed: {str(e)}")
+            finally:
+                self.queue.task_done()
+
+    def _defer(self, job_id: str, error: ExecutorSaturatedError):
+        """Put a job back on the queue after a backoff, or fail it after too many tries"""
+        attempts = self._deferred.get(job_id, 0) + 1
+        if attempts > settings.INGESTION_SATURATED_RETRIES:
+            self._deferred.pop(job_id, None)
+            self.fail_job(job_id, f"Server busy, please upload again: {str(error)}")
+            return
+
+        self._deferred[job_id] = attempts
+        delay = min(settings.INGESTION_RETRY_MAX_DELAY, settings.INGESTION_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+        logger.warning(f"PDF pool busy, retrying ingestion job {job_id} in {delay:.1f}s (attempt {attempts})")
+        asyncio.get_running_loop().call_later(delay, self.queue.put_nowait, job_id)
+
+    def fail_job(self, job_id: str, message: str):
+        """Mark an unfinished job failed so clients stop waiting for it"""
+        db = SessionLocal()
+        try:
+            job = db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+            if job and job.status in ("pending", "running"):
+                job.status = "failed"
+                job.error = message
+                db.commit()
+        except Exception as e:
+            logger.error(f"Could not mark ingestion job {job_id} failed: {e}")
+        finally:
+            db.close()
+
+    def _run_job(self, job_id: str) -> Optional[int]:
+        """
+        Process a single job (blocking)
+
+        Returns:
+            Document ID if its summary tree still has to be built, else None
+        """
+        db = SessionLocal()
+        try:
+            job = db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+
+            if not job or job.status not in ("pending", "running"):
+                return None
+
+            job.status = "running"
+            db.commit()
+
+            if job.document_id is not None:
+                return self._finish_processing(job, db, job.document_id)
+
+            share = self.PROCESSING_SHARE if self.summary_builder else 1.0
+
+            def update_progress(stage: str, progress: float):
+                job.stage = stage
+                job.progress = progress * share
+                db.commit()
+
+            try:
+                document = self.document_service.process_file(
+                    file_path=job.file_path,
+                    original_filename=job.original_filename,
+                    user_id=job.user_id,
+                    db=db,
+                    file_size=job.file_size,
+                    content_hash=job.content_hash,
+                    progress_callback=update_progress
+                )
+
+                job.document_id = document.id
+            except Exception as e:
+                db.rollback()
+                job.status = "failed"
+                job.error = str(e)
+                logger.error(f"Ingestion job {job_id} failed: {e}")
+                db.commit()
+                return None
+
+            return self._finish_processing(job, db, document.id)
+        finally:
+            db.close()
+
+    def _finish_processing(self, job: IngestionJob, db: Session, document_id: int) -> Optional[int]:
+        """Complete the job, or move it to summarizing if a tree is built"""
+        if self.summary_builder:
+            job.stage = "summarizing"
+            job.progress = self.PROCESSING_SHARE
+            db.commit()
+            return document_id
+
+        job.status = "completed"
+        job.stage = "done"
+        job.progress = 1.0
+        db.commit()
+        return None
+
+    async def _summarize(self, job_id: str, document_id: int):
+        """
+        Build the document's summary tree as the last stage of its job
+
+        The document is already usable, so a failed build is recorded on the
+        job without failing it; summaries then fall back to retrieval.
+        """
+        db = SessionLocal()
+        try:
+            job = db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+
+            def update_progress(fraction: float):
+                job.progress = self.PROCESSING_SHARE + (1.0 - self.PROCESSING_SHARE) * fraction
+                db.commit()
+
+            try:
+                await self.summary_builder.build(document_id, progress_callback=update_progress)
+            except Exception as e:
+                db.rollback()
+                job.error = f"Summary tree failed: {str(e)}"
+                logger.warning(f"Summary tree for job {job_id} failed: {e}")
+
+            job.status = "completed"
+            job.stage = "done"
+            job.progress = 1.0
+            db.commit()
+        finally:
+            db.close()
@@ -0,0 +1,110 @@
+"""
+Structured errors for LLM provider calls
+"""
+from typing import Optional
+
+
+class LLMError(Exception):
+    """
+    Base class for LLM failures
+
+    Attributes:
+        provider: Provider name
+        status_code: Upstream HTTP status, if any
+        retryable: Whether the same call may succeed if tried again
+        retry_after: Seconds the provider asked us to wait, if given
+    """
+
+    code = "llm_error"
+    http_status = 502
+    retryable = False
+
+    def __init__(
+        self,
+        message: str,
+        provider: str = "",
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None
+    ):
+        super().__init__(message)
+        self.provider = provider
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LLMRateLimitError(LLMError):
+    """Provider rejected the call for quota or rate (429)"""
+
+    code = "llm_rate_limited"
+    http_status = 503
+    retryable = True
+
+
+class LLMUnavailableError(LLMError):
+    """Provider overloaded, erroring (5xx) or unreachable"""
+
+    code = "llm_unavailable"
+    http_status = 503
+    retryable = True
+
+
+class LLMTimeoutError(LLMError):
+    """Call did not finish within LLM_TIMEOUT"""
+
+    code = "llm_timeout"
+    http_status = 504
+    retryable = True
+
+
+class LLMRequestError(LLMError):
+    """Provider rejected the request itself (other 4xx); retrying will not help"""
+
+    code = "llm_bad_request"
+    http_status = 502
+
+
+class LLMCircuitOpenError(LLMError):
+    """Provider has failed repeatedly; calls are refused until the cooldown ends"""
+
+    code = "llm_circuit_open"
+    http_status = 503
+
+
+def error_for_status(
+    provider: str,
+    status_code: int,
+    body: str,
+    retry_after: Optional[float] = None
+) -> LLMError:
+    """
+    Map an upstream HTTP status to an LLMError
+
+    Args:
+        provider: Provider name
+        status_code: HTTP status of the response
+        body: Response text (truncated into the message)
+        retry_after: Parsed Retry-After header, if any
+
+    Returns:
+        Error instance to raise
+    """
+    message = f"{provider} returned {status_code}: {body[:500]}"
+
+    if status_code == 429:
+        error_class = LLMRateLimitError
+    elif status_code == 408 or status_code >= 500:
+        error_class = LLMUnavailableError
+    else:
+        error_class = LLMRequestError
+
+    return error_class(message, provider=provider, status_code=status_code, retry_after=retry_after)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (HTTP dates are ignored)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
@@ -0,0 +1,583 @@
+"""
+Async LLM provider clients
+
+Each provider keeps one pooled keep-alive HTTP client and a semaphore that
+caps concurrent upstream calls, so many concurrent requests share a few
+sockets instead of holding a thread each. Calls are retried with jittered
+backoff, optionally hedged after a latency percentile, and refused while
+the provider's circuit breaker is open. Failures raise LLMError subclasses.
+"""
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from typing import Optional, Dict, AsyncIterator
+import httpx
+import openai
+from openai import AsyncOpenAI
+from ..core.config import settings
+from .llm_errors import (
+    LLMError, LLMTimeoutError, LLMUnavailableError, error_for_status, parse_retry_after
+)
+from .llm_resilience import CircuitBreaker, LatencyWindow, backoff_delay, hedged
+from .mock_llm import mock_response, sample_latency
+from ..utils.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+
+class LLMProvider:
+    """Base class for async providers"""
+
+    name = ""
+    default_model = ""
+
+    def __init__(self, max_concurrency: int, model_name: Optional[str] = None):
+        """
+        Initialize provider
+
+        Args:
+            max_concurrency: Maximum in-flight upstream calls
+            model_name: Model to call (defaults to default_model)
+        """
+        self.model_name = model_name or self.default_model
+        self.max_concurrency = max_concurrency
+
+        # Client and semaphore are bound to the event loop that created them
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._http: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.breaker = CircuitBreaker(
+            self.name,
+            failure_threshold=settings.LLM_BREAKER_FAILURES,
+            cooldown=settings.LLM_BREAKER_COOLDOWN
+        )
+        self.latency = LatencyWindow()
+        self.outcomes = deque(maxlen=settings.LLM_ROUTER_WINDOW)  # True per success, False per transient failure
+        self.last_failure_at = 0.0  # time.monotonic() of the last transient failure
+
+        # Metrics
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.streams = 0
+        self.total_ttft_seconds = 0.0
+        self.retries = 0
+        self.hedges = 0
+
+    def _ensure_client(self):
+        """Create the HTTP client and semaphore for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_KEEPALIVE_CONNECTIONS
+                )
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._on_new_client()
+
+    def _on_new_client(self):
+        """Hook for providers that wrap the HTTP client"""
+        pass
+
+    @property
+    def backend_id(self) -> str:
+        """Provider and model, e.g. gemini:gemini-2.5-flash"""
+        return f"{self.name}:{self.model_name}"
+
+    def is_configured(self) -> bool:
+        """Whether credentials for this provider are set"""
+        return True
+
+    def error_rate(self) -> float:
+        """Share of recent attempts that failed transiently"""
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def _record_outcome(self, error: Optional[LLMError] = None):
+        """Track health for routing; requests rejected as invalid say nothing about the backend"""
+        if error is None:
+            self.outcomes.append(True)
+        elif error.retryable:
+            self.outcomes.append(False)
+            self.last_failure_at = time.monotonic()
+
+    async def _acquire(self):
+        """Wait for a concurrency slot"""
+        self._ensure_client()
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+    async def _acquire_for(self, trial: bool):
+        """Wait for a slot, handing back a half-open trial if the wait is cancelled or fails"""
+        try:
+            await self._acquire()
+        except BaseException:
+            if trial:
+                self.breaker.release_trial()
+            raise
+
+    def _map_error(self, error: Exception) -> LLMError:
+        """Convert a client exception into an LLMError"""
+        if isinstance(error, LLMError):
+            return error
+        if isinstance(error, httpx.TimeoutException):
+            return LLMTimeoutError(f"{self.name} request timed out: {error}", provider=self.name)
+        if isinstance(error, httpx.TransportError):
+            return LLMUnavailableError(f"{self.name} connection failed: {error}", provider=self.name)
+        return LLMError(f"{self.name} request failed: {error}", provider=self.name)
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds before a hedged backup call, or None if hedging is off or unwarmed"""
+        if not settings.LLM_HEDGE_ENABLED or len(self.latency) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        if self.breaker.state != "closed":
+            return None
+        return self.latency.percentile(settings.LLM_HEDGE_PERCENTILE)
+
+    def _count_hedge(self):
+        self.hedges += 1
+
+    def _retry_delay(self, attempt: int, error: LLMError) -> Optional[float]:
+        """Backoff before the next attempt, or None if the error must be raised"""
+        if not error.retryable or attempt >= settings.LLM_MAX_RETRIES:
+            return None
+        return backoff_delay(
+            attempt,
+            settings.LLM_RETRY_BASE_DELAY,
+            settings.LLM_RETRY_MAX_DELAY,
+            error.retry_after
+        )
+
+    async def _attempt(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        """One upstream call through the circuit breaker and concurrency limit"""
+        trial = self.breaker.before_call()
+        await self._acquire_for(trial)
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            text = await asyncio.wait_for(
+                self._request(prompt, max_tokens, temperature),
+                timeout=settings.LLM_TIMEOUT
+            )
+        except asyncio.CancelledError:
+            if trial:
+                self.breaker.release_trial()
+            raise
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            error = LLMTimeoutError(
+                f"{self.name} request timed out after {settings.LLM_TIMEOUT}s", provider=self.name
+            )
+        except Exception as e:
+            error = self._map_error(e)
+        else:
+            self.completed += 1
+            self.breaker.record_success()
+            self.latency.record(time.perf_counter() - started)
+            self._record_outcome()
+            return text
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+        self.failed += 1
+        self.breaker.record_failure(error)
+        self._record_outcome(error)
+        raise error
+
+    async def agenerate(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        """
+        Generate text, retrying transient failures
+
+        Retryable errors (429, 5xx, timeouts, connection failures) are
+        retried up to LLM_MAX_RETRIES times with full-jitter backoff,
+        honouring Retry-After. With LLM_HEDGE_ENABLED, an attempt still
+        running after the LLM_HEDGE_PERCENTILE latency of recent calls gets
+        a backup call and the first success wins.
+
+        Args:
+            prompt: Full prompt
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+
+        Returns:
+            Generated text
+
+        Raises:
+            LLMError: Final failure, or LLMCircuitOpenError without calling upstream
+        """
+        attempt = 0
+        while True:
+            try:
+                return await hedged(
+                    lambda: self._attempt(prompt, max_tokens, temperature),
+                    self._hedge_delay(),
+                    on_hedge=self._count_hedge
+                )
+            except LLMError as e:
+                delay = self._retry_delay(attempt, e)
+                if delay is None:
+                    raise
+                self.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _stream_attempt(self, prompt: str, max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        """One streaming upstream call through the circuit breaker and concurrency limit"""
+        trial = self.breaker.before_call()
+        await self._acquire_for(trial)
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        first = True
+        try:
+            async for text in self._stream(prompt, max_tokens, temperature):
+                if not text:
+                    continue
+                if first:
+                    first = False
+                    self.streams += 1
+                    self.total_ttft_seconds += time.perf_counter() - started
+                yield text
+            self.completed += 1
+            self.breaker.record_success()
+            self._record_outcome()
+        except (asyncio.CancelledError, GeneratorExit):
+            self.cancelled += 1
+            if trial:
+                self.breaker.release_trial()
+            raise
+        except Exception as e:
+            self.failed += 1
+            error = self._map_error(e)
+            self.breaker.record_failure(error)
+            self._record_outcome(error)
+            raise error
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def astream(self, prompt: str, max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        """
+        Stream generated text as it arrives
+
+        The concurrency slot is held for the whole stream. Closing or
+        cancelling the iterator closes the upstream connection. Failures
+        before the first fragment are retried like agenerate; once text has
+        been yielded, errors are raised.
+
+        Args:
+            prompt: Full prompt
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+
+        Yields:
+            Text fragments
+        """
+        attempt = 0
+        while True:
+            yielded = False
+            try:
+                async for text in self._stream_attempt(prompt, max_tokens, temperature):
+                    yielded = True
+                    yield text
+                return
+            except LLMError as e:
+                delay = None if yielded else self._retry_delay(attempt, e)
+                if delay is None:
+                    raise
+                self.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _request(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        """Perform one upstream call"""
+        raise NotImplementedError
+
+    def _stream(self, prompt: str, max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        """Perform one streaming upstream call"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        """Snapshot of provider metrics"""
+        return {
+            "model": self.model_name,
+            "max_concurrency": self.max_concurrency,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "error_rate": round(self.error_rate(), 3),
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "p50_ms": round(1000 * (self.latency.percentile(50) or 0), 2),
+            "p95_ms": round(1000 * (self.latency.percentile(95) or 0), 2),
+            "circuit": self.breaker.stats(),
+            "avg_ttft_ms": round(1000 * self.total_ttft_seconds / self.streams, 2) if self.streams else 0.0
+        }
+
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._http is not None:
+            await self._http.aclose()
+        self._loop = None
+        self._http = None
+
+
+class GeminiProvider(LLMProvider):
+    """Gemini via the generateContent REST endpoint"""
+
+    name = "gemini"
+    default_model = "gemini-2.5-flash"
+    BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+    def is_configured(self) -> bool:
+        return bool(settings.GOOGLE_API_KEY)
+
+    def _body(self, prompt: str, max_tokens: int, temperature: float) -> Dict:
+        return {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {
+                "maxOutputTokens": max_tokens,
+                "temperature": temperature
+            }
+        }
+
+    @staticmethod
+    def _text(payload: Dict) -> str:
+        """Text of the first candidate in a response payload"""
+        candidates = payload.get("candidates") or []
+        if not candidates:
+            return ""
+
+        parts = candidates[0].get("content", {}).get("parts") or []
+        return "".join(part.get("text", "") for part in parts)
+
+    async def _request(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        response = await self._http.post(
+            f"{self.BASE_URL}/models/{self.model_name}:generateContent",
+            headers={"x-goog-api-key": settings.GOOGLE_API_KEY},
+            json=self._body(prompt, max_tokens, temperature)
+        )
+
+        if response.status_code != 200:
+            raise error_for_status(
+                self.name,
+                response.status_code,
+                response.text,
+                parse_retry_after(response.headers.get("retry-after"))
+            )
+
+        return self._text(response.json())
+
+    async def _stream(self, prompt: str, max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        async with self._http.stream(
+            "POST",
+            f"{self.BASE_URL}/models/{self.model_name}:streamGenerateContent",
+            params={"alt": "sse"},
+            headers={"x-goog-api-key": settings.GOOGLE_API_KEY},
+            json=self._body(prompt, max_tokens, temperature)
+        ) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                raise error_for_status(
+                    self.name,
+                    response.status_code,
+                    body[:500].decode(errors="replace"),
+                    parse_retry_after(response.headers.get("retry-after"))
+                )
+
+            async for line in response.aiter_lines():
+                if line.startswith("data:"):
+                    yield self._text(json.loads(line[5:]))
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI chat completions over the shared HTTP client"""
+
+    name = "openai"
+    default_model = "gpt-3.5-turbo"
+
+    def is_configured(self) -> bool:
+        return bool(settings.OPENAI_API_KEY)
+
+    def _on_new_client(self):
+        # Retries are handled by agenerate, not the SDK
+        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, http_client=self._http, max_retries=0)
+
+    def _map_error(self, error: Exception) -> LLMError:
+        if isinstance(error, openai.APITimeoutError):
+            return LLMTimeoutError(f"openai request timed out: {error}", provider=self.name)
+        if isinstance(error, openai.APIConnectionError):
+            return LLMUnavailableError(f"openai connection failed: {error}", provider=self.name)
+        if isinstance(error, openai.APIStatusError):
+            return error_for_status(
+                self.name,
+                error.status_code,
+                str(error),
+                parse_retry_after(error.response.headers.get("retry-after"))
+            )
+        return super()._map_error(error)
+
+    async def _request(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        response = await self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": "You are a helpful AI tutor assistant."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        return response.choices[0].message.content
+
+    async def _stream(self, prompt: str, max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        stream = await self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": "You are a helpful AI tutor assistant."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True
+        )
+
+        try:
+            async for chunk in stream:
+                if chunk.choices:
+                    yield chunk.choices[0].delta.content or ""
+        finally:
+            await stream.response.aclose()
+
+
+class MockProvider(LLMProvider):
+    """
+    Offline provider with canned responses, for benchmarks and load tests
+
+    Responses depend only on the prompt (see mock_llm). Each call waits a
+    time to first token drawn from MOCK_LLM_LATENCY_* and then emits
+    tokens at MOCK_LLM_TOKENS_PER_SECOND, so retries, hedging, concurrency
+    limits and streaming behave as with a real API.
+    """
+
+    name = "mock"
+    default_model = "mock-1"
+
+    # Tokens per streamed fragment
+    CHUNK_TOKENS = 4
+
+    def __init__(self, max_concurrency: int, model_name: Optional[str] = None):
+        super().__init__(max_concurrency, model_name)
+        self._rng = random.Random(settings.MOCK_LLM_SEED)
+
+    def _ensure_client(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def _first_token_delay(self) -> float:
+        """Draw a latency, raising an injected 503 at MOCK_LLM_ERROR_RATE"""
+        if self._rng.random() < settings.MOCK_LLM_ERROR_RATE:
+            raise error_for_status(self.name, 503, "injected mock failure", retry_after=None)
+        return sample_latency(
+            self._rng,
+            settings.MOCK_LLM_LATENCY_DISTRIBUTION,
+            settings.MOCK_LLM_LATENCY_MS / 1000,
+            settings.MOCK_LLM_LATENCY_SPREAD
+        )
+
+    @staticmethod
+    def _token_seconds(tokens: int) -> float:
+        rate = settings.MOCK_LLM_TOKENS_PER_SECOND
+        return tokens / rate if rate > 0 else 0.0
+
+    def respond(self, prompt: str, max_tokens: int) -> str:
+        """Canned response without waiting (also used by LLMService.generate)"""
+        return mock_response(prompt, max_tokens, settings.MOCK_LLM_RESPONSE_WORDS)
+
+    def generate_blocking(self, prompt: str, max_tokens: int) -> str:
+        """Synchronous call for scripts, sleeping for the simulated latency"""
+        text = self.respond(prompt, max_tokens)
+        time.sleep(self._first_token_delay() + self._token_seconds(estimate_tokens(text)))
+        return text
+
+    async def _request(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        text = self.respond(prompt, max_tokens)
+        await asyncio.sleep(self._first_token_delay() + self._token_seconds(estimate_tokens(text)))
+        return text
+
+    async def _stream(self, prompt: str, max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        text = self.respond(prompt, max_tokens)
+        await asyncio.sleep(self._first_token_delay())
+
+        size = self.CHUNK_TOKENS * CHARS_PER_TOKEN
+        for start in range(0, len(text), size):
+            chunk = text[start:start + size]
+            await asyncio.sleep(self._token_seconds(estimate_tokens(chunk)))
+            yield chunk
+
+
+PROVIDER_CLASSES = {
+    "gemini": (GeminiProvider, lambda: settings.GEMINI_MAX_CONCURRENCY),
+    "openai": (OpenAIProvider, lambda: settings.OPENAI_MAX_CONCURRENCY),
+    "mock": (MockProvider, lambda: settings.MOCK_LLM_MAX_CONCURRENCY)
+}
+
+_providers: Dict[str, LLMProvider] = {}
+
+
+def get_provider(name: str, model_name: Optional[str] = None) -> Optional[LLMProvider]:
+    """
+    Shared provider instance, so all services use one connection pool
+
+    Each model gets its own instance (and so its own concurrency limit,
+    latency window and circuit breaker). The default model is keyed by
+    the provider name alone.
+
+    Args:
+        name: Provider name
+        model_name: Model to call (defaults to the provider's default model)
+
+    Returns:
+        Provider, or None if it has no async client
+    """
+    if name not in PROVIDER_CLASSES:
+        return None
+
+    provider_class, max_concurrency = PROVIDER_CLASSES[name]
+    model_name = model_name or provider_class.default_model
+    key = name if model_name == provider_class.default_model else f"{name}:{model_name}"
+
+    if key not in _providers:
+        _providers[key] = provider_class(max_concurrency(), model_name)
+
+    return _providers[key]
+
+
+def get_provider_stats() -> Dict:
+    """Metrics for providers that have been used"""
+    return {name: provider.stats() for name, provider in _providers.items()}
+
+
+async def close_providers():
+    """Close every provider's connections"""
+    for provider in _providers.values():
+        await provider.aclose()
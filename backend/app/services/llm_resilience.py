@@ -0,0 +1,199 @@
+"""
+Retries, hedged requests and circuit breaking for LLM calls
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional
+from .llm_errors import LLMError, LLMCircuitOpenError
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one provider
+
+    closed: calls pass. After failure_threshold consecutive retryable
+    failures the circuit opens and calls fail fast with LLMCircuitOpenError.
+    After cooldown seconds one trial call is let through (half-open); its
+    success closes the circuit, its failure opens it for another cooldown.
+    """
+
+    def __init__(self, provider: str, failure_threshold: int, cooldown: float):
+        """
+        Initialize breaker
+
+        Args:
+            provider: Provider name for error messages
+            failure_threshold: Consecutive failures that open the circuit (0 disables)
+            cooldown: Seconds to stay open before a trial call
+        """
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+        # Metrics
+        self.opens = 0
+        self.rejected = 0
+
+    def before_call(self) -> bool:
+        """
+        Raise LLMCircuitOpenError if the call must not go upstream
+
+        Returns:
+            True if this call is the half-open trial; the caller must then
+            end it with record_success, record_failure or release_trial
+        """
+        if self.failure_threshold <= 0 or self.state == "closed":
+            return False
+
+        remaining = self.opened_at + self.cooldown - time.monotonic()
+        if self.state == "open" and remaining <= 0:
+            self.state = "half_open"
+
+        if self.state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+
+        self.rejected += 1
+        raise LLMCircuitOpenError(
+            f"{self.provider} circuit open after {self.consecutive_failures} consecutive failures",
+            provider=self.provider,
+            retry_after=max(remaining, 1.0)
+        )
+
+    def record_success(self):
+        """Close the circuit"""
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self, error: Exception):
+        """Count a failure; only errors worth retrying mean the provider is unhealthy"""
+        self._trial_in_flight = False
+
+        if not isinstance(error, LLMError) or not error.retryable:
+            if self.state == "half_open":
+                self.state = "closed"
+            return
+
+        self.consecutive_failures += 1
+        if self.state == "half_open" or (
+            self.failure_threshold > 0 and self.consecutive_failures >= self.failure_threshold
+        ):
+            if self.state != "open":
+                self.opens += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """Trial call ended without a result (cancelled)"""
+        self._trial_in_flight = False
+
+    def stats(self) -> Dict:
+        """Snapshot of breaker state"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opens": self.opens,
+            "rejected": self.rejected
+        }
+
+
+class LatencyWindow:
+    """Recent successful call durations, for hedging after a percentile"""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Latency below which percent% of recent calls finished, or None without samples"""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+def backoff_delay(
+    attempt: int,
+    base: float,
+    cap: float,
+    retry_after: Optional[float] = None
+) -> float:
+    """
+    Full-jitter exponential backoff
+
+    Args:
+        attempt: Retries already made (0 for the first retry)
+        base: Delay scale in seconds
+        cap: Maximum delay
+        retry_after: Provider's requested wait, used as a floor
+
+    Returns:
+        Seconds to sleep before the next attempt
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+async def hedged(
+    call: Callable[[], Awaitable[str]],
+    hedge_after: Optional[float],
+    on_hedge: Optional[Callable[[], None]] = None
+) -> str:
+    """
+    Run call; if it has not finished after hedge_after seconds, start a
+    second identical call and return whichever succeeds first
+
+    The loser is cancelled. If one call fails the other is still awaited;
+    the error is raised only when both fail.
+
+    Args:
+        call: Coroutine function making one attempt
+        hedge_after: Delay before the backup call (None disables hedging)
+        on_hedge: Called when the backup call starts
+
+    Returns:
+        Result of the first successful call
+    """
+    primary = asyncio.ensure_future(call())
+    if hedge_after is None:
+        return await primary
+
+    tasks = {primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        if on_hedge:
+            on_hedge()
+        tasks.add(asyncio.ensure_future(call()))
+
+        error = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+        if not primary.done():
+            primary.cancel()
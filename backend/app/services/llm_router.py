@@ -0,0 +1,302 @@
+"""
+Latency- and health-aware routing of LLM calls across providers and models
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from ..core.config import settings
+from .llm_errors import LLMError, LLMCircuitOpenError
+from .llm_providers import LLMProvider, get_provider
+
+logger = logging.getLogger(__name__)
+
+# Backends are "provider:model"
+GEMINI_FLASH = "gemini:gemini-2.5-flash"
+GEMINI_FLASH_LITE = "gemini:gemini-2.5-flash-lite"
+OPENAI_DEFAULT = "openai:gpt-3.5-turbo"
+
+# strategy "fastest": healthy backend with the lowest expected latency per success
+# strategy "preferred": first healthy backend in order (cheapest or best first)
+DEFAULT_POLICIES: Dict[str, Dict] = {
+    "chat": {"strategy": "fastest", "backends": [GEMINI_FLASH, OPENAI_DEFAULT]},
+    "summary": {"strategy": "preferred", "backends": [GEMINI_FLASH, OPENAI_DEFAULT]},
+    "quiz": {"strategy": "preferred", "backends": [GEMINI_FLASH, OPENAI_DEFAULT]},
+    "study_plan": {"strategy": "preferred", "backends": [GEMINI_FLASH, OPENAI_DEFAULT]},
+    "grading": {"strategy": "preferred", "backends": [GEMINI_FLASH_LITE, OPENAI_DEFAULT, GEMINI_FLASH]},
+    "default": {"strategy": "preferred", "backends": [GEMINI_FLASH, OPENAI_DEFAULT]}
+}
+
+# Successful calls a backend needs before its latency is trusted; until then it is tried first
+MIN_LATENCY_SAMPLES = 3
+
+# Where routed calls were served, for the caller that opened trace_routes()
+_route_trace: ContextVar[Optional[Dict]] = ContextVar("llm_route_trace", default=None)
+
+
+def new_route_trace() -> Dict:
+    """Empty record of routed calls: backends that served them, and whether any was a fallback"""
+    return {"backends": [], "degraded": False}
+
+
+@contextmanager
+def trace_routes() -> Iterator[Dict]:
+    """
+    Record the backends that serve routed calls made inside the block
+
+    The trace is "degraded" if any call was served by a backend other than
+    the one the policy prefers (failover, or the preferred one unhealthy).
+    Callers use it to avoid caching fallback output as the normal result.
+    Tasks started inside the block share the trace. For async generators,
+    pass a new_route_trace() explicitly instead.
+    """
+    trace = new_route_trace()
+    token = _route_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _route_trace.reset(token)
+
+
+def merge_route_trace(trace: Dict, into: Optional[Dict] = None):
+    """Add a trace (e.g. from a shared single-flight call) to into, or to the current one"""
+    into = into if into is not None else _route_trace.get()
+    if into is None or into is trace:
+        return
+    into["backends"].extend(trace["backends"])
+    into["degraded"] = into["degraded"] or trace["degraded"]
+
+
+class LLMRouter:
+    """
+    Choose a backend per call from a task's policy
+
+    A backend is healthy when its credentials are set, its circuit is not
+    open and its recent transient error rate is below
+    LLM_ROUTER_MAX_ERROR_RATE (or its last failure is older than the
+    breaker cooldown). Candidates are ranked by the policy's
+    strategy; if the chosen backend fails with a transient error (after its
+    own retries) or has an open circuit, the next one is tried. Request
+    errors (bad prompt, auth) are raised without failover.
+    """
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, Dict]] = None,
+        providers: Optional[Dict[str, LLMProvider]] = None,
+        max_error_rate: Optional[float] = None
+    ):
+        """
+        Initialize router
+
+        Args:
+            policies: Task -> {"strategy", "backends"} (defaults plus LLM_ROUTES)
+            providers: Backend id -> provider, for stand-ins (others come from get_provider)
+            max_error_rate: Error rate above which a backend counts as unhealthy
+        """
+        if policies is None:
+            policies = {**DEFAULT_POLICIES, **settings.LLM_ROUTES}
+        self.policies = policies
+        self.providers = providers or {}
+        self.max_error_rate = max_error_rate if max_error_rate is not None else settings.LLM_ROUTER_MAX_ERROR_RATE
+
+        # Metrics
+        self.routed: Dict[str, Dict[str, int]] = {}  # task -> backend -> calls
+        self.failovers = 0
+        self.decisions = deque(maxlen=50)
+
+    def _provider(self, backend: str) -> Optional[LLMProvider]:
+        """Provider for a backend id"""
+        if backend in self.providers:
+            return self.providers[backend]
+        name, _, model = backend.partition(":")
+        return get_provider(name, model or None)
+
+    def _policy(self, task: str) -> Dict:
+        return self.policies.get(task) or self.policies["default"]
+
+    def _health(self, backend: str, provider: LLMProvider) -> Dict:
+        """Routing inputs for one backend"""
+        latency = provider.latency.percentile(50) if len(provider.latency) >= MIN_LATENCY_SAMPLES else None
+        error_rate = provider.error_rate()
+        # A high error rate only counts while failures are recent, so an idle backend gets retried
+        failing = (
+            error_rate >= self.max_error_rate
+            and time.monotonic() - provider.last_failure_at < settings.LLM_BREAKER_COOLDOWN
+        )
+        healthy = (
+            provider.is_configured()
+            and provider.breaker.state != "open"
+            and not failing
+        )
+        return {
+            "backend": backend,
+            "healthy": healthy,
+            "p50_ms": round(1000 * latency, 1) if latency is not None else None,
+            "error_rate": round(error_rate, 3),
+            # Expected time per successful call; unmeasured backends go first to get measured
+            "score": round(latency / max(1 - error_rate, 0.05), 4) if latency is not None else 0.0
+        }
+
+    def rank(self, task: str) -> Tuple[List[LLMProvider], Dict]:
+        """
+        Candidates for a task, best first
+
+        Returns:
+            (providers to try in order, decision record)
+        """
+        policy = self._policy(task)
+        candidates = []
+        for backend in policy["backends"]:
+            provider = self._provider(backend)
+            if provider is not None:
+                candidates.append((backend, provider, self._health(backend, provider)))
+
+        healthy = [c for c in candidates if c[2]["healthy"]]
+        configured = [c for c in candidates if c[1].is_configured()]
+        if policy.get("strategy") == "fastest":
+            healthy.sort(key=lambda c: c[2]["score"])
+            configured.sort(key=lambda c: c[2]["score"])
+
+        # With nothing healthy, still try configured backends in order (circuits may have cooled down)
+        ordered = healthy or [c for c in candidates if c[1].is_configured()] or candidates
+
+        decision = {
+            "task": task,
+            "strategy": policy.get("strategy", "preferred"),
+            "candidates": [c[2] for c in candidates],
+            "chosen": ordered[0][0] if ordered else None,
+            # What the policy would pick with every backend healthy
+            "preferred": configured[0][0] if configured else None,
+            "attempted": [],
+            "outcome": None,
+            "at": time.time()
+        }
+        return [c[1] for c in ordered], decision
+
+    def _record(self, decision: Dict, backend: Optional[str], outcome: str, trace: Optional[Dict] = None):
+        decision["outcome"] = outcome
+        if backend is not None:
+            per_task = self.routed.setdefault(decision["task"], {})
+            per_task[backend] = per_task.get(backend, 0) + 1
+        self.decisions.append(decision)
+        logger.debug(f"LLM route {decision['task']}: {decision['attempted']} -> {outcome}")
+        
+        if outcome == "ok":
+            trace = trace if trace is not None else _route_trace.get()
+            if trace is not None:
+                trace["backends"].append(backend)
+                trace["degraded"] = trace["degraded"] or backend != decision["preferred"]
+
+    def backends(self, task: str) -> List[str]:
+        """Backends a task's policy can route to"""
+        return list(self._policy(task)["backends"])
+
+    @staticmethod
+    def _can_fail_over(error: LLMError) -> bool:
+        return error.retryable or isinstance(error, LLMCircuitOpenError)
+
+    async def agenerate(self, task: str, prompt: str, max_tokens: int, temperature: float) -> str:
+        """
+        Generate text on the best backend for a task, failing over on transient errors
+
+        Args:
+            task: chat, summary, quiz, grading, study_plan or default
+            prompt: Full prompt
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+
+        Returns:
+            Generated text
+        """
+        providers, decision = self.rank(task)
+        if not providers:
+            raise LLMError(f"No LLM backend available for {task}")
+
+        error = None
+        for provider in providers:
+            decision["attempted"].append(provider.backend_id)
+            if error is not None:
+                self.failovers += 1
+            try:
+                text = await provider.agenerate(prompt, max_tokens, temperature)
+            except LLMError as e:
+                error = e
+                if self._can_fail_over(e):
+                    continue
+                self._record(decision, provider.backend_id, f"error: {e.code}")
+                raise
+            self._record(decision, provider.backend_id, "ok")
+            return text
+
+        self._record(decision, None, f"error: {error.code}")
+        raise error
+
+    async def astream(
+        self,
+        task: str,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        trace: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream from the best backend for a task
+
+        Fails over only before the first fragment; later errors are raised.
+        The serving backend is recorded in trace (a new_route_trace()), since
+        a generator cannot rely on the caller's trace_routes() context.
+        """
+        providers, decision = self.rank(task)
+        if not providers:
+            raise LLMError(f"No LLM backend available for {task}")
+
+        error = None
+        for provider in providers:
+            decision["attempted"].append(provider.backend_id)
+            if error is not None:
+                self.failovers += 1
+            yielded = False
+            try:
+                async for text in provider.astream(prompt, max_tokens, temperature):
+                    yielded = True
+                    yield text
+            except (asyncio.CancelledError, GeneratorExit):
+                self._record(decision, provider.backend_id, "cancelled")
+                raise
+            except LLMError as e:
+                error = e
+                if not yielded and self._can_fail_over(e):
+                    continue
+                self._record(decision, provider.backend_id, f"error: {e.code}")
+                raise
+            self._record(decision, provider.backend_id, "ok", trace)
+            return
+
+        self._record(decision, None, f"error: {error.code}")
+        raise error
+
+    def stats(self) -> Dict:
+        """Routing counts, current backend health and recent decisions"""
+        health = {}
+        for policy in self.policies.values():
+            for backend in policy["backends"]:
+                provider = self._provider(backend)
+                if provider is not None and backend not in health:
+                    health[backend] = self._health(backend, provider)
+
+        return {
+            "enabled": settings.LLM_ROUTING_ENABLED,
+            "policies": self.policies,
+            "backends": health,
+            "routed": self.routed,
+            "failovers": self.failovers,
+            "recent_decisions": list(self.decisions)[-20:]
+        }
+
+
+# Shared instance so health and decisions are tracked across all services
+llm_router = LLMRouter()
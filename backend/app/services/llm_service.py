@@ -1,21 +1,45 @@
 """
 LLM service for interacting with different AI models
 """
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, AsyncIterator, Tuple
 from ..core.config import settings
+from ..core.executors import llm_executor
+from ..utils.llm_json import extract_json_object
+from ..utils.json_stream import JsonArrayStreamParser, salvage_json_array
+from ..utils.single_flight import SingleFlight, make_flight_key
+from .llm_providers import get_provider
+from .llm_router import llm_router, trace_routes, merge_route_trace
+from .llm_errors import LLMError
 import google.generativeai as genai
 from openai import OpenAI
 
 
+# Shared by every LLMService so identical requests from any router coalesce
+generation_flights = SingleFlight(enabled=settings.SINGLE_FLIGHT_ENABLED)
+
+
 class LLMService:
-    """Service to interact with different LLM providers"""
+    """
+    Service to interact with different LLM providers
+    
+    The a-prefixed methods are async and use the pooled provider clients;
+    the plain methods use the synchronous SDKs for scripts.
+    """
+    
+    # Bump when a prompt template changes so cached results are not reused
+    PROMPT_VERSIONS = {
+        "summary": 1,
+        "quiz": 1
+    }
     
     def __init__(self, provider: Optional[str] = None):
         """
         Initialize LLM service
         
         Args:
-            provider: LLM provider (gemini, openai)
+            provider: LLM provider (gemini, openai, mock). Pins every call to it;
+                when omitted and LLM_ROUTING_ENABLED is set, async calls are
+                routed per task across providers instead.
         """
         self.provider = provider or settings.DEFAULT_LLM
         
@@ -26,6 +50,36 @@ class LLMService:
         elif self.provider == "openai":
             self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
             self.model_name = "gpt-3.5-turbo"
+        
+        self.async_provider = get_provider(self.provider)
+        self.router = llm_router if settings.LLM_ROUTING_ENABLED and provider is None else None
+    
+    @property
+    def model_id(self) -> str:
+        """Provider and model name, e.g. gemini:gemini-2.5-flash ("router" when routed)"""
+        if self.router is not None:
+            return "router"
+        if self.async_provider is not None:
+            return f"{self.provider}:{self.async_provider.model_name}"
+        return self.provider
+    
+    def model_id_for(self, task: str) -> str:
+        """
+        Model identity for cache keys of a task
+        
+        When routed, this names the task's policy backends; results served
+        by a fallback backend are flagged by trace_routes and not cached.
+        """
+        if self.router is not None:
+            return "router:" + ",".join(self.router.backends(task))
+        return self.model_id
+    
+    @staticmethod
+    def _build_prompt(prompt: str, context: Optional[str] = None) -> str:
+        """Combine prompt with optional RAG context"""
+        if context:
+            return f"Context:\n{context}\n\nQuestion: {prompt}\n\nAnswer:"
+        return prompt
     
     def generate(
         self,
@@ -46,10 +100,7 @@ class LLMService:
         Returns:
             Generated text response
         """
-        # Build full prompt with context
-        full_prompt = prompt
-        if context:
-            full_prompt = f"Context:\n{context}\n\nQuestion: {prompt}\n\nAnswer:"
+        full_prompt = self._build_prompt(prompt, context)
         
         try:
             if self.provider == "gemini":
@@ -89,12 +140,187 @@ class LLMService:
                 )
                 return response.choices[0].message.content
             
+            elif self.provider == "mock":
+                return self.async_provider.generate_blocking(full_prompt, max_tokens)
+            
             else:
                 return "Unsupported LLM provider"
                 
         except Exception as e:
             raise Exception(f"LLM generation failed: {str(e)}")
     
+    async def agenerate(
+        self,
+        prompt: str,
+        context: Optional[str] = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        task: str = "default"
+    ) -> str:
+        """
+        Generate text without blocking the event loop
+        
+        Uses the provider's pooled async client, concurrency limit, retries
+        and circuit breaker. Providers without an async client fall back to
+        generate in the LLM thread pool.
+        
+        Args:
+            prompt: User prompt/question
+            context: Additional context for RAG
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            task: Routing policy (chat, summary, quiz, grading, study_plan, default)
+            
+        Returns:
+            Generated text response
+            
+        Raises:
+            LLMError: Provider failure after retries (see llm_errors for subtypes)
+        """
+        if self.router is not None:
+            return await self.router.agenerate(
+                task,
+                self._build_prompt(prompt, context),
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+        
+        if self.async_provider is None:
+            return await llm_executor.run(self.generate, prompt, context, max_tokens, temperature)
+        
+        try:
+            return await self.async_provider.agenerate(
+                self._build_prompt(prompt, context),
+                max_tokens=max_tokens,
+                temperature=temperature
+            )
+        except LLMError:
+            raise
+        except Exception as e:
+            raise LLMError(f"LLM generation failed: {str(e)}", provider=self.provider)
+    
+    async def agenerate_shared(
+        self,
+        prompt: str,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        task: str = "default"
+    ) -> str:
+        """
+        agenerate, sharing one upstream call with identical concurrent requests
+        
+        Requests are identical when provider, model, prompt and sampling
+        parameters match. Every caller gets the same text and parses it
+        separately.
+        
+        Args:
+            prompt: Full prompt
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            task: Routing policy
+            
+        Returns:
+            Generated text response
+        """
+        key = make_flight_key(
+            model=self.model_id_for(task),
+            task=task,
+            prompt=prompt,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        
+        async def call():
+            # The shared call runs in its own task; its route is handed to every waiter
+            with trace_routes() as trace:
+                text = await self.agenerate(prompt, max_tokens=max_tokens, temperature=temperature, task=task)
+            return text, trace
+        
+        text, trace = await generation_flights.do(key, call)
+        merge_route_trace(trace)
+        return text
+    
+    async def astream(
+        self,
+        prompt: str,
+        context: Optional[str] = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        task: str = "default",
+        route: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream generated text as the provider produces it
+        
+        Closing the iterator cancels the upstream request. Providers without
+        an async client yield the whole response at once.
+        
+        Args:
+            prompt: User prompt/question
+            context: Additional context for RAG
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            task: Routing policy (chat, summary, quiz, grading, study_plan, default)
+            route: new_route_trace() to record the serving backend in, when routed
+            
+        Yields:
+            Text fragments
+        """
+        if self.router is not None:
+            async for text in self.router.astream(
+                task,
+                self._build_prompt(prompt, context),
+                max_tokens=max_tokens,
+                temperature=temperature,
+                trace=route
+            ):
+                yield text
+            return
+        
+        if self.async_provider is None:
+            yield await self.agenerate(prompt, context, max_tokens, temperature)
+            return
+        
+        try:
+            async for text in self.async_provider.astream(
+                self._build_prompt(prompt, context),
+                max_tokens=max_tokens,
+                temperature=temperature
+            ):
+                yield text
+        except LLMError:
+            raise
+        except Exception as e:
+            raise LLMError(f"LLM generation failed: {str(e)}", provider=self.provider)
+    
+    @staticmethod
+    def _summary_prompt(text: str, summary_type: str) -> str:
+        """Build summary prompt"""
+        prompts = {
+            "concise": f"Provide a concise summary of the following text:\n\n{text}",
+            "detailed": f"Provide a detailed summary covering all key points:\n\n{text}",
+            "bullet_points": f"Summarize the following text in bullet points:\n\n{text}"
+        }
+        
+        return prompts.get(summary_type, prompts["concise"])
+    
+    @staticmethod
+    def _combine_summaries_prompt(summaries: List[str], summary_type: str) -> str:
+        """Build the prompt that merges section summaries into one summary"""
+        instructions = {
+            "concise": "Write one concise summary of the whole document",
+            "detailed": "Write one detailed summary of the whole document covering all key points",
+            "bullet_points": "Summarize the whole document in bullet points"
+        }
+        sections = "\n\n".join(
+            f"Section {i}:\n{summary}" for i, summary in enumerate(summaries, 1)
+        )
+        
+        return f"""The following are summaries of consecutive sections of one document, in order.
+{instructions.get(summary_type, instructions["concise"])}, merging repeated points and keeping the document's overall structure.
+
+{sections}"""
+    
     def generate_summary(
         self,
         text: str,
@@ -110,34 +336,45 @@ class LLMService:
         Returns:
             Generated summary
         """
-        prompts = {
-            "concise": f"Provide a concise summary of the following text:\n\n{text}",
-            "detailed": f"Provide a detailed summary covering all key points:\n\n{text}",
-            "bullet_points": f"Summarize the following text in bullet points:\n\n{text}"
-        }
-        
-        prompt = prompts.get(summary_type, prompts["concise"])
-        return self.generate(prompt, max_tokens=2048)
+        return self.generate(self._summary_prompt(text, summary_type), max_tokens=2048)
     
-    def generate_quiz(
+    async def agenerate_summary(
         self,
         text: str,
-        num_questions: int = 5,
-        difficulty: str = "medium",
-        question_types: Optional[List[str]] = None
-    ) -> Dict:
+        summary_type: str = "concise"
+    ) -> str:
+        """Async version of generate_summary"""
+        return await self.agenerate_shared(self._summary_prompt(text, summary_type), max_tokens=2048, task="summary")
+    
+    async def acombine_summaries(
+        self,
+        summaries: List[str],
+        summary_type: str = "concise"
+    ) -> str:
         """
-        Generate quiz questions from text
+        Merge summaries of consecutive sections into one summary
         
         Args:
-            text: Source text for questions
-            num_questions: Number of questions
-            difficulty: Difficulty level (easy, medium, hard)
-            question_types: Types of questions (mcq, fill_blank, short_answer, or mix for all)
+            summaries: Section summaries in document order
+            summary_type: Type of the final summary
             
         Returns:
-            Dictionary with quiz questions
+            Combined summary
         """
+        return await self.agenerate(
+            self._combine_summaries_prompt(summaries, summary_type),
+            max_tokens=2048,
+            task="summary"
+        )
+    
+    @staticmethod
+    def _quiz_prompt(
+        text: str,
+        num_questions: int,
+        difficulty: str,
+        question_types: Optional[List[str]]
+    ) -> str:
+        """Build quiz prompt"""
         # Handle question type filtering
         if not question_types or "mix" in question_types:
             question_types = ["mcq", "fill_blank", "short_answer"]
@@ -188,52 +425,102 @@ Format the response as JSON with this structure:
 Text:
 {text}
 """
+        return prompt
+    
+    @staticmethod
+    def _parse_quiz(response: str) -> Dict:
+        """
+        Parse quiz JSON
         
-        response = self.generate(prompt, max_tokens=3000, temperature=0.8)
-        
-        # Parse JSON response
+        If the response is truncated or malformed, the questions that did
+        parse are kept and the quiz is marked truncated.
+        """
         try:
-            import json
-            import re
-            
-            # Remove markdown code blocks if present
-            cleaned_response = response.strip()
-            if cleaned_response.startswith('```'):
-                # Extract content between ```json and ```
-                match = re.search(r'```(?:json)?\s*\n?(.*?)\n?```', cleaned_response, re.DOTALL)
-                if match:
-                    cleaned_response = match.group(1).strip()
-            
-            # Extract JSON from response (might have additional text)
-            json_start = cleaned_response.find('{')
-            json_end = cleaned_response.rfind('}') + 1
-            if json_start != -1 and json_end > json_start:
-                quiz_data = json.loads(cleaned_response[json_start:json_end])
-                return quiz_data
-            else:
-                return {"questions": [], "error": "Failed to parse quiz - no JSON found"}
-        except Exception as e:
-            return {"questions": [], "error": f"JSON parse error: {str(e)}", "raw_response": response}
+            return extract_json_object(response)
+        except ValueError as e:
+            salvaged = salvage_json_array(response, "questions")
+            if salvaged.items:
+                return {"questions": salvaged.items, "truncated": True}
+            return {"questions": [], "error": f"Failed to parse quiz: {str(e)}", "raw_response": response}
     
-    def generate_study_plan(
+    def generate_quiz(
         self,
-        syllabus: str,
-        total_days: int,
+        text: str,
+        num_questions: int = 5,
         difficulty: str = "medium",
-        daily_hours: int = 2
+        question_types: Optional[List[str]] = None
     ) -> Dict:
         """
-        Generate personalized study plan
+        Generate quiz questions from text
         
         Args:
-            syllabus: Topics to cover
-            total_days: Days until exam
-            difficulty: Student's comfort level
-            daily_hours: Hours available per day
+            text: Source text for questions
+            num_questions: Number of questions
+            difficulty: Difficulty level (easy, medium, hard)
+            question_types: Types of questions (mcq, fill_blank, short_answer, or mix for all)
             
         Returns:
-            Structured study plan
+            Dictionary with quiz questions
         """
+        prompt = self._quiz_prompt(text, num_questions, difficulty, question_types)
+        response = self.generate(prompt, max_tokens=3000, temperature=0.8)
+        return self._parse_quiz(response)
+    
+    async def agenerate_quiz(
+        self,
+        text: str,
+        num_questions: int = 5,
+        difficulty: str = "medium",
+        question_types: Optional[List[str]] = None
+    ) -> Dict:
+        """Async version of generate_quiz"""
+        prompt = self._quiz_prompt(text, num_questions, difficulty, question_types)
+        response = await self.agenerate_shared(prompt, max_tokens=3000, temperature=0.8, task="quiz")
+        return self._parse_quiz(response)
+    
+    async def astream_quiz(
+        self,
+        text: str,
+        num_questions: int = 5,
+        difficulty: str = "medium",
+        question_types: Optional[List[str]] = None,
+        route: Optional[Dict] = None
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Stream quiz questions as each one finishes generating
+        
+        Args:
+            text: Source text for questions
+            num_questions: Number of questions
+            difficulty: Difficulty level (easy, medium, hard)
+            question_types: Types of questions (mcq, fill_blank, short_answer, or mix for all)
+            route: new_route_trace() to record the serving backend in, when routed
+            
+        Yields:
+            ("question", question) for each complete question, then
+            ("done", {"count", "truncated", "skipped"})
+        """
+        prompt = self._quiz_prompt(text, num_questions, difficulty, question_types)
+        parser = JsonArrayStreamParser("questions")
+        
+        async for fragment in self.astream(prompt, max_tokens=3000, temperature=0.8, task="quiz", route=route):
+            for question in parser.feed(fragment):
+                yield "question", question
+        
+        yield "done", {
+            "count": len(parser.items),
+            "truncated": not parser.complete or parser.skipped > 0,
+            "skipped": parser.skipped
+        }
+    
+    @staticmethod
+    def _study_plan_prompt(
+        syllabus: str,
+        total_days: int,
+        difficulty: str,
+        daily_hours: int
+    ) -> str:
+        """Build study plan prompt"""
         # Calculate weeks
         weeks = max(1, (total_days + 6) // 7)  # Round up to nearest week
         
@@ -268,29 +555,48 @@ Create a structured weekly plan in JSON format. Be concise and focused.
 
 Return ONLY the JSON. Create {weeks} weeks of content, distributing topics evenly.
 """
-        
-        response = self.generate(prompt, max_tokens=3000, temperature=0.7)
-        
-        # Parse JSON response
+        return prompt
+    
+    @staticmethod
+    def _parse_study_plan(response: str) -> Dict:
+        """Parse study plan JSON, returning an error dict on failure"""
         try:
-            import json
-            import re
-            
-            # Remove markdown code blocks if present
-            cleaned_response = response.strip()
-            if cleaned_response.startswith('```'):
-                match = re.search(r'```(?:json)?\s*\n?(.*?)\n?```', cleaned_response, re.DOTALL)
-                if match:
-                    cleaned_response = match.group(1).strip()
+            return extract_json_object(response)
+        except ValueError as e:
+            return {"error": f"Failed to parse study plan: {str(e)}", "raw_response": response}
+    
+    def generate_study_plan(
+        self,
+        syllabus: str,
+        total_days: int,
+        difficulty: str = "medium",
+        daily_hours: int = 2
+    ) -> Dict:
+        """
+        Generate personalized study plan
+        
+        Args:
+            syllabus: Topics to cover
+            total_days: Days until exam
+            difficulty: Student's comfort level
+            daily_hours: Hours available per day
             
-            # Extract JSON from response
-            json_start = cleaned_response.find('{')
-            json_end = cleaned_response.rfind('}') + 1
-            if json_start != -1 and json_end > json_start:
-                plan_data = json.loads(cleaned_response[json_start:json_end])
-                return plan_data
-            else:
-                return {"error": "Failed to parse study plan - no JSON found", "raw_response": response}
-        except Exception as e:
-            return {"error": f"JSON parse error: {str(e)}", "raw_response": response}
+        Returns:
+            Structured study plan
+        """
+        prompt = self._study_plan_prompt(syllabus, total_days, difficulty, daily_hours)
+        response = self.generate(prompt, max_tokens=3000, temperature=0.7)
+        return self._parse_study_plan(response)
+    
+    async def agenerate_study_plan(
+        self,
+        syllabus: str,
+        total_days: int,
+        difficulty: str = "medium",
+        daily_hours: int = 2
+    ) -> Dict:
+        """Async version of generate_study_plan"""
+        prompt = self._study_plan_prompt(syllabus, total_days, difficulty, daily_hours)
+        response = await self.agenerate_shared(prompt, max_tokens=3000, temperature=0.7, task="study_plan")
+        return self._parse_study_plan(response)
 
@@ -0,0 +1,206 @@
+"""
+Map-reduce summarization over every chunk of a document
+Groups are summarized in parallel and merged by one or more reduce calls
+"""
+import asyncio
+from typing import Optional, Dict, List, Callable
+from ..core.config import settings
+from ..utils.tokens import estimate_tokens
+from .llm_service import LLMService
+
+
+class MapReduceSummarizer:
+    """
+    Summarize arbitrarily long text with a bounded number of LLM calls
+
+    Chunks are packed in reading order into groups of at least group_tokens
+    estimated tokens. Groups grow beyond that, up to max_group_tokens, so
+    that all map calls fit in one wave of `concurrency` calls. Longer
+    documents get more groups of at most max_group_tokens, summarized in
+    several waves, and their partial summaries are merged reduce_fanin at a
+    time until one is left. Map and reduce calls together never exceed
+    max_calls; a document that would need more is rejected.
+    """
+
+    def __init__(
+        self,
+        llm_service: LLMService,
+        group_tokens: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        max_calls: Optional[int] = None,
+        max_group_tokens: Optional[int] = None,
+        reduce_fanin: Optional[int] = None
+    ):
+        """
+        Initialize summarizer
+
+        Args:
+            llm_service: LLM used for map and reduce calls
+            group_tokens: Minimum estimated tokens per group (defaults to settings)
+            concurrency: Map calls run in parallel
+            max_calls: Upper bound on upstream calls per summary
+            max_group_tokens: Maximum estimated tokens per group
+            reduce_fanin: Partial summaries merged per reduce call
+        """
+        self.llm_service = llm_service
+        self.group_tokens = group_tokens or settings.MAP_REDUCE_GROUP_TOKENS
+        self.concurrency = concurrency or settings.MAP_REDUCE_CONCURRENCY
+        self.max_calls = max(2, max_calls or settings.MAP_REDUCE_MAX_CALLS)
+        self.max_group_tokens = max(
+            self.group_tokens, max_group_tokens or settings.MAP_REDUCE_MAX_GROUP_TOKENS
+        )
+        self.reduce_fanin = max(2, reduce_fanin or settings.MAP_REDUCE_REDUCE_FANIN)
+
+    def reduce_calls(self, groups: int) -> int:
+        """Number of reduce calls needed to merge the partials of `groups` groups"""
+        calls = 0
+        while groups > 1:
+            groups = -(-groups // self.reduce_fanin)
+            calls += groups
+        return calls
+
+    @staticmethod
+    def _pack(chunks: List[Dict], budget: int) -> List[Dict]:
+        """Greedily pack consecutive chunks into groups of up to budget tokens"""
+        groups = []
+        current = None
+
+        for chunk in chunks:
+            tokens = estimate_tokens(chunk["text"])
+
+            if current is not None and current["tokens"] + tokens > budget:
+                groups.append(current)
+                current = None
+
+            if current is None:
+                current = {"page_start": chunk["page_number"], "parts": [], "tokens": 0}
+
+            current["page_end"] = chunk["page_number"]
+            current["parts"].append(chunk["text"])
+            current["tokens"] += tokens
+
+        if current is not None:
+            groups.append(current)
+
+        return groups
+
+    def partition(self, chunks: List[Dict]) -> List[Dict]:
+        """
+        Split chunks into map groups
+
+        Args:
+            chunks: Chunks in reading order (see VectorStore.get_chunks)
+
+        Returns:
+            Groups with page_start, page_end, tokens and text
+
+        Raises:
+            ValueError: If even groups of max_group_tokens need more than max_calls calls
+        """
+        total = sum(estimate_tokens(chunk["text"]) for chunk in chunks)
+        one_wave = -(-total // max(1, min(self.concurrency, self.max_calls - 1)))
+        budget = min(self.max_group_tokens, max(self.group_tokens, one_wave))
+
+        groups = self._pack(chunks, budget)
+        while len(groups) > self.concurrency or len(groups) + self.reduce_calls(len(groups)) > self.max_calls:
+            if budget >= self.max_group_tokens:
+                break
+            # Greedy packing can leave slack in each group; widen until it fits
+            budget = min(self.max_group_tokens, budget + max(1, budget // 10))
+            groups = self._pack(chunks, budget)
+
+        if len(groups) + self.reduce_calls(len(groups)) > self.max_calls:
+            raise ValueError(
+                f"Document is too long to summarize in {self.max_calls} LLM calls "
+                f"(about {total} tokens); use retrieval mode instead"
+            )
+
+        for group in groups:
+            group["text"] = "\n\n".join(group.pop("parts"))
+
+        return groups
+
+    async def summarize(
+        self,
+        chunks: List[Dict],
+        summary_type: str = "concise",
+        progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> Dict:
+        """
+        Summarize all chunks
+
+        Args:
+            chunks: Chunks in reading order
+            summary_type: Type of the final summary
+            progress_callback: Called with (completed_calls, total_calls)
+                when the plan is known and after every call
+
+        Returns:
+            Summary, number of groups, LLM calls and estimated input tokens
+        """
+        groups = self.partition(chunks)
+        if not groups:
+            raise Exception("Nothing to summarize")
+
+        # A single group needs no reduce step
+        total_calls = len(groups) + self.reduce_calls(len(groups))
+        completed = 0
+
+        def report():
+            if progress_callback:
+                progress_callback(completed, total_calls)
+
+        report()
+
+        if len(groups) == 1:
+            summary = await self.llm_service.agenerate_summary(groups[0]["text"], summary_type)
+        else:
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def call(make_request: Callable) -> str:
+                nonlocal completed
+                async with semaphore:
+                    text = await make_request()
+                completed += 1
+                report()
+                return text
+
+            async def run_all(requests: List[Callable]) -> List[str]:
+                tasks = [asyncio.create_task(call(make_request)) for make_request in requests]
+                try:
+                    return await asyncio.gather(*tasks)
+                except BaseException:
+                    # One failed call fails the summary; stop paying for the rest
+                    for task in tasks:
+                        task.cancel()
+                    raise
+
+            # Groups beyond `concurrency` wait for a slot, giving extra waves
+            partials = await run_all([
+                lambda group=group: self.llm_service.agenerate_summary(group["text"], "detailed")
+                for group in groups
+            ])
+
+            # Merge reduce_fanin partials at a time; only the last merge uses summary_type
+            while len(partials) > 1:
+                batches = [
+                    partials[start:start + self.reduce_fanin]
+                    for start in range(0, len(partials), self.reduce_fanin)
+                ]
+                kind = summary_type if len(batches) == 1 else "detailed"
+                partials = await run_all([
+                    lambda batch=batch, kind=kind: self.llm_service.acombine_summaries(batch, kind)
+                    for batch in batches
+                ])
+
+            summary = partials[0]
+
+        completed = total_calls
+        report()
+
+        return {
+            "summary": summary,
+            "groups": len(groups),
+            "llm_calls": total_calls,
+            "input_tokens": sum(group["tokens"] for group in groups)
+        }
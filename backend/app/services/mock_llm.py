@@ -0,0 +1,171 @@
+"""
+Canned responses and latency for the offline mock LLM provider
+
+The text depends only on the prompt, so identical requests get identical
+answers. Quiz, study plan and grading prompts get valid JSON in the shape
+their parsers expect; everything else gets plain prose.
+"""
+import hashlib
+import json
+import math
+import random
+import re
+from typing import Dict, List
+from ..utils.tokens import CHARS_PER_TOKEN
+
+WORDS = (
+    "the concept describes how each part of the system relates to the others and why "
+    "this matters for understanding key ideas in the material such as definitions "
+    "examples processes results and their practical applications in real scenarios"
+).split()
+
+QUESTION_TYPES = ["mcq", "fill_blank", "short_answer"]
+
+
+def _rng(prompt: str) -> random.Random:
+    """Random generator seeded by the prompt"""
+    return random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+
+
+def _sentence(rng: random.Random, words: int = 12) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _prose(rng: random.Random, max_tokens: int, words: int) -> str:
+    """Plain text of about words words, cut to max_tokens"""
+    sentences = [_sentence(rng, rng.randint(8, 16)) for _ in range(max(1, words // 12))]
+    return " ".join(sentences)[:max_tokens * CHARS_PER_TOKEN]
+
+
+def _quiz(prompt: str, rng: random.Random) -> Dict:
+    match = re.search(r"Generate (\d+) quiz questions", prompt)
+    count = int(match.group(1)) if match else 5
+    match = re.search(r"Question types to include: (.+)", prompt)
+    types = [t.strip() for t in match.group(1).split(",")] if match else QUESTION_TYPES
+    types = [t for t in types if t in QUESTION_TYPES] or QUESTION_TYPES
+
+    questions = []
+    for i in range(count):
+        question_type = types[i % len(types)]
+        if question_type == "mcq":
+            options = [_sentence(rng, 6) for _ in range(4)]
+            questions.append({
+                "type": "mcq",
+                "question": _sentence(rng, 10)[:-1] + "?",
+                "options": options,
+                "correct_answer": options[rng.randrange(4)],
+                "explanation": _sentence(rng)
+            })
+        elif question_type == "fill_blank":
+            questions.append({
+                "type": "fill_blank",
+                "question": f"{_sentence(rng, 6)[:-1]} ____ {rng.choice(WORDS)}.",
+                "correct_answer": rng.choice(WORDS),
+                "explanation": _sentence(rng)
+            })
+        else:
+            questions.append({
+                "type": "short_answer",
+                "question": _sentence(rng, 10)[:-1] + "?",
+                "expected_answer": _sentence(rng, 20),
+                "key_points": [_sentence(rng, 4)[:-1] for _ in range(2)]
+            })
+    return {"questions": questions}
+
+
+def _study_plan(prompt: str, rng: random.Random) -> Dict:
+    match = re.search(r"Total days: (\d+) \(approximately (\d+) weeks\)", prompt)
+    total_days, weeks = (int(match.group(1)), int(match.group(2))) if match else (7, 1)
+    match = re.search(r"Daily study hours: (\d+)", prompt)
+    hours = int(match.group(1)) if match else 2
+
+    return {
+        "overview": " ".join(_sentence(rng) for _ in range(2)),
+        "weekly_breakdown": [
+            {
+                "week": week,
+                "topics": [_sentence(rng, 3)[:-1] for _ in range(2)],
+                "daily_focus": _sentence(rng),
+                "hours_per_day": hours,
+                "milestones": _sentence(rng, 8)
+            }
+            for week in range(1, weeks + 1)
+        ],
+        "key_dates": [
+            {"date": f"Day {day}", "activity": _sentence(rng, 6)}
+            for day in sorted({max(1, total_days // 2), total_days})
+        ],
+        "tips": [_sentence(rng, 8) for _ in range(3)]
+    }
+
+
+def _grade(prompt: str) -> Dict:
+    """Score by how many key points share most of their words with the answer"""
+    match = re.search(r"Key Points to Cover:\n(.*?)\n\nStudent's Answer: (.*?)\n\n", prompt, re.S)
+    points: List[str] = []
+    answer_words = set()
+    if match:
+        points = [line[2:].strip() for line in match.group(1).splitlines() if line.startswith("- ")]
+        answer_words = set(re.findall(r"\w+", match.group(2).lower()))
+
+    covered, missed = [], []
+    for point in points:
+        words = [w for w in re.findall(r"\w+", point.lower()) if len(w) > 3] or re.findall(r"\w+", point.lower())
+        hits = sum(1 for w in words if w in answer_words)
+        (covered if words and hits * 2 >= len(words) else missed).append(point)
+
+    score = round(100 * len(covered) / len(points)) if points else 50
+    return {
+        "score": score,
+        "feedback": f"Covered {len(covered)} of {len(points)} key points.",
+        "points_covered": covered,
+        "points_missed": missed
+    }
+
+
+def mock_response(prompt: str, max_tokens: int, words: int) -> str:
+    """
+    Deterministic response for a prompt
+
+    Args:
+        prompt: Full prompt
+        max_tokens: Maximum tokens to generate (applied to prose only, so JSON stays valid)
+        words: Approximate length of prose answers
+
+    Returns:
+        Response text
+    """
+    rng = _rng(prompt)
+    if '"points_covered"' in prompt:
+        return json.dumps(_grade(prompt), indent=2)
+    if '"questions": [' in prompt:
+        return json.dumps(_quiz(prompt, rng), indent=2)
+    if '"weekly_breakdown": [' in prompt:
+        return json.dumps(_study_plan(prompt, rng), indent=2)
+    return _prose(rng, max_tokens, words)
+
+
+def sample_latency(rng: random.Random, distribution: str, mean: float, spread: float) -> float:
+    """
+    Draw a time to first token
+
+    Args:
+        rng: Random generator (seeded for repeatable runs)
+        distribution: fixed, uniform, normal or lognormal
+        mean: Mean latency in seconds
+        spread: Relative spread; half-width for uniform, sigma for normal and lognormal
+
+    Returns:
+        Seconds, never negative
+    """
+    if mean <= 0:
+        return 0.0
+    if distribution == "uniform":
+        return max(0.0, rng.uniform(mean * (1 - spread), mean * (1 + spread)))
+    if distribution == "normal":
+        return max(0.0, rng.gauss(mean, mean * spread))
+    if distribution == "lognormal":
+        # Long right tail like real APIs, with the requested mean
+        return rng.lognormvariate(math.log(mean) - spread ** 2 / 2, spread)
+    return mean
@@ -2,13 +2,36 @@
 RAG (Retrieval-Augmented Generation) Pipeline
 Combines vector search with LLM for context-aware answers
 """
-from typing import Optional, Dict, List
-from .vector_store import VectorStore
+import asyncio
+from typing import Optional, Dict, List, AsyncIterator, Tuple, Callable
+import numpy as np
+from .vector_store import VectorStore, TopicNotFoundError
 from .llm_service import LLMService
+from .llm_errors import LLMError
+from .llm_router import trace_routes, new_route_trace
+from ..core.executors import embedding_executor, ExecutorSaturatedError
+from .generation_cache import generation_cache
+from .answer_cache import answer_cache
+from .session_retrieval import session_retrieval_cache
+from .summary_tree import SummaryTreeBuilder
+from .map_reduce_summary import MapReduceSummarizer
+from ..core.config import settings
+from ..utils.context_packing import pack_context
+from ..utils.tokens import estimate_tokens
+from sqlalchemy.orm import Session
 
 
 class RAGPipeline:
-    """RAG pipeline for context-aware question answering"""
+    """
+    RAG pipeline for context-aware question answering
+    
+    Methods are coroutines: vector search runs in the embedding pool and
+    LLM calls use the async provider clients, so the event loop is never
+    blocked.
+    """
+    
+    # Retrieve this many times n_results, so skipped duplicates can be replaced
+    CONTEXT_CANDIDATES_FACTOR = 2
     
     def __init__(self, llm_provider: Optional[str] = None):
         """
@@ -19,14 +42,136 @@ class RAGPipeline:
         """
         self.vector_store = VectorStore()
         self.llm_service = LLMService(provider=llm_provider)
+        self.map_reduce = MapReduceSummarizer(self.llm_service)
+    
+    @staticmethod
+    def _answer_prompt(
+        question: str,
+        context: str,
+        chat_history: Optional[list] = None,
+        conversation_summary: Optional[str] = None
+    ) -> str:
+        """Build the answer prompt from retrieved context, conversation summary and recent history"""
+        # Build conversation context if history exists
+        conversation_context = ""
+        if conversation_summary:
+            conversation_context = f"\n\nSummary of the earlier conversation:\n{conversation_summary}\n"
+        if chat_history:
+            conversation_context += "\n\nPrevious conversation:\n"
+            for msg in chat_history[-6:]:  # Last 6 messages for context
+                role = msg.get('type', 'user')
+                content = msg.get('content', '')
+                # Long earlier answers are clipped so history cannot dominate the prompt
+                if len(content) > settings.CHAT_TURN_CHARS:
+                    content = content[:settings.CHAT_TURN_CHARS].rstrip() + " [...]"
+                if role == 'user':
+                    conversation_context += f"Student: {content}\n"
+                else:
+                    conversation_context += f"Assistant: {content}\n"
+            conversation_context += "\n"
+        
+        return f"""You are a helpful study assistant. Answer the student's question based on the provided context from their study materials.
+
+Context from the document:
+{context}{conversation_context}
+Student's question: {question}
+
+Provide a clear, accurate answer based on the context. If the context doesn't contain enough information to fully answer the question, acknowledge this and provide what information is available. If the student is asking a follow-up question, use the previous conversation to provide a more contextual answer."""
+    
+    @staticmethod
+    def _format_sources(search_results: Dict) -> List[Dict]:
+        """Build source references from search results"""
+        sources = []
+        for i, (doc, meta, dist) in enumerate(zip(
+            search_results["documents"],
+            search_results["metadatas"],
+            search_results["distances"]
+        )):
+            sources.append({
+                "chunk_text": doc[:200] + "..." if len(doc) > 200 else doc,
+                "page_number": meta.get("page_number", "N/A"),
+                "relevance_score": round(1 - dist, 3),  # Convert distance to similarity
+                "chunk_id": meta.get("chunk_id", i)
+            })
+        return sources
     
-    def query(
+    async def _encode_and_lookup(
+        self,
+        collection_name: str,
+        question: str,
+        chat_history: Optional[list],
+        conversation_summary: Optional[str] = None
+    ) -> Tuple[np.ndarray, Optional[Dict]]:
+        """
+        Embed a question and look it up in the semantic answer cache
+        
+        Follow-up questions depend on the conversation, so the cache is only
+        consulted when there is no chat history or conversation summary.
+        
+        Returns:
+            (query embedding, cached response or None)
+        """
+        query_embedding = await embedding_executor.run(
+            self.vector_store.encode_query,
+            collection_name,
+            question
+        )
+        
+        if chat_history or conversation_summary:
+            return query_embedding, None
+        
+        return query_embedding, answer_cache.lookup(collection_name, query_embedding)
+    
+    async def _retrieve_context(
+        self,
+        collection_name: str,
+        query_embedding: np.ndarray,
+        n_results: int,
+        session_id: Optional[str] = None
+    ) -> Dict:
+        """
+        Retrieve chunks for a question and pack them into the context budget
+        
+        In a chat session, follow-ups close to the previous retrieval re-rank
+        its cached candidates instead of scanning the collection.
+        
+        Returns:
+            Output of pack_context: context, selected results and usage,
+            plus retrieval ("full", "reused" or "reranked")
+        """
+        search_results = None
+        if session_id:
+            search_results = session_retrieval_cache.lookup(session_id, collection_name, query_embedding)
+        
+        if search_results is None:
+            search_results = await embedding_executor.run(
+                self.vector_store.query_by_embedding,
+                collection_name=collection_name,
+                query_embedding=query_embedding,
+                n_results=n_results * self.CONTEXT_CANDIDATES_FACTOR,
+                include_embeddings=bool(session_id)
+            )
+            search_results["retrieval"] = "full"
+            if session_id:
+                session_retrieval_cache.store(session_id, collection_name, query_embedding, search_results)
+        
+        packed = pack_context(
+            search_results,
+            token_budget=settings.CONTEXT_TOKEN_BUDGET,
+            max_chunks=n_results
+        )
+        packed["retrieval"] = search_results["retrieval"]
+        return packed
+    
+    async def query(
         self,
         collection_name: str,
         question: str,
         n_results: int = 5,
         include_sources: bool = True,
-        chat_history: list = None
+        chat_history: list = None,
+        conversation_summary: Optional[str] = None,
+        session_id: Optional[str] = None
     ) -> Dict:
         """
         Query document using RAG
@@ -34,77 +179,76 @@ class RAGPipeline:
         Args:
             collection_name: Document collection to query
             question: User's question
-            n_results: Number of context chunks to retrieve
+            n_results: Maximum number of context chunks
             include_sources: Whether to include source chunks
+            chat_history: Previous messages
+            conversation_summary: Rolling summary of earlier turns (chat sessions)
+            session_id: Chat session whose last retrieval follow-ups may reuse
             
         Returns:
             Answer with sources and metadata
         """
         try:
-            # Step 1: Retrieve relevant chunks from vector store
-            search_results = self.vector_store.query(
-                collection_name=collection_name,
-                query_text=question,
-                n_results=n_results
+            # Step 1: Embed the question and check for an answered paraphrase
+            query_embedding, cached = await self._encode_and_lookup(
+                collection_name, question, chat_history, conversation_summary
             )
             
-            # Step 2: Build context from retrieved chunks
-            context_chunks = search_results["documents"]
-            context = "\n\n".join(context_chunks)
-            
-            # Step 2.5: Build conversation context if history exists
-            conversation_context = ""
-            if chat_history:
-                conversation_context = "\n\nPrevious conversation:\n"
-                for msg in chat_history[-6:]:  # Last 6 messages for context
-                    role = msg.get('type', 'user')
-                    content = msg.get('content', '')
-                    if role == 'user':
-                        conversation_context += f"Student: {content}\n"
-                    else:
-                        conversation_context += f"Assistant: {content}\n"
-                conversation_context += "\n"
-            
-            # Step 3: Generate answer using LLM with context
-            answer = self.llm_service.generate(
-                prompt=f"""You are a helpful study assistant. Answer the student's question based on the provided context from their study materials.
-
-Context from the document:
-{context}{conversation_context}
-Student's question: {question}
-
-Provide a clear, accurate answer based on the context. If the context doesn't contain enough information to fully answer the question, acknowledge this and provide what information is available. If the student is asking a follow-up question, use the previous conversation to provide a more contextual answer.""",
-                context="",
-                max_tokens=4096,
-                temperature=0.7
-            )
+            if cached is not None:
+                response = {
+                    "answer": cached["answer"],
+                    "question": question,
+                    "sources_count": cached["sources_count"],
+                    "cached": True
+                }
+                if include_sources:
+                    response["sources"] = cached["sources"]
+                return response
+            
+            # Step 2: Retrieve relevant chunks and pack them into the token budget
+            packed = await self._retrieve_context(collection_name, query_embedding, n_results, session_id)
+            search_results = packed["results"]
+            
+            # Step 3: Build the prompt from the packed context
+            prompt = self._answer_prompt(question, packed["context"], chat_history, conversation_summary)
+            usage = {**packed["usage"], "prompt_tokens": estimate_tokens(prompt)}
             
-            # Step 4: Format response
+            # Step 4: Generate answer using LLM with context
+            with trace_routes() as route:
+                answer = await self.llm_service.agenerate(
+                    prompt=prompt,
+                    context="",
+                    max_tokens=4096,
+                    temperature=0.7,
+                    task="chat"
+                )
+            
+            # Step 5: Format response
+            sources = self._format_sources(search_results)
             response = {
                 "answer": answer,
                 "question": question,
-                "sources_count": search_results["count"]
+                "sources_count": search_results["count"],
+                "usage": usage,
+                "retrieval": packed["retrieval"]
             }
             
             # Include source chunks if requested
             if include_sources:
-                sources = []
-                for i, (doc, meta, dist) in enumerate(zip(
-                    search_results["documents"],
-                    search_results["metadatas"],
-                    search_results["distances"]
-                )):
-                    sources.append({
-                        "chunk_text": doc[:200] + "..." if len(doc) > 200 else doc,
-                        "page_number": meta.get("page_number", "N/A"),
-                        "relevance_score": round(1 - dist, 3),  # Convert distance to similarity
-                        "chunk_id": meta.get("chunk_id", i)
-                    })
-                
                 response["sources"] = sources
             
+            # Fallback-provider answers are not cached as the normal answer
+            if answer and not chat_history and not conversation_summary and not route["degraded"]:
+                answer_cache.store(collection_name, query_embedding, question, {
+                    "answer": answer,
+                    "sources": sources,
+                    "sources_count": search_results["count"]
+                })
+            
             return response
             
+        except (ExecutorSaturatedError, LLMError):
+            raise
         except Exception as e:
             import traceback
             error_details = traceback.format_exc()
@@ -115,72 +259,372 @@ Provide a clear, accurate answer based on the context. If the context doesn't co
                 "question": question
             }
     
-    def generate_summary(
+    async def stream_query(
+        self,
+        collection_name: str,
+        question: str,
+        n_results: int = 5,
+        include_sources: bool = True,
+        chat_history: list = None,
+        conversation_summary: Optional[str] = None,
+        session_id: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Query document using RAG, streaming the answer
+        
+        Events are ("sources", ...) with token usage once retrieval
+        finishes, ("token", ...) for each fragment of the answer and a final
+        ("done", ...). Closing the iterator cancels the upstream generation.
+        A cached answer is sent as a single token.
+        
+        Args:
+            collection_name: Document collection to query
+            question: User's question
+            n_results: Maximum number of context chunks
+            include_sources: Whether to include source chunks
+            chat_history: Previous messages
+            conversation_summary: Rolling summary of earlier turns (chat sessions)
+            session_id: Chat session whose last retrieval follow-ups may reuse
+            
+        Yields:
+            (event name, payload) tuples
+        """
+        query_embedding, cached = await self._encode_and_lookup(
+            collection_name, question, chat_history, conversation_summary
+        )
+        
+        if cached is not None:
+            event = {"question": question, "sources_count": cached["sources_count"], "cached": True}
+            if include_sources:
+                event["sources"] = cached["sources"]
+            yield "sources", event
+            yield "token", {"text": cached["answer"]}
+            yield "done", {"answer_chars": len(cached["answer"]), "cached": True}
+            return
+        
+        packed = await self._retrieve_context(collection_name, query_embedding, n_results, session_id)
+        search_results = packed["results"]
+        prompt = self._answer_prompt(question, packed["context"], chat_history, conversation_summary)
+        usage = {**packed["usage"], "prompt_tokens": estimate_tokens(prompt)}
+        
+        sources = self._format_sources(search_results)
+        event = {
+            "question": question,
+            "sources_count": search_results["count"],
+            "cached": False,
+            "usage": usage,
+            "retrieval": packed["retrieval"]
+        }
+        if include_sources:
+            event["sources"] = sources
+        yield "sources", event
+        
+        fragments = []
+        route = new_route_trace()
+        
+        async for text in self.llm_service.astream(
+            prompt=prompt,
+            context="",
+            max_tokens=4096,
+            temperature=0.7,
+            task="chat",
+            route=route
+        ):
+            fragments.append(text)
+            yield "token", {"text": text}
+        
+        answer = "".join(fragments)
+        if answer and not chat_history and not conversation_summary and not route["degraded"]:
+            answer_cache.store(collection_name, query_embedding, question, {
+                "answer": answer,
+                "sources": sources,
+                "sources_count": search_results["count"]
+            })
+        
+        yield "done", {"answer_chars": len(answer), "cached": False}
+    
+    def _cache_key(self, collection_name: str, kind: str, params: Dict) -> str:
+        """Generation cache key for this pipeline's prompt version and model"""
+        return generation_cache.make_key(
+            collection_name,
+            kind,
+            params,
+            LLMService.PROMPT_VERSIONS[kind],
+            self.llm_service.model_id_for(kind)
+        )
+    
+    def _cache_store(self, db: Session, cache_key: str, collection_name: str, kind: str, params: Dict, result: Dict):
+        """Store a generated result in the generation cache"""
+        generation_cache.set(
+            db,
+            cache_key,
+            collection_name=collection_name,
+            kind=kind,
+            params=params,
+            prompt_version=LLMService.PROMPT_VERSIONS[kind],
+            model=self.llm_service.model_id_for(kind),
+            result=result
+        )
+    
+    async def generate_summary(
         self,
         collection_name: str,
         summary_type: str = "concise",
-        page_number: Optional[int] = None
+        page_number: Optional[int] = None,
+        db: Optional[Session] = None,
+        regenerate: bool = False,
+        document_id: Optional[int] = None,
+        mode: str = "retrieval",
+        progress_callback: Optional[Callable[[int, int], None]] = None
     ) -> Dict:
         """
         Generate summary from document
         
+        Served from the generation cache, then from the document's
+        precomputed summary tree, and only then by generation: either from
+        retrieved chunks, or map-reduce over every chunk.
+        
         Args:
             collection_name: Document collection
             summary_type: Type of summary
             page_number: Specific page to summarize (None for full doc)
+            db: Database session for the generation cache (no caching if None)
+            regenerate: Skip the cached result and the summary tree
+            document_id: Document whose summary tree can answer the request
+            mode: "retrieval" or "map_reduce"
+            progress_callback: Called with (completed, total) LLM calls in map_reduce mode
             
         Returns:
             Summary response
         """
+        params = {"summary_type": summary_type, "page_number": page_number, "mode": mode}
+        cache_key = self._cache_key(collection_name, "summary", params)
+        
+        if db is not None and not regenerate:
+            cached = generation_cache.get(db, cache_key)
+            if cached is not None:
+                cached["cached"] = True
+                return cached
+            
+            if document_id is not None:
+                node = SummaryTreeBuilder.find_node(db, document_id, summary_type, page_number)
+                if node is not None:
+                    return await self._summary_from_tree(
+                        db, node, collection_name, summary_type, page_number, cache_key, params
+                    )
+        
         try:
+            if mode == "map_reduce":
+                with trace_routes() as route:
+                    response = await self._map_reduce_summary(
+                        collection_name, summary_type, page_number, progress_callback
+                    )
+                if db is not None and response["summary"] and not route["degraded"]:
+                    self._cache_store(db, cache_key, collection_name, "summary", params, response)
+                return response
+            
             # Get collection stats to determine how much content we have
-            stats = self.vector_store.get_collection_stats(collection_name)
+            stats = await embedding_executor.run(self.vector_store.get_collection_stats, collection_name)
             
             # Retrieve chunks (all if full summary, or page-specific)
             if page_number:
                 # This would require filtering by page - simplified for MVP
-                search_results = self.vector_store.query(
+                search_results = await embedding_executor.run(
+                    self.vector_store.query,
                     collection_name=collection_name,
                     query_text=f"page {page_number} content summary",
                     n_results=10
                 )
             else:
-                # Get representative chunks for full document
-                search_results = self.vector_store.query(
+                # One chunk per topic first, so every part of the document is covered
+                search_results = await embedding_executor.run(
+                    self.vector_store.get_representative_chunks,
                     collection_name=collection_name,
-                    query_text="main topics and key points",
                     n_results=15
                 )
             
             # Combine chunks
-            text_to_summarize = "\n\n".join(search_results["documents"])
+            text_to_summarize = pack_context(search_results)["context"]
             
             # Generate summary
-            summary = self.llm_service.generate_summary(
-                text=text_to_summarize,
-                summary_type=summary_type
-            )
+            with trace_routes() as route:
+                summary = await self.llm_service.agenerate_summary(
+                    text=text_to_summarize,
+                    summary_type=summary_type
+                )
             
-            return {
+            response = {
                 "summary": summary,
                 "summary_type": summary_type,
                 "page_number": page_number,
-                "chunks_used": search_results["count"]
+                "chunks_used": search_results["count"],
+                "source": "retrieval"
             }
             
+            if db is not None and summary and not route["degraded"]:
+                self._cache_store(db, cache_key, collection_name, "summary", params, response)
+            
+            return response
+            
+        except (ExecutorSaturatedError, LLMError):
+            raise
         except Exception as e:
             return {
                 "error": str(e),
                 "summary": "Failed to generate summary"
             }
     
-    def generate_quiz(
+    async def _map_reduce_summary(
+        self,
+        collection_name: str,
+        summary_type: str,
+        page_number: Optional[int],
+        progress_callback: Optional[Callable[[int, int], None]]
+    ) -> Dict:
+        """Summarize every chunk of the document (or page) with map-reduce"""
+        chunks = await embedding_executor.run(self.vector_store.get_chunks, collection_name)
+        if page_number:
+            chunks = [chunk for chunk in chunks if chunk["page_number"] == page_number]
+        
+        result = await self.map_reduce.summarize(chunks, summary_type, progress_callback)
+        
+        return {
+            "summary": result["summary"],
+            "summary_type": summary_type,
+            "page_number": page_number,
+            "chunks_used": len(chunks),
+            "source": "map_reduce",
+            "llm_calls": result["llm_calls"]
+        }
+    
+    async def stream_summary(self, **kwargs) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Generate a summary, reporting map-reduce progress as it happens
+        
+        Takes the arguments of generate_summary except progress_callback.
+        Yields ("progress", {completed, total}) while map-reduce calls
+        finish, then ("done", response) or ("error", {detail}).
+        """
+        events: asyncio.Queue = asyncio.Queue()
+        
+        def report(completed: int, total: int):
+            events.put_nowait(("progress", {"completed": completed, "total": total}))
+        
+        task = asyncio.create_task(self.generate_summary(progress_callback=report, **kwargs))
+        task.add_done_callback(lambda _: events.put_nowait(None))
+        
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+            
+            response = task.result()
+            if "error" in response:
+                yield "error", {"detail": response["error"]}
+            else:
+                yield "done", response
+        finally:
+            if not task.done():
+                task.cancel()
+    
+    async def _summary_from_tree(
+        self,
+        db: Session,
+        node,
+        collection_name: str,
+        summary_type: str,
+        page_number: Optional[int],
+        cache_key: str,
+        params: Dict
+    ) -> Dict:
+        """
+        Answer a summary request from a summary tree node
+        
+        Roots are stored in every type and returned as is. Page requests get
+        the detailed section covering the page, rewritten into the requested
+        type with one short call over the stored summary.
+        """
+        summary = node.summary
+        with trace_routes() as route:
+            if node.summary_type != summary_type:
+                summary = await self.llm_service.agenerate_summary(
+                    text=summary,
+                    summary_type=summary_type
+                )
+        
+        response = {
+            "summary": summary,
+            "summary_type": summary_type,
+            "page_number": page_number,
+            "chunks_used": 0,
+            "source": "summary_tree"
+        }
+        
+        if node.summary_type != summary_type and summary and not route["degraded"]:
+            self._cache_store(db, cache_key, collection_name, "summary", params, response)
+        
+        return response
+    
+    async def _quiz_context(
+        self,
+        collection_name: str,
+        topic: Optional[str],
+        topic_id: Optional[int] = None
+    ) -> Dict:
+        """Retrieve chunks to generate quiz questions from"""
+        if topic_id is not None:
+            # Chunks of one topic from the topic map
+            return await embedding_executor.run(
+                self.vector_store.get_topic_chunks,
+                collection_name=collection_name,
+                topic_id=topic_id,
+                n_results=10
+            )
+        
+        if not topic:
+            # Spread questions across the document's topics
+            return await embedding_executor.run(
+                self.vector_store.get_representative_chunks,
+                collection_name=collection_name,
+                n_results=10
+            )
+        
+        return await embedding_executor.run(
+            self.vector_store.query,
+            collection_name=collection_name,
+            query_text=topic,
+            n_results=10
+        )
+    
+    @staticmethod
+    def _quiz_params(
+        num_questions: int,
+        difficulty: str,
+        topic: Optional[str],
+        question_types: Optional[List[str]],
+        topic_id: Optional[int] = None
+    ) -> Dict:
+        """Quiz parameters that identify a cached quiz"""
+        return {
+            "num_questions": num_questions,
+            "difficulty": difficulty,
+            "topic": topic,
+            "topic_id": topic_id,
+            "question_types": sorted(question_types) if question_types else None
+        }
+    
+    async def generate_quiz(
         self,
         collection_name: str,
         num_questions: int = 5,
         difficulty: str = "medium",
         topic: Optional[str] = None,
-        question_types: Optional[List[str]] = None
+        question_types: Optional[List[str]] = None,
+        db: Optional[Session] = None,
+        regenerate: bool = False,
+        topic_id: Optional[int] = None
     ) -> Dict:
         """
         Generate quiz from document content
@@ -190,40 +634,144 @@ Provide a clear, accurate answer based on the context. If the context doesn't co
             num_questions: Number of questions
             difficulty: Difficulty level
             topic: Specific topic to focus on (optional)
+            db: Database session for the generation cache (no caching if None)
+            regenerate: Skip the cached quiz and replace it
+            topic_id: Topic from the topic map to draw questions from (optional)
             
         Returns:
             Quiz questions
         """
+        params = self._quiz_params(num_questions, difficulty, topic, question_types, topic_id)
+        cache_key = self._cache_key(collection_name, "quiz", params)
+        
+        if db is not None and not regenerate:
+            cached = generation_cache.get(db, cache_key)
+            if cached is not None:
+                cached["cached"] = True
+                return cached
+        
         try:
             # Retrieve relevant content
-            query_text = topic if topic else "key concepts and important information"
-            search_results = self.vector_store.query(
-                collection_name=collection_name,
-                query_text=query_text,
-                n_results=10
-            )
+            search_results = await self._quiz_context(collection_name, topic, topic_id)
             
             # Combine chunks
-            content = "\n\n".join(search_results["documents"])
+            content = pack_context(search_results)["context"]
             
             # Generate quiz
-            quiz = self.llm_service.generate_quiz(
-                text=content,
-                num_questions=num_questions,
-                difficulty=difficulty,
-                question_types=question_types
-            )
+            with trace_routes() as route:
+                quiz = await self.llm_service.agenerate_quiz(
+                    text=content,
+                    num_questions=num_questions,
+                    difficulty=difficulty,
+                    question_types=question_types
+                )
             
             quiz["metadata"] = {
                 "collection": collection_name,
                 "difficulty": difficulty,
-                "topic": topic
+                "topic": topic,
+                "topic_id": topic_id
             }
             
+            # Truncated quizzes and fallback-provider output are returned but not reused
+            if (
+                db is not None and quiz.get("questions") and "error" not in quiz
+                and not quiz.get("truncated") and not route["degraded"]
+            ):
+                self._cache_store(db, cache_key, collection_name, "quiz", params, quiz)
+            
             return quiz
             
+        except (ExecutorSaturatedError, LLMError, TopicNotFoundError):
+            raise
         except Exception as e:
             return {
                 "error": str(e),
                 "questions": []
             }
+    
+    async def stream_quiz(
+        self,
+        collection_name: str,
+        num_questions: int = 5,
+        difficulty: str = "medium",
+        topic: Optional[str] = None,
+        question_types: Optional[List[str]] = None,
+        db: Optional[Session] = None,
+        regenerate: bool = False,
+        topic_id: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Generate quiz, yielding each question as soon as it is complete
+        
+        A cached quiz is replayed through the same events.
+        
+        Args:
+            collection_name: Document collection
+            num_questions: Number of questions
+            difficulty: Difficulty level
+            topic: Specific topic to focus on (optional)
+            question_types: Types of questions
+            db: Database session for the generation cache (no caching if None)
+            regenerate: Skip the cached quiz and replace it
+            topic_id: Topic from the topic map to draw questions from (optional)
+            
+        Yields:
+            ("start", ...) after retrieval, ("question", {"index", "question"})
+            events, then ("done", ...) with counts, a truncated flag and
+            quiz metadata
+        """
+        metadata = {
+            "collection": collection_name,
+            "difficulty": difficulty,
+            "topic": topic,
+            "topic_id": topic_id
+        }
+        params = self._quiz_params(num_questions, difficulty, topic, question_types, topic_id)
+        cache_key = self._cache_key(collection_name, "quiz", params)
+        
+        cached = None
+        if db is not None and not regenerate:
+            cached = generation_cache.get(db, cache_key)
+        
+        if cached is not None:
+            yield "start", {"num_questions": num_questions, "cached": True}
+            for index, question in enumerate(cached["questions"]):
+                yield "question", {"index": index, "question": question}
+            yield "done", {
+                "count": len(cached["questions"]),
+                "truncated": False,
+                "skipped": 0,
+                "metadata": metadata,
+                "cached": True
+            }
+            return
+        
+        search_results = await self._quiz_context(collection_name, topic, topic_id)
+        yield "start", {"chunks_used": search_results["count"], "num_questions": num_questions, "cached": False}
+        
+        content = pack_context(search_results)["context"]
+        questions = []
+        route = new_route_trace()
+        
+        async for event, data in self.llm_service.astream_quiz(
+            text=content,
+            num_questions=num_questions,
+            difficulty=difficulty,
+            question_types=question_types,
+            route=route
+        ):
+            if event == "question":
+                yield "question", {"index": len(questions), "question": data}
+                questions.append(data)
+            else:
+                data["metadata"] = metadata
+                data["cached"] = False
+                
+                if db is not None and questions and not data["truncated"] and not route["degraded"]:
+                    self._cache_store(db, cache_key, collection_name, "quiz", params, {
+                        "questions": questions,
+                        "metadata": metadata
+                    })
+                
+                yield event, data
@@ -0,0 +1,178 @@
+"""
+Retrieval reuse for follow-up questions in a chat session
+Follow-ups close to the session's last retrieval re-rank its chunks instead of scanning the collection
+"""
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Optional, Dict
+from ..core.config import settings
+
+
+class _SessionRetrieval:
+    """Last full retrieval of one chat session"""
+
+    def __init__(self, collection_name: str, query_embedding: np.ndarray, search_results: Dict):
+        self.collection_name = collection_name
+        self.last_query = query_embedding
+        self.documents = search_results["documents"]
+        self.metadatas = search_results["metadatas"]
+        self.embeddings = np.asarray(search_results["embeddings"], dtype=np.float32)
+
+        # Direction of the retrieved chunks, and how close the retrieving question was to it
+        centroid = self.embeddings.mean(axis=0)
+        norm = np.linalg.norm(centroid)
+        self.centroid = centroid / norm if norm else centroid
+        self.anchor_similarity = float(self.centroid @ query_embedding)
+
+
+class SessionRetrievalCache:
+    """
+    Per-session cache of the last retrieved candidate chunks and their embeddings
+
+    A follow-up question is answered from the cached candidates when it is
+    nearly the same as the last question (reused as-is), or when its
+    similarity to the candidates' centroid is at least rerank_ratio times
+    that of the question that retrieved them (re-ranked by a dot product
+    with the cached embeddings). Anything else falls back to a full scan,
+    which replaces the cached set.
+    """
+
+    def __init__(
+        self,
+        reuse_threshold: Optional[float] = None,
+        rerank_ratio: Optional[float] = None,
+        max_sessions: Optional[int] = None,
+        enabled: Optional[bool] = None
+    ):
+        """
+        Initialize cache
+
+        Args:
+            reuse_threshold: Similarity to the last question for reusing its results unchanged
+            rerank_ratio: Relative centroid similarity needed to re-rank locally
+            max_sessions: Sessions kept before least recently used are evicted
+            enabled: Whether lookups and stores happen at all
+        """
+        self.reuse_threshold = reuse_threshold or settings.SESSION_RETRIEVAL_REUSE_THRESHOLD
+        self.rerank_ratio = rerank_ratio or settings.SESSION_RETRIEVAL_RERANK_RATIO
+        self.max_sessions = max_sessions or settings.SESSION_RETRIEVAL_MAX_SESSIONS
+        self.enabled = settings.SESSION_RETRIEVAL_ENABLED if enabled is None else enabled
+
+        self._sessions: "OrderedDict[str, _SessionRetrieval]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.reused = 0
+        self.reranked = 0
+        self.full = 0
+        self.evictions = 0
+
+    def lookup(self, session_id: str, collection_name: str, query_embedding: np.ndarray) -> Optional[Dict]:
+        """
+        Candidate chunks for a follow-up question from the session's last retrieval
+
+        Args:
+            session_id: Chat session
+            collection_name: Document collection being queried
+            query_embedding: Unit-normalized question embedding
+
+        Returns:
+            Results shaped like VectorStore.query_by_embedding plus
+            "retrieval" ("reused" or "reranked"), or None for a full retrieval
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._sessions.get(session_id)
+
+            if (
+                entry is None
+                or entry.collection_name != collection_name
+                or entry.embeddings.shape[1] != len(query_embedding)
+            ):
+                self.full += 1
+                return None
+
+            if float(entry.last_query @ query_embedding) >= self.reuse_threshold:
+                # Same ranking as the last answer
+                mode = "reused"
+                self.reused += 1
+                similarities = entry.embeddings @ entry.last_query
+            elif float(entry.centroid @ query_embedding) >= entry.anchor_similarity * self.rerank_ratio:
+                mode = "reranked"
+                self.reranked += 1
+                similarities = entry.embeddings @ query_embedding
+                entry.last_query = query_embedding
+            else:
+                self.full += 1
+                return None
+
+            order = np.argsort(-similarities, kind="stable")
+
+            self._sessions.move_to_end(session_id)
+
+            return {
+                "documents": [entry.documents[i] for i in order],
+                "metadatas": [entry.metadatas[i] for i in order],
+                "distances": [float(1 - similarities[i]) for i in order],
+                "count": len(order),
+                "retrieval": mode
+            }
+
+    def store(self, session_id: str, collection_name: str, query_embedding: np.ndarray, search_results: Dict):
+        """
+        Remember a full retrieval for the session's next follow-up
+
+        Args:
+            session_id: Chat session
+            collection_name: Document collection
+            query_embedding: Unit-normalized question embedding
+            search_results: VectorStore.query_by_embedding output with embeddings
+        """
+        if not self.enabled or not search_results["documents"]:
+            return
+
+        entry = _SessionRetrieval(collection_name, query_embedding, search_results)
+
+        with self._lock:
+            self._sessions[session_id] = entry
+            self._sessions.move_to_end(session_id)
+
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def forget(self, session_id: str):
+        """Drop a session's cached retrieval"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def invalidate(self, collection_name: str):
+        """Drop cached retrievals of every session on a collection"""
+        with self._lock:
+            stale = [
+                session_id for session_id, entry in self._sessions.items()
+                if entry.collection_name == collection_name
+            ]
+            for session_id in stale:
+                del self._sessions[session_id]
+
+    def stats(self) -> Dict:
+        """Snapshot of reuse metrics"""
+        with self._lock:
+            lookups = self.reused + self.reranked + self.full
+            return {
+                "enabled": self.enabled,
+                "sessions": len(self._sessions),
+                "reused": self.reused,
+                "reranked": self.reranked,
+                "full_retrievals": self.full,
+                "reuse_rate": round((self.reused + self.reranked) / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions
+            }
+
+
+# Shared instance so the pipeline, routers and document service see the same sessions
+session_retrieval_cache = SessionRetrievalCache()
@@ -0,0 +1,269 @@
+"""
+Hierarchical summary tree built once per document
+Section summaries are rolled up level by level into a document summary
+"""
+import asyncio
+import logging
+from typing import Optional, Dict, List, Callable
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.executors import embedding_executor
+from ..models.document import Document
+from ..models.summary_node import SummaryNode
+from .vector_store import VectorStore
+from .llm_service import LLMService
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_TYPES = ["concise", "detailed", "bullet_points"]
+
+
+class SummaryTreeBuilder:
+    """Build and look up precomputed summary trees"""
+
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        llm_service: Optional[LLMService] = None,
+        section_chars: Optional[int] = None,
+        fanout: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ):
+        """
+        Initialize builder
+
+        Args:
+            vector_store: Store holding the document chunks
+            llm_service: LLM used for summaries
+            section_chars: Approximate text per level-0 section
+            fanout: Nodes rolled up into each parent
+            concurrency: Summaries generated in parallel per document
+        """
+        self.vector_store = vector_store
+        self.llm_service = llm_service or LLMService()
+        self.section_chars = section_chars or settings.SUMMARY_TREE_SECTION_CHARS
+        self.fanout = max(2, fanout or settings.SUMMARY_TREE_FANOUT)
+        self.concurrency = concurrency or settings.SUMMARY_TREE_CONCURRENCY
+
+    def _sections(self, chunks: List[Dict]) -> List[Dict]:
+        """Group chunks into runs of whole pages of about section_chars"""
+        sections = []
+        current = None
+
+        for chunk in chunks:
+            page = chunk["page_number"]
+            starts_page = current is None or page != current["page_end"]
+
+            if starts_page and current is not None and current["chars"] >= self.section_chars:
+                sections.append(current)
+                current = None
+
+            if current is None:
+                current = {"page_start": page, "page_end": page, "parts": [], "chars": 0}
+
+            current["page_end"] = page
+            current["parts"].append(chunk["text"])
+            current["chars"] += len(chunk["text"])
+
+        if current is not None:
+            sections.append(current)
+
+        return [
+            {
+                "page_start": section["page_start"],
+                "page_end": section["page_end"],
+                "text": "\n\n".join(section["parts"])
+            }
+            for section in sections
+        ]
+
+    def _plan_calls(self, num_sections: int) -> int:
+        """Number of LLM calls a tree over num_sections needs"""
+        calls = num_sections
+        nodes = num_sections
+        while nodes > 1:
+            # A trailing group with a single child is carried up without a call
+            calls += nodes // self.fanout + (1 if nodes % self.fanout > 1 else 0)
+            nodes = -(-nodes // self.fanout)
+        return calls + len(SUMMARY_TYPES) - 1
+
+    @staticmethod
+    def _join(nodes: List[Dict]) -> str:
+        """Combine child summaries into the input for their parent"""
+        return "\n\n".join(
+            f"Pages {node['page_start']}-{node['page_end']}:\n{node['summary']}"
+            for node in nodes
+        )
+
+    @staticmethod
+    async def _carry(node: Dict) -> str:
+        """Summary of a single-child group is the child's own"""
+        return node["summary"]
+
+    async def build(
+        self,
+        document_id: int,
+        progress_callback: Optional[Callable[[float], None]] = None
+    ) -> int:
+        """
+        Build (or rebuild) a document's summary tree
+
+        Sections are summarized concurrently, then each level is rolled up
+        until one node remains. The root is stored in every summary type.
+        The old tree is replaced in a single commit.
+
+        Args:
+            document_id: Document to summarize
+            progress_callback: Called with the fraction of LLM calls finished
+
+        Returns:
+            Number of nodes stored
+        """
+        db = SessionLocal()
+        try:
+            document = db.query(Document).filter(Document.id == document_id).first()
+            if not document:
+                raise Exception(f"Document {document_id} not found")
+
+            chunks = await embedding_executor.run(self.vector_store.get_chunks, document.collection_name)
+            sections = self._sections(chunks)
+            if not sections:
+                return 0
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+            total_calls = self._plan_calls(len(sections))
+            finished = 0
+
+            async def summarize(text: str, summary_type: str = "detailed") -> str:
+                nonlocal finished
+                async with semaphore:
+                    summary = await self.llm_service.agenerate_summary(text, summary_type)
+                finished += 1
+                if progress_callback:
+                    progress_callback(finished / total_calls)
+                return summary
+
+            # Level 0: sections
+            summaries = await asyncio.gather(*(summarize(section["text"]) for section in sections))
+            level = [
+                {"page_start": s["page_start"], "page_end": s["page_end"], "summary": summary}
+                for s, summary in zip(sections, summaries)
+            ]
+            levels = [level]
+            root_input = sections[0]["text"]
+
+            # Roll up until a single document node remains
+            while len(level) > 1:
+                groups = [level[i:i + self.fanout] for i in range(0, len(level), self.fanout)]
+                inputs = [self._join(group) for group in groups]
+                summaries = await asyncio.gather(*(
+                    summarize(text) if len(group) > 1 else self._carry(group[0])
+                    for group, text in zip(groups, inputs)
+                ))
+                level = [
+                    {"page_start": group[0]["page_start"], "page_end": group[-1]["page_end"], "summary": summary}
+                    for group, summary in zip(groups, summaries)
+                ]
+                levels.append(level)
+                root_input = inputs[0]
+
+            # Root in the remaining summary types, from the same input as the detailed root
+            other_types = [t for t in SUMMARY_TYPES if t != "detailed"]
+            other_roots = await asyncio.gather(*(summarize(root_input, t) for t in other_types))
+
+            nodes = []
+            top = len(levels) - 1
+            for depth, level_nodes in enumerate(levels):
+                for position, node in enumerate(level_nodes):
+                    nodes.append(SummaryNode(
+                        document_id=document_id,
+                        level=depth,
+                        position=position,
+                        page_start=node["page_start"],
+                        page_end=node["page_end"],
+                        is_root=depth == top,
+                        summary_type="detailed",
+                        summary=node["summary"]
+                    ))
+
+            root = levels[top][0]
+            for summary_type, summary in zip(other_types, other_roots):
+                nodes.append(SummaryNode(
+                    document_id=document_id,
+                    level=top,
+                    position=0,
+                    page_start=root["page_start"],
+                    page_end=root["page_end"],
+                    is_root=True,
+                    summary_type=summary_type,
+                    summary=summary
+                ))
+
+            self.delete_tree(db, document_id)
+            db.add_all(nodes)
+            db.commit()
+
+            logger.info(f"Built summary tree for document {document_id}: {len(nodes)} nodes, {total_calls} LLM calls")
+            return len(nodes)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def build_in_background(self, document_id: int):
+        """Build a tree, logging instead of raising (for background tasks)"""
+        try:
+            await self.build(document_id)
+        except Exception as e:
+            logger.error(f"Summary tree for document {document_id} failed: {e}")
+
+    @staticmethod
+    def find_node(
+        db: Session,
+        document_id: int,
+        summary_type: str,
+        page_number: Optional[int] = None
+    ) -> Optional[SummaryNode]:
+        """
+        Stored node to answer a summary request from
+
+        Args:
+            db: Database session
+            document_id: Document ID
+            summary_type: Requested summary type
+            page_number: Page to summarize (None for the whole document)
+
+        Returns:
+            The root in the requested type, the detailed section covering
+            the page, or None if the document has no tree
+        """
+        query = db.query(SummaryNode).filter(SummaryNode.document_id == document_id)
+
+        if page_number is None:
+            return query.filter(
+                SummaryNode.is_root == True,  # noqa: E712
+                SummaryNode.summary_type == summary_type
+            ).first()
+
+        return query.filter(
+            SummaryNode.level == 0,
+            SummaryNode.summary_type == "detailed",
+            SummaryNode.page_start <= page_number,
+            SummaryNode.page_end >= page_number
+        ).first()
+
+    @staticmethod
+    def get_tree(db: Session, document_id: int) -> List[SummaryNode]:
+        """All nodes of a document's tree, top level first"""
+        return db.query(SummaryNode).filter(
+            SummaryNode.document_id == document_id
+        ).order_by(SummaryNode.level.desc(), SummaryNode.position, SummaryNode.summary_type).all()
+
+    @staticmethod
+    def delete_tree(db: Session, document_id: int) -> int:
+        """Delete a document's tree without committing"""
+        return db.query(SummaryNode).filter(
+            SummaryNode.document_id == document_id
+        ).delete(synchronize_session=False)
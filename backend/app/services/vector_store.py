@@ -1,26 +1,54 @@
 """
 Simple vector storage using numpy and cosine similarity
+Collections are stored column-wise (see utils.columnar)
 """
 import numpy as np
 import pickle
 import os
+import threading
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterable, Tuple
 from ..core.config import settings
+from ..utils.columnar import ColumnarCollection
+from ..utils.kmeans import spherical_kmeans, choose_topic_count
+from ..utils.pdf_processor import Chunk
 import uuid
 
 
+class TopicNotFoundError(ValueError):
+    """Raised when a topic_id is outside a collection's topic map"""
+    pass
+
+
 class VectorStore:
     """Manage vector storage and retrieval using numpy"""
     
-    def __init__(self):
-        """Initialize embedding model and storage"""
+    def __init__(self, embedding_model_name: Optional[str] = None):
+        """
+        Initialize embedding model and storage
+        
+        Args:
+            embedding_model_name: Model for new collections (defaults to settings)
+        """
         # Initialize embedding model
-        self.embedding_model = SentenceTransformer(settings.EMBEDDING_MODEL)
+        self.embedding_model_name = embedding_model_name or settings.EMBEDDING_MODEL
+        self.embedding_model = SentenceTransformer(self.embedding_model_name)
+        
+        # Collections remember their model, so older ones keep querying correctly
+        self._models = {self.embedding_model_name: self.embedding_model}
+        self._models_lock = threading.Lock()
         
         # Storage for collections
         self.collections = {}
         
+        # File mtimes of loaded collections, to pick up writes by other instances
+        self._loaded_mtimes = {}
+        
+        # Per-collection locks around read-modify-save, so writers (and lazy
+        # topic maps) never overwrite each other's rows
+        self._collection_locks = {}
+        self._collection_locks_lock = threading.Lock()
+        
         # Ensure storage directory exists
         os.makedirs(settings.CHROMA_DB_PATH, exist_ok=True)
     
@@ -36,133 +64,384 @@ class VectorStore:
         """
         try:
             # Initialize empty collection
-            self.collections[collection_name] = {
-                'embeddings': [],
-                'documents': [],
-                'metadatas': []
-            }
+            self.collections[collection_name] = ColumnarCollection(self.embedding_model_name)
             
             return collection_name
         except Exception as e:
             raise Exception(f"Failed to create collection: {str(e)}")
     
+    def _lock(self, collection_name: str) -> threading.RLock:
+        """Lock serializing changes to one collection"""
+        with self._collection_locks_lock:
+            return self._collection_locks.setdefault(collection_name, threading.RLock())
+    
+    def _get_embedding_model(self, model_name: str) -> SentenceTransformer:
+        """Get (loading on first use) the model a collection was built with"""
+        with self._models_lock:
+            if model_name not in self._models:
+                self._models[model_name] = SentenceTransformer(model_name)
+            return self._models[model_name]
+    
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts with the embedding model
+        
+        Args:
+            texts: Texts to encode (may span several documents)
+            
+        Returns:
+            Array of embeddings, one row per text
+        """
+        return self.embedding_model.encode(texts, batch_size=settings.EMBEDDING_BATCH_SIZE)
+    
     def add_chunks(
         self,
         collection_name: str,
-        chunks: List[Dict],
-        metadata: Optional[Dict] = None
+        chunks: List[Chunk],
+        metadata: Optional[Dict] = None,
+        embeddings: Optional[np.ndarray] = None
     ) -> int:
         """
         Add text chunks to a collection
         
         Args:
             collection_name: Name of the collection
-            chunks: List of chunk dictionaries
+            chunks: List of chunk records
             metadata: Additional metadata to store
+            embeddings: Precomputed embeddings for the chunks (encoded if omitted)
             
         Returns:
             Number of chunks added
         """
         try:
-            if collection_name not in self.collections:
-                raise ValueError(f"Collection {collection_name} not found")
-            
-            collection = self.collections[collection_name]
-            
             # Extract texts
-            texts = [chunk["text"] for chunk in chunks]
+            texts = [chunk.text for chunk in chunks]
             
             # Generate embeddings
-            embeddings = self.embedding_model.encode(texts)
+            if embeddings is None:
+                embeddings = self.embed_texts(texts)
             
-            # Store embeddings and data
-            for i, chunk in enumerate(chunks):
-                collection['embeddings'].append(embeddings[i])
-                collection['documents'].append(chunk["text"])
+            with self._lock(collection_name):
+                # Existing collections may have been written by another instance
+                self._ensure_loaded(collection_name)
                 
-                # Build metadata
-                meta = {
-                    "chunk_id": chunk.get("chunk_id", 0),
-                    "page_number": chunk.get("page_number", 0),
-                    "char_count": chunk.get("char_count", len(chunk["text"]))
-                }
+                collection = self.collections[collection_name]
                 
-                if metadata:
-                    meta.update(metadata)
+                # Swap in the extended collection so concurrent readers see old or new, never partial.
+                # Per-chunk metadata goes to integer columns; the extra metadata is stored once.
+                # The topic map is recomputed over all rows before the single save.
+                self.collections[collection_name] = self._with_topic_map(
+                    self._appended(collection, chunks, embeddings, metadata)
+                )
                 
-                collection['metadatas'].append(meta)
-            
-            # Save to disk
-            self._save_collection(collection_name)
+                # Save to disk
+                self._save_collection(collection_name)
             
             return len(chunks)
             
         except Exception as e:
             raise Exception(f"Failed to add chunks: {str(e)}")
     
-    def query(
+    @staticmethod
+    def _appended(
+        collection: ColumnarCollection,
+        chunks: List[Chunk],
+        embeddings: np.ndarray,
+        metadata: Optional[Dict] = None
+    ) -> ColumnarCollection:
+        """Collection with chunk rows appended"""
+        return collection.append(
+            embeddings=embeddings,
+            chunk_ids=[chunk.chunk_id for chunk in chunks],
+            page_numbers=[chunk.page_number for chunk in chunks],
+            char_counts=[chunk.char_count for chunk in chunks],
+            texts=[chunk.text for chunk in chunks],
+            constants=metadata
+        )
+    
+    def encode_query(self, collection_name: str, query_text: str) -> np.ndarray:
+        """
+        Embed a query with the collection's own model
+        
+        Args:
+            collection_name: Collection the query will run against
+            query_text: Text to search for
+            
+        Returns:
+            Unit-normalized query embedding
+        """
+        try:
+            # Load collection if not in memory (or changed on disk)
+            self._ensure_loaded(collection_name)
+            
+            collection = self.collections[collection_name]
+            model = self._get_embedding_model(collection.embedding_model)
+            query_embedding = np.asarray(model.encode([query_text])[0], dtype=np.float32)
+            
+            norm = np.linalg.norm(query_embedding)
+            return query_embedding / norm if norm else query_embedding
+            
+        except Exception as e:
+            raise Exception(f"Failed to encode query: {str(e)}")
+    
+    def query_by_embedding(
         self,
         collection_name: str,
-        query_text: str,
-        n_results: int = 5
+        query_embedding: np.ndarray,
+        n_results: int = 5,
+        include_embeddings: bool = False
     ) -> Dict:
         """
-        Query the vector store for similar chunks
+        Find the chunks most similar to an already encoded query
         
         Args:
             collection_name: Name of the collection to query
-            query_text: Text to search for
+            query_embedding: Unit-normalized embedding from encode_query
             n_results: Number of results to return
+            include_embeddings: Also return the embeddings of the returned chunks
             
         Returns:
             Query results with documents and metadata
         """
         try:
-            # Load collection if not in memory
-            if collection_name not in self.collections:
-                self._load_collection(collection_name)
+            self._ensure_loaded(collection_name)
             
             collection = self.collections[collection_name]
             
-            if not collection['embeddings']:
-                return {
+            if not len(collection):
+                empty = {
                     "documents": [],
                     "metadatas": [],
                     "distances": [],
                     "count": 0
                 }
+                if include_embeddings:
+                    empty["embeddings"] = np.zeros((0, collection.embeddings.shape[1]), dtype=np.float32)
+                return empty
             
-            # Generate query embedding
-            query_embedding = self.embedding_model.encode([query_text])[0]
-            
-            # Calculate cosine similarity
-            embeddings_array = np.array(collection['embeddings'])
-            
-            # Normalize
-            query_norm = query_embedding / np.linalg.norm(query_embedding)
-            embeddings_norm = embeddings_array / np.linalg.norm(embeddings_array, axis=1, keepdims=True)
-            
-            # Cosine similarity
-            similarities = np.dot(embeddings_norm, query_norm)
+            # Stored embeddings are unit-normalized, so cosine similarity is a dot product
+            similarities = np.dot(collection.embeddings, query_embedding)
             
             # Get top n results
-            top_indices = np.argsort(similarities)[::-1][:n_results]
+            n_results = min(n_results, len(collection))
+            top_indices = np.argpartition(-similarities, n_results - 1)[:n_results]
+            top_indices = top_indices[np.argsort(-similarities[top_indices])]
             
-            # Format results
-            documents = [collection['documents'][i] for i in top_indices]
-            metadatas = [collection['metadatas'][i] for i in top_indices]
+            # Format results (texts are decoded only for the returned rows)
+            documents = collection.texts.get(top_indices)
+            metadatas = [collection.metadata(i) for i in top_indices]
             distances = [float(1 - similarities[i]) for i in top_indices]  # Convert similarity to distance
             
-            return {
+            results = {
                 "documents": documents,
                 "metadatas": metadatas,
                 "distances": distances,
                 "count": len(documents)
             }
+            if include_embeddings:
+                results["embeddings"] = collection.embeddings[top_indices]
+            return results
             
         except Exception as e:
             raise Exception(f"Failed to query collection: {str(e)}")
     
+    def query(
+        self,
+        collection_name: str,
+        query_text: str,
+        n_results: int = 5
+    ) -> Dict:
+        """
+        Query the vector store for similar chunks
+        
+        Args:
+            collection_name: Name of the collection to query
+            query_text: Text to search for
+            n_results: Number of results to return
+            
+        Returns:
+            Query results with documents and metadata
+        """
+        query_embedding = self.encode_query(collection_name, query_text)
+        return self.query_by_embedding(collection_name, query_embedding, n_results)
+    
+    def get_chunks(self, collection_name: str) -> List[Dict]:
+        """
+        All chunks of a collection in reading order
+        
+        Args:
+            collection_name: Name of the collection
+            
+        Returns:
+            Dictionaries with chunk_id, page_number and text, sorted by page then chunk
+        """
+        try:
+            self._ensure_loaded(collection_name)
+            
+            collection = self.collections[collection_name]
+            order = np.lexsort((collection.chunk_ids, collection.page_numbers))
+            texts = collection.texts.get(order)
+            
+            return [
+                {
+                    "chunk_id": int(collection.chunk_ids[i]),
+                    "page_number": int(collection.page_numbers[i]),
+                    "text": text
+                }
+                for i, text in zip(order, texts)
+            ]
+        except Exception as e:
+            raise Exception(f"Failed to read collection: {str(e)}")
+    
+    @staticmethod
+    def _with_topic_map(collection: ColumnarCollection) -> ColumnarCollection:
+        """Cluster a collection's embeddings into topics"""
+        k = choose_topic_count(len(collection), settings.TOPIC_MAX_TOPICS)
+        if not k:
+            return collection
+        
+        centroids, labels, scores = spherical_kmeans(
+            collection.embeddings, k, iterations=settings.TOPIC_KMEANS_ITERATIONS
+        )
+        return collection.with_topics(centroids, labels, scores)
+    
+    def _ensure_topics(self, collection_name: str) -> ColumnarCollection:
+        """Loaded collection with a current topic map, building one if missing"""
+        self._ensure_loaded(collection_name)
+        collection = self.collections[collection_name]
+        if collection.has_topics or not len(collection):
+            return collection
+        
+        # Collections from before topic maps: build one under the writers' lock,
+        # re-checking so a concurrent change is neither lost nor overwritten
+        with self._lock(collection_name):
+            self._ensure_loaded(collection_name)
+            collection = self.collections[collection_name]
+            if not collection.has_topics and len(collection):
+                collection = self._with_topic_map(collection)
+                self.collections[collection_name] = collection
+                self._save_collection(collection_name)
+        
+        return collection
+    
+    @staticmethod
+    def _rows_result(collection: ColumnarCollection, rows: np.ndarray, scores: np.ndarray) -> Dict:
+        """Format rows like a query result (distance is 1 - centroid similarity)"""
+        return {
+            "documents": collection.texts.get(rows),
+            "metadatas": [collection.metadata(i) for i in rows],
+            "distances": [float(1 - score) for score in scores],
+            "count": len(rows)
+        }
+    
+    def get_topics(self, collection_name: str) -> List[Dict]:
+        """
+        Topics of a collection with their representative chunk
+        
+        Args:
+            collection_name: Name of the collection
+            
+        Returns:
+            One entry per topic in reading order: topic_id, size, the pages
+            it spans, and the chunk closest to its centroid
+        """
+        try:
+            collection = self._ensure_topics(collection_name)
+            
+            topics = []
+            for topic_id in range(collection.num_topics):
+                rows = collection.topic_rows(topic_id)
+                pages = collection.page_numbers[rows]
+                representative = int(rows[0])
+                
+                topics.append({
+                    "topic_id": topic_id,
+                    "size": len(rows),
+                    "page_start": int(pages.min()),
+                    "page_end": int(pages.max()),
+                    "representative": {
+                        "text": collection.texts.get([representative])[0],
+                        "metadata": collection.metadata(representative)
+                    }
+                })
+            
+            return topics
+        except Exception as e:
+            raise Exception(f"Failed to read topics: {str(e)}")
+    
+    def get_topic_chunks(
+        self,
+        collection_name: str,
+        topic_id: int,
+        n_results: Optional[int] = None
+    ) -> Dict:
+        """
+        Chunks of one topic, most central first
+        
+        Args:
+            collection_name: Name of the collection
+            topic_id: Topic from get_topics
+            n_results: Maximum number of chunks (all if None)
+            
+        Returns:
+            Results shaped like query()
+            
+        Raises:
+            TopicNotFoundError: topic_id is not in the topic map
+        """
+        try:
+            collection = self._ensure_topics(collection_name)
+            
+            if not 0 <= topic_id < collection.num_topics:
+                raise TopicNotFoundError(f"Topic {topic_id} not found")
+            
+            rows = collection.topic_rows(topic_id)[:n_results]
+            scores = collection.topic_row_scores(topic_id)[:n_results]
+            
+            return self._rows_result(collection, rows, scores)
+        except TopicNotFoundError:
+            raise
+        except Exception as e:
+            raise Exception(f"Failed to read topic chunks: {str(e)}")
+    
+    def get_representative_chunks(self, collection_name: str, n_results: int = 10) -> Dict:
+        """
+        Chunks that cover every topic, without encoding a query
+        
+        Topics take turns contributing their next most central chunk, so
+        each topic is represented before any topic gets a second chunk.
+        
+        Args:
+            collection_name: Name of the collection
+            n_results: Number of chunks
+            
+        Returns:
+            Results shaped like query(), in reading order
+        """
+        try:
+            collection = self._ensure_topics(collection_name)
+            
+            if not len(collection):
+                return self._rows_result(collection, np.zeros(0, dtype=np.int64), [])
+            
+            n_results = min(n_results, len(collection))
+            sizes = np.diff(collection.topic_offsets)
+            
+            # Rank of each position within its topic; select by (rank, topic)
+            ranks = np.arange(len(collection)) - np.repeat(collection.topic_offsets[:-1], sizes)
+            topics = np.repeat(np.arange(collection.num_topics), sizes)
+            picked = np.lexsort((topics, ranks))[:n_results]
+            
+            rows = collection.topic_order[picked]
+            scores = collection.topic_scores[picked]
+            
+            # Present the selection in reading order
+            reading = np.lexsort((collection.chunk_ids[rows], collection.page_numbers[rows]))
+            
+            return self._rows_result(collection, rows[reading], scores[reading])
+        except Exception as e:
+            raise Exception(f"Failed to select representative chunks: {str(e)}")
+    
     def get_collection_stats(self, collection_name: str) -> Dict:
         """
         Get statistics about a collection
@@ -174,11 +453,10 @@ class VectorStore:
             Collection statistics
         """
         try:
-            if collection_name not in self.collections:
-                self._load_collection(collection_name)
+            self._ensure_loaded(collection_name)
             
             collection = self.collections[collection_name]
-            count = len(collection['documents'])
+            count = len(collection)
             
             return {
                 "name": collection_name,
@@ -204,39 +482,178 @@ class VectorStore:
             True if successful
         """
         try:
-            # Remove from memory
-            if collection_name in self.collections:
-                del self.collections[collection_name]
+            with self._lock(collection_name):
+                # Remove from memory
+                if collection_name in self.collections:
+                    del self.collections[collection_name]
+                self._loaded_mtimes.pop(collection_name, None)
+                
+                # Remove from disk
+                for file_path in (
+                    self._collection_path(collection_name),
+                    self._legacy_collection_path(collection_name)
+                ):
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
             
-            # Remove from disk
-            file_path = os.path.join(settings.CHROMA_DB_PATH, f"{collection_name}.pkl")
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            with self._collection_locks_lock:
+                self._collection_locks.pop(collection_name, None)
             
             return True
         except Exception as e:
             raise Exception(f"Failed to delete collection: {str(e)}")
     
+    @staticmethod
+    def _renumbered(collection: ColumnarCollection, page_mapping: Dict[int, int]) -> Tuple[ColumnarCollection, int]:
+        """Collection with pages moved, and the number of rows updated"""
+        # Map all rows at once from the old values, so swaps (3->4, 4->3) work
+        page_numbers = collection.page_numbers.copy()
+        updated = 0
+        for old, new in page_mapping.items():
+            if old == new:
+                continue
+            rows = collection.page_numbers == old
+            page_numbers[rows] = new
+            updated += int(rows.sum())
+        
+        if not updated:
+            return collection, 0
+        return collection.replace(page_numbers=page_numbers), updated
+    
+    def stage_page_update(
+        self,
+        collection_name: str,
+        removed_pages: Iterable[int],
+        page_mapping: Dict[int, int],
+        chunks: List[Chunk],
+        metadata: Optional[Dict] = None,
+        embeddings: Optional[np.ndarray] = None,
+        clear: bool = False
+    ) -> Tuple[ColumnarCollection, int]:
+        """
+        Build a collection with pages removed, moved and added, without
+        touching the live one
+        
+        Pass the result to put_collection once everything else about the
+        change has succeeded.
+        
+        Args:
+            collection_name: Name of the collection
+            removed_pages: Pages whose chunks are dropped
+            page_mapping: Old page number -> new page number for kept pages
+            chunks: New chunks to add
+            metadata: Additional metadata to store
+            embeddings: Precomputed embeddings for the chunks (encoded if omitted)
+            clear: Drop every existing chunk instead of removed_pages
+            
+        Returns:
+            (updated collection with a fresh topic map, number of chunks removed)
+        """
+        try:
+            self._ensure_loaded(collection_name)
+            collection = self.collections[collection_name]
+            
+            if clear:
+                keep = np.zeros(0, dtype=np.int64)
+            else:
+                keep = np.flatnonzero(~np.isin(collection.page_numbers, list(removed_pages)))
+            updated = collection.take(keep) if len(keep) < len(collection) else collection
+            updated, _ = self._renumbered(updated, page_mapping)
+            
+            if chunks:
+                if embeddings is None:
+                    embeddings = self.embed_texts([chunk.text for chunk in chunks])
+                updated = self._appended(updated, chunks, embeddings, metadata)
+            
+            return self._with_topic_map(updated), len(collection) - len(keep)
+        except Exception as e:
+            raise Exception(f"Failed to stage page update: {str(e)}")
+    
+    def put_collection(self, collection_name: str, collection: ColumnarCollection) -> ColumnarCollection:
+        """
+        Swap in a collection built by stage_page_update and save it
+        
+        Args:
+            collection_name: Name of the collection
+            collection: New contents
+            
+        Returns:
+            The collection it replaced, for restoring if a later step fails
+        """
+        with self._lock(collection_name):
+            self._ensure_loaded(collection_name)
+            previous = self.collections[collection_name]
+            
+            self.collections[collection_name] = collection
+            try:
+                self._save_collection(collection_name)
+            except Exception:
+                self.collections[collection_name] = previous
+                raise
+        
+        return previous
+    
+    def _collection_path(self, collection_name: str) -> str:
+        """Path of a collection file"""
+        return os.path.join(settings.CHROMA_DB_PATH, f"{collection_name}.npz")
+    
+    def _legacy_collection_path(self, collection_name: str) -> str:
+        """Path of a collection pickled by earlier versions"""
+        return os.path.join(settings.CHROMA_DB_PATH, f"{collection_name}.pkl")
+    
+    def _ensure_loaded(self, collection_name: str):
+        """Load a collection unless the in-memory copy is current"""
+        file_path = self._collection_path(collection_name)
+        
+        if collection_name in self.collections:
+            # Not yet saved, or unchanged since we loaded/saved it
+            if not os.path.exists(file_path):
+                return
+            if os.path.getmtime(file_path) == self._loaded_mtimes.get(collection_name):
+                return
+        
+        self._load_collection(collection_name)
+    
     def _save_collection(self, collection_name: str):
         """Save collection to disk"""
         try:
             collection = self.collections[collection_name]
-            file_path = os.path.join(settings.CHROMA_DB_PATH, f"{collection_name}.pkl")
+            file_path = self._collection_path(collection_name)
+            tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
             
-            with open(file_path, 'wb') as f:
-                pickle.dump(collection, f)
+            with open(tmp_path, 'wb') as f:
+                collection.save(f)
+            
+            # Atomic rename so other instances never load a half-written file
+            os.replace(tmp_path, file_path)
+            self._loaded_mtimes[collection_name] = os.path.getmtime(file_path)
         except Exception as e:
             raise Exception(f"Failed to save collection: {str(e)}")
     
     def _load_collection(self, collection_name: str):
         """Load collection from disk"""
         try:
-            file_path = os.path.join(settings.CHROMA_DB_PATH, f"{collection_name}.pkl")
+            file_path = self._collection_path(collection_name)
+            legacy_path = self._legacy_collection_path(collection_name)
+            
+            if not os.path.exists(file_path) and os.path.exists(legacy_path):
+                # Convert a pickled collection to the columnar format once
+                with open(legacy_path, 'rb') as f:
+                    legacy = pickle.load(f)
+                # Pickles from before collections recorded their model were
+                # built with LEGACY_EMBEDDING_MODEL, not necessarily today's model
+                self.collections[collection_name] = ColumnarCollection.from_legacy(
+                    legacy, settings.LEGACY_EMBEDDING_MODEL
+                )
+                self._save_collection(collection_name)
+                os.remove(legacy_path)
+                return
             
             if not os.path.exists(file_path):
                 raise ValueError(f"Collection {collection_name} not found")
             
-            with open(file_path, 'rb') as f:
-                self.collections[collection_name] = pickle.load(f)
+            mtime = os.path.getmtime(file_path)
+            self.collections[collection_name] = ColumnarCollection.load(file_path)
+            self._loaded_mtimes[collection_name] = mtime
         except Exception as e:
             raise Exception(f"Failed to load collection: {str(e)}")
@@ -0,0 +1,178 @@
+"""
+Boilerplate and near-duplicate suppression for extracted PDF text
+"""
+import re
+import zlib
+import numpy as np
+from collections import Counter
+from typing import List, Dict, Iterable, Tuple
+from .pdf_processor import Chunk
+
+
+class ChunkDeduplicator:
+    """Strip repeated per-page lines and collapse near-duplicate chunks"""
+
+    # Mersenne prime for MinHash permutations (keeps products inside uint64)
+    _PRIME = (1 << 31) - 1
+
+    # Only short lines (page footers like "Page 3 of 20") get digits masked
+    _MAX_MASKED_LINE_LENGTH = 30
+
+    def __init__(
+        self,
+        min_page_ratio: float = 0.5,
+        min_pages: int = 3,
+        similarity_threshold: float = 0.85,
+        shingle_size: int = 5,
+        num_perm: int = 64,
+        bands: int = 16,
+        seed: int = 42
+    ):
+        """
+        Initialize deduplicator
+
+        Args:
+            min_page_ratio: Fraction of pages a line must appear on to count as boilerplate
+            min_pages: Minimum document length before boilerplate detection applies
+            similarity_threshold: Estimated Jaccard similarity above which chunks are duplicates
+            shingle_size: Words per shingle
+            num_perm: Number of MinHash permutations
+            bands: Number of LSH bands (must divide num_perm)
+            seed: Seed for permutation coefficients
+        """
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.min_page_ratio = min_page_ratio
+        self.min_pages = min_pages
+        self.similarity_threshold = similarity_threshold
+        self.shingle_size = shingle_size
+        self.num_perm = num_perm
+        self.bands = bands
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, self._PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, self._PRIME, size=num_perm, dtype=np.uint64)
+
+    def _normalize_line(self, line: str) -> str:
+        """Normalize a line so page numbers and spacing don't hide repeats"""
+        line = re.sub(r'\s+', ' ', line.strip().lower())
+        if len(line) <= self._MAX_MASKED_LINE_LENGTH:
+            line = re.sub(r'\d+', '#', line)
+        return line
+
+    def strip_repeated_lines(self, page_texts: List[Dict]) -> Tuple[List[Dict], int]:
+        """
+        Remove header/footer lines that repeat across many pages
+
+        Args:
+            page_texts: List of page text dictionaries
+
+        Returns:
+            Tuple of (cleaned page text dictionaries, number of lines removed)
+        """
+        if len(page_texts) < self.min_pages:
+            return page_texts, 0
+
+        # Count on how many pages each normalized line appears
+        page_counts = Counter()
+        for page in page_texts:
+            lines = {self._normalize_line(line) for line in page["text"].splitlines()}
+            lines.discard("")
+            page_counts.update(lines)
+
+        min_count = max(self.min_pages, int(len(page_texts) * self.min_page_ratio))
+        boilerplate = {line for line, count in page_counts.items() if count >= min_count}
+
+        if not boilerplate:
+            return page_texts, 0
+
+        cleaned_pages = []
+        removed = 0
+
+        for page in page_texts:
+            kept = []
+            for line in page["text"].splitlines():
+                if self._normalize_line(line) in boilerplate:
+                    removed += 1
+                else:
+                    kept.append(line)
+
+            text = "\n".join(kept)
+            cleaned_pages.append({**page, "text": text, "char_count": len(text)})
+
+        return cleaned_pages, removed
+
+    def _signature(self, text: str) -> np.ndarray:
+        """Compute MinHash signature over word shingles"""
+        words = text.lower().split()
+        size = self.shingle_size
+
+        if len(words) <= size:
+            shingles = {" ".join(words)}
+        else:
+            shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode('utf-8')) & self._PRIME for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+
+        # Vectorized universal hashing: one row per permutation
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % self._PRIME
+        return permuted.min(axis=1)
+
+    def remove_near_duplicates(
+        self,
+        chunks: List[Chunk],
+        existing_texts: Iterable[str] = ()
+    ) -> Tuple[List[Chunk], int]:
+        """
+        Drop chunks that are near-duplicates of an earlier chunk
+
+        Args:
+            chunks: List of chunk records in document order
+            existing_texts: Texts already indexed (e.g. unchanged pages of a
+                replaced document); chunks duplicating them are dropped too
+
+        Returns:
+            Tuple of (kept chunks, number of chunks removed)
+        """
+        rows = self.num_perm // self.bands
+        buckets = {}
+        kept = []
+        signatures = []
+
+        def band_keys(signature: np.ndarray) -> List[Tuple[int, bytes]]:
+            return [
+                (band, signature[band * rows:(band + 1) * rows].tobytes())
+                for band in range(self.bands)
+            ]
+
+        for text in existing_texts:
+            signature = self._signature(text)
+            for key in band_keys(signature):
+                buckets.setdefault(key, []).append(len(signatures))
+            signatures.append(signature)
+
+        for chunk in chunks:
+            signature = self._signature(chunk.text)
+            keys = band_keys(signature)
+
+            # LSH candidates share at least one band; verify with estimated Jaccard
+            candidates = {idx for key in keys for idx in buckets.get(key, ())}
+            is_duplicate = any(
+                np.mean(signatures[idx] == signature) >= self.similarity_threshold
+                for idx in candidates
+            )
+
+            if is_duplicate:
+                continue
+
+            for key in keys:
+                buckets.setdefault(key, []).append(len(signatures))
+            kept.append(chunk)
+            signatures.append(signature)
+
+        return kept, len(chunks) - len(kept)
@@ -0,0 +1,401 @@
+"""
+Columnar storage for vector store collections
+Numeric metadata lives in arrays, texts in one block-compressed buffer
+"""
+import json
+import zlib
+import numpy as np
+from typing import List, Dict, Optional, Iterable
+
+
+class CompressedTextColumn:
+    """
+    Texts stored as zlib-compressed blocks of consecutive rows
+
+    Row offsets index the uncompressed concatenation, so a row is decoded by
+    decompressing only the block that holds it.
+    """
+
+    BLOCK_SIZE = 64  # Rows per compressed block
+
+    def __init__(
+        self,
+        blob: bytes = b"",
+        block_offsets: Optional[np.ndarray] = None,
+        row_offsets: Optional[np.ndarray] = None
+    ):
+        """
+        Initialize text column
+
+        Args:
+            blob: Concatenated compressed blocks
+            block_offsets: Start of each block in blob (length blocks + 1)
+            row_offsets: Start of each row in the uncompressed text (length rows + 1)
+        """
+        self.blob = blob
+        self.block_offsets = block_offsets if block_offsets is not None else np.zeros(1, dtype=np.int64)
+        self.row_offsets = row_offsets if row_offsets is not None else np.zeros(1, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.row_offsets) - 1
+
+    @classmethod
+    def from_texts(cls, texts: List[str]) -> "CompressedTextColumn":
+        """Build a column from a list of texts"""
+        return cls().extend(texts)
+
+    def _block(self, block: int) -> bytes:
+        """Decompress one block"""
+        start, end = self.block_offsets[block], self.block_offsets[block + 1]
+        return zlib.decompress(self.blob[start:end])
+
+    def extend(self, texts: List[str]) -> "CompressedTextColumn":
+        """
+        Return a new column with texts appended
+
+        Args:
+            texts: Texts to append
+
+        Returns:
+            New column (self is left unchanged for concurrent readers)
+        """
+        if not texts:
+            return self
+
+        rows = len(self)
+        num_blocks = len(self.block_offsets) - 1
+        blob = self.blob
+        block_offsets = list(self.block_offsets)
+        row_offsets = list(self.row_offsets)
+
+        # Re-open a trailing partial block so blocks stay BLOCK_SIZE rows
+        pending = []
+        if rows % self.BLOCK_SIZE:
+            first_row = num_blocks * self.BLOCK_SIZE - self.BLOCK_SIZE
+            data = self._block(num_blocks - 1)
+            base = self.row_offsets[first_row]
+            pending = [
+                data[self.row_offsets[r] - base:self.row_offsets[r + 1] - base]
+                for r in range(first_row, rows)
+            ]
+            blob = blob[:self.block_offsets[num_blocks - 1]]
+            block_offsets.pop()
+            row_offsets = row_offsets[:first_row + 1]
+
+        encoded = pending + [text.encode('utf-8') for text in texts]
+        parts = [blob]
+        position = len(blob)
+
+        for i in range(0, len(encoded), self.BLOCK_SIZE):
+            block_rows = encoded[i:i + self.BLOCK_SIZE]
+            for row in block_rows:
+                row_offsets.append(row_offsets[-1] + len(row))
+            compressed = zlib.compress(b"".join(block_rows))
+            parts.append(compressed)
+            position += len(compressed)
+            block_offsets.append(position)
+
+        return CompressedTextColumn(
+            b"".join(parts),
+            np.array(block_offsets, dtype=np.int64),
+            np.array(row_offsets, dtype=np.int64)
+        )
+
+    def get(self, indices: Iterable[int]) -> List[str]:
+        """
+        Decode selected rows
+
+        Args:
+            indices: Row positions
+
+        Returns:
+            Texts in the order requested
+        """
+        blocks = {}
+        texts = []
+
+        for i in indices:
+            i = int(i)
+            block = i // self.BLOCK_SIZE
+            if block not in blocks:
+                blocks[block] = self._block(block)
+
+            base = self.row_offsets[block * self.BLOCK_SIZE]
+            start, end = self.row_offsets[i] - base, self.row_offsets[i + 1] - base
+            texts.append(blocks[block][start:end].decode('utf-8'))
+
+        return texts
+
+    def all(self) -> List[str]:
+        """Decode every row"""
+        return self.get(range(len(self)))
+
+
+class ColumnarCollection:
+    """A collection's embeddings, metadata and texts in columnar form"""
+
+    _NO_TOPICS = {
+        "topic_centroids": None,
+        "topic_order": None,
+        "topic_offsets": None,
+        "topic_scores": None
+    }
+
+    def __init__(
+        self,
+        embedding_model: str,
+        embeddings: Optional[np.ndarray] = None,
+        chunk_ids: Optional[np.ndarray] = None,
+        page_numbers: Optional[np.ndarray] = None,
+        char_counts: Optional[np.ndarray] = None,
+        texts: Optional[CompressedTextColumn] = None,
+        constants: Optional[Dict] = None,
+        topic_centroids: Optional[np.ndarray] = None,
+        topic_order: Optional[np.ndarray] = None,
+        topic_offsets: Optional[np.ndarray] = None,
+        topic_scores: Optional[np.ndarray] = None
+    ):
+        """
+        Initialize collection
+
+        Args:
+            embedding_model: Name of the model the embeddings come from
+            embeddings: Unit-normalized embeddings, one row per chunk
+            chunk_ids: Chunk ID per row
+            page_numbers: Page number per row
+            char_counts: Character count per row
+            texts: Chunk texts
+            constants: Metadata shared by every row (e.g. user_id, filename)
+            topic_centroids: Unit-normalized centroid per topic (k x d)
+            topic_order: Row positions grouped by topic, closest to the centroid first
+            topic_offsets: Start of each topic in topic_order (length k + 1)
+            topic_scores: Similarity to the topic centroid, aligned with topic_order
+        """
+        self.embedding_model = embedding_model
+        self.embeddings = embeddings if embeddings is not None else np.zeros((0, 0), dtype=np.float32)
+        self.chunk_ids = chunk_ids if chunk_ids is not None else np.zeros(0, dtype=np.int32)
+        self.page_numbers = page_numbers if page_numbers is not None else np.zeros(0, dtype=np.int32)
+        self.char_counts = char_counts if char_counts is not None else np.zeros(0, dtype=np.int32)
+        self.texts = texts or CompressedTextColumn()
+        self.constants = constants or {}
+        self.topic_centroids = topic_centroids
+        self.topic_order = topic_order
+        self.topic_offsets = topic_offsets
+        self.topic_scores = topic_scores
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    def replace(self, **columns) -> "ColumnarCollection":
+        """Copy of this collection with some columns replaced"""
+        values = {
+            "embedding_model": self.embedding_model,
+            "embeddings": self.embeddings,
+            "chunk_ids": self.chunk_ids,
+            "page_numbers": self.page_numbers,
+            "char_counts": self.char_counts,
+            "texts": self.texts,
+            "constants": self.constants,
+            "topic_centroids": self.topic_centroids,
+            "topic_order": self.topic_order,
+            "topic_offsets": self.topic_offsets,
+            "topic_scores": self.topic_scores
+        }
+        values.update(columns)
+        return ColumnarCollection(**values)
+
+    def append(
+        self,
+        embeddings: np.ndarray,
+        chunk_ids: List[int],
+        page_numbers: List[int],
+        char_counts: List[int],
+        texts: List[str],
+        constants: Optional[Dict] = None
+    ) -> "ColumnarCollection":
+        """
+        Return a new collection with rows appended
+
+        Args:
+            embeddings: Raw embeddings for the new rows (normalized here)
+            chunk_ids: Chunk ID per new row
+            page_numbers: Page number per new row
+            char_counts: Character count per new row
+            texts: Text per new row
+            constants: Collection-level metadata (replaces the current values)
+
+        Returns:
+            New collection
+        """
+        if not texts:
+            return self.replace(constants={**self.constants, **(constants or {})})
+
+        # New rows belong to no topic yet; the topic map is rebuilt by the caller
+
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.where(norms == 0, 1, norms)
+
+        if len(self):
+            embeddings = np.vstack([self.embeddings, embeddings])
+
+        return self.replace(
+            embeddings=embeddings,
+            chunk_ids=np.concatenate([self.chunk_ids, np.asarray(chunk_ids, dtype=np.int32)]),
+            page_numbers=np.concatenate([self.page_numbers, np.asarray(page_numbers, dtype=np.int32)]),
+            char_counts=np.concatenate([self.char_counts, np.asarray(char_counts, dtype=np.int32)]),
+            texts=self.texts.extend(texts),
+            constants={**self.constants, **(constants or {})},
+            **self._NO_TOPICS
+        )
+
+    def take(self, indices: np.ndarray) -> "ColumnarCollection":
+        """
+        Return a new collection with only the given rows
+
+        Args:
+            indices: Row positions to keep, in order
+
+        Returns:
+            New collection
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        texts = self.texts.all()
+
+        return self.replace(
+            embeddings=self.embeddings[indices] if len(self) else self.embeddings,
+            chunk_ids=self.chunk_ids[indices],
+            page_numbers=self.page_numbers[indices],
+            char_counts=self.char_counts[indices],
+            texts=CompressedTextColumn.from_texts([texts[i] for i in indices]),
+            **self._NO_TOPICS
+        )
+
+    @property
+    def has_topics(self) -> bool:
+        """Whether the topic map covers the current rows"""
+        return self.topic_order is not None and len(self.topic_order) == len(self) and len(self) > 0
+
+    @property
+    def num_topics(self) -> int:
+        """Number of topics in the topic map"""
+        return len(self.topic_offsets) - 1 if self.topic_offsets is not None else 0
+
+    def with_topics(self, centroids: np.ndarray, labels: np.ndarray, scores: np.ndarray) -> "ColumnarCollection":
+        """
+        Return a copy with a topic map from cluster assignments
+
+        Empty clusters are dropped and topics are numbered in reading order
+        of their earliest chunk, so topic 0 is where the document starts.
+
+        Args:
+            centroids: Cluster centroids (k x d)
+            labels: Cluster per row
+            scores: Similarity of each row to its centroid
+
+        Returns:
+            New collection
+        """
+        reading_position = np.empty(len(self), dtype=np.int64)
+        reading_position[np.lexsort((self.chunk_ids, self.page_numbers))] = np.arange(len(self))
+
+        used = np.unique(labels)
+        first_seen = np.full(len(centroids), len(self), dtype=np.int64)
+        np.minimum.at(first_seen, labels, reading_position)
+        used = used[np.argsort(first_seen[used])]
+
+        remap = np.full(len(centroids), -1, dtype=np.int64)
+        remap[used] = np.arange(len(used))
+        topics = remap[labels]
+
+        order = np.lexsort((-scores, topics))
+        counts = np.bincount(topics, minlength=len(used))
+
+        return self.replace(
+            topic_centroids=np.asarray(centroids[used], dtype=np.float32),
+            topic_order=order.astype(np.int64),
+            topic_offsets=np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+            topic_scores=np.asarray(scores[order], dtype=np.float32)
+        )
+
+    def topic_rows(self, topic_id: int) -> np.ndarray:
+        """Row positions of one topic, closest to its centroid first"""
+        return self.topic_order[self.topic_offsets[topic_id]:self.topic_offsets[topic_id + 1]]
+
+    def topic_row_scores(self, topic_id: int) -> np.ndarray:
+        """Centroid similarities aligned with topic_rows"""
+        return self.topic_scores[self.topic_offsets[topic_id]:self.topic_offsets[topic_id + 1]]
+
+    def metadata(self, i: int) -> Dict:
+        """Build the metadata dictionary for one row"""
+        return {
+            "chunk_id": int(self.chunk_ids[i]),
+            "page_number": int(self.page_numbers[i]),
+            "char_count": int(self.char_counts[i]),
+            **self.constants
+        }
+
+    def save(self, file_obj):
+        """Write collection to an open binary file"""
+        topics = {}
+        if self.has_topics:
+            topics = {
+                "topic_centroids": self.topic_centroids,
+                "topic_order": self.topic_order,
+                "topic_offsets": self.topic_offsets,
+                "topic_scores": self.topic_scores
+            }
+
+        np.savez(
+            file_obj,
+            header=np.array(json.dumps({
+                "embedding_model": self.embedding_model,
+                "constants": self.constants
+            })),
+            embeddings=self.embeddings,
+            chunk_ids=self.chunk_ids,
+            page_numbers=self.page_numbers,
+            char_counts=self.char_counts,
+            text_blob=np.frombuffer(self.texts.blob, dtype=np.uint8),
+            text_block_offsets=self.texts.block_offsets,
+            text_row_offsets=self.texts.row_offsets,
+            **topics
+        )
+
+    @classmethod
+    def load(cls, file_path: str) -> "ColumnarCollection":
+        """Read collection written by save"""
+        with np.load(file_path) as data:
+            header = json.loads(str(data["header"]))
+            # Collections saved before topic maps existed have none
+            topics = {key: data[key] for key in cls._NO_TOPICS if key in data.files}
+            return cls(
+                embedding_model=header["embedding_model"],
+                embeddings=data["embeddings"],
+                chunk_ids=data["chunk_ids"],
+                page_numbers=data["page_numbers"],
+                char_counts=data["char_counts"],
+                texts=CompressedTextColumn(
+                    data["text_blob"].tobytes(),
+                    data["text_block_offsets"],
+                    data["text_row_offsets"]
+                ),
+                constants=header["constants"],
+                **topics
+            )
+
+    @classmethod
+    def from_legacy(cls, collection: Dict, default_model: str) -> "ColumnarCollection":
+        """Convert a pickled dict-of-lists collection"""
+        metadatas = collection['metadatas']
+        core_keys = {"chunk_id", "page_number", "char_count"}
+        constants = {k: v for k, v in metadatas[0].items() if k not in core_keys} if metadatas else {}
+
+        return cls(collection.get('embedding_model', default_model)).append(
+            embeddings=np.array(collection['embeddings']),
+            chunk_ids=[m.get("chunk_id", 0) for m in metadatas],
+            page_numbers=[m.get("page_number", 0) for m in metadatas],
+            char_counts=[m.get("char_count", 0) for m in metadatas],
+            texts=collection['documents'],
+            constants=constants
+        )
@@ -0,0 +1,159 @@
+"""
+Pack retrieved chunks into a prompt context under a token budget
+Adjacent chunks are merged so their overlapping text appears once
+"""
+from typing import Optional, Dict, List
+from .tokens import estimate_tokens
+
+# Shortest shared text treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 20
+
+
+def _overlap(left: str, right: str, max_chars: int) -> int:
+    """
+    Length of the longest suffix of left that is a prefix of right
+
+    Args:
+        left: Earlier chunk
+        right: Following chunk
+        max_chars: Longest overlap to look for
+
+    Returns:
+        Number of characters of right already present at the end of left
+    """
+    probe = right[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+
+    window_start = max(0, len(left) - max_chars)
+    position = left.find(probe, window_start)
+
+    while position != -1:
+        if right.startswith(left[position:]):
+            return len(left) - position
+        position = left.find(probe, position + 1)
+
+    return 0
+
+
+def pack_context(
+    search_results: Dict,
+    token_budget: Optional[int] = None,
+    max_chunks: Optional[int] = None,
+    max_overlap_chars: int = 400
+) -> Dict:
+    """
+    Build prompt context from search results
+
+    Chunks are taken in relevance order. Duplicates and chunks
+    contained in an already selected chunk are skipped. A chunk adjacent to
+    a selected one (same page, neighbouring chunk_id) only costs the tokens
+    it adds beyond their shared overlap. Chunks that do not fit the budget
+    are skipped in favour of smaller, less relevant ones. Selected chunks
+    are merged into passages of consecutive text, ordered by their most
+    relevant chunk.
+
+    Args:
+        search_results: Output of VectorStore.query (documents, metadatas, distances)
+        token_budget: Maximum estimated context tokens (no limit if None)
+        max_chunks: Maximum number of chunks to select (no limit if None)
+        max_overlap_chars: Longest overlap to look for between neighbours
+
+    Returns:
+        context text, the selected results (same shape as search_results)
+        and usage: chunks_retrieved, chunks_used, passages, context_tokens
+        and tokens_saved versus joining the selected chunks verbatim
+    """
+    documents = search_results["documents"]
+    metadatas = search_results["metadatas"]
+    distances = search_results["distances"]
+
+    selected: List[int] = []
+    by_position: Dict[tuple, int] = {}  # (page, chunk_id) -> result index
+    seen_texts = set()
+    total_tokens = 0
+
+    for i, text in enumerate(documents):
+        if max_chunks is not None and len(selected) >= max_chunks:
+            break
+
+        key = " ".join(text.split())
+        if key in seen_texts or any(key in other for other in seen_texts):
+            continue
+
+        page = metadatas[i].get("page_number")
+        chunk_id = metadatas[i].get("chunk_id")
+
+        # Only the text not already covered by a selected neighbour is new
+        new_text = text
+        previous = by_position.get((page, chunk_id - 1)) if chunk_id is not None else None
+        following = by_position.get((page, chunk_id + 1)) if chunk_id is not None else None
+        if previous is not None:
+            new_text = new_text[_overlap(documents[previous], new_text, max_overlap_chars):]
+        if following is not None:
+            shared = _overlap(new_text, documents[following], max_overlap_chars)
+            new_text = new_text[:len(new_text) - shared]
+
+        cost = estimate_tokens(new_text)
+        # The most relevant chunk is always kept, even over budget
+        if token_budget is not None and selected and total_tokens + cost > token_budget:
+            continue
+
+        selected.append(i)
+        seen_texts.add(key)
+        if chunk_id is not None:
+            by_position[(page, chunk_id)] = i
+        total_tokens += cost
+
+    # Merge runs of consecutive chunks into passages
+    rank = {index: position for position, index in enumerate(selected)}
+    ordered = sorted(
+        selected,
+        key=lambda i: (metadatas[i].get("page_number") or 0, metadatas[i].get("chunk_id") or 0)
+    )
+
+    passages = []
+    for i in ordered:
+        meta = metadatas[i]
+        last = passages[-1] if passages else None
+
+        if (
+            last is not None
+            and meta.get("chunk_id") is not None
+            and last["page"] == meta.get("page_number")
+            and last["chunk_id"] + 1 == meta.get("chunk_id")
+        ):
+            shared = _overlap(last["text"], documents[i], max_overlap_chars)
+            joiner = "" if shared else " "
+            last["text"] += joiner + documents[i][shared:]
+            last["chunk_id"] = meta["chunk_id"]
+            last["rank"] = min(last["rank"], rank[i])
+        else:
+            passages.append({
+                "page": meta.get("page_number"),
+                "chunk_id": meta.get("chunk_id"),
+                "text": documents[i],
+                "rank": rank[i]
+            })
+
+    passages.sort(key=lambda passage: passage["rank"])
+    context = "\n\n".join(passage["text"] for passage in passages)
+    context_tokens = estimate_tokens(context)
+    joined_tokens = estimate_tokens("\n\n".join(documents[i] for i in selected))
+
+    return {
+        "context": context,
+        "results": {
+            "documents": [documents[i] for i in selected],
+            "metadatas": [metadatas[i] for i in selected],
+            "distances": [distances[i] for i in selected],
+            "count": len(selected)
+        },
+        "usage": {
+            "chunks_retrieved": len(documents),
+            "chunks_used": len(selected),
+            "passages": len(passages),
+            "context_tokens": context_tokens,
+            "tokens_saved": max(0, joined_tokens - context_tokens)
+        }
+    }
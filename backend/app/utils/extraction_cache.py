@@ -0,0 +1,92 @@
+"""
+On-disk cache for extracted PDF page text
+Keyed by file content hash and extractor version
+"""
+import gzip
+import hashlib
+import json
+import os
+import uuid
+from typing import List, Optional
+from ..core.config import settings
+
+
+def compute_file_hash(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """
+    Compute SHA-256 hash of a file without loading it into memory
+
+    Args:
+        file_path: Path to file
+        block_size: Bytes read per iteration
+
+    Returns:
+        Hex digest of file content
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Store per-page text as gzip-compressed JSON, one file per PDF"""
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Initialize extraction cache
+
+        Args:
+            cache_dir: Directory for cache files (defaults to settings)
+        """
+        self.cache_dir = cache_dir or settings.EXTRACTION_CACHE_DIR
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, file_hash: str, extractor_version: str) -> str:
+        """Build cache file path for a hash/version pair"""
+        return os.path.join(self.cache_dir, f"{file_hash}.{extractor_version}.json.gz")
+
+    def get(self, file_hash: str, extractor_version: str) -> Optional[List[str]]:
+        """
+        Load cached page texts
+
+        Args:
+            file_hash: Content hash of the PDF
+            extractor_version: Version tag of the extractor
+
+        Returns:
+            List of page texts in page order, or None on miss
+        """
+        file_path = self._path(file_hash, extractor_version)
+
+        if not os.path.exists(file_path):
+            return None
+
+        try:
+            with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+                return json.load(f)["pages"]
+        except Exception:
+            # Corrupt or partial entry - treat as miss, it will be rewritten
+            return None
+
+    def set(self, file_hash: str, extractor_version: str, pages: List[str]):
+        """
+        Store page texts for a PDF
+
+        Args:
+            file_hash: Content hash of the PDF
+            extractor_version: Version tag of the extractor
+            pages: List of page texts in page order
+        """
+        file_path = self._path(file_hash, extractor_version)
+        tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump({"pages": pages}, f, separators=(',', ':'))
+
+            # Atomic rename so readers never see a half-written entry
+            os.replace(tmp_path, file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
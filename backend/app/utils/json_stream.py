@@ -0,0 +1,146 @@
+"""
+Incremental parsing of JSON arrays streamed by an LLM
+"""
+import json
+import re
+from typing import List, Dict, Optional
+
+
+# Opening markdown code fence, e.g. ```json
+FENCE = re.compile(r"^\s*```[A-Za-z]*")
+
+
+class JsonArrayStreamParser:
+    """
+    Emit each object of a JSON array as soon as it is complete
+
+    Text is fed in arbitrary fragments. The parser tracks strings, escapes
+    and nesting, and decodes an element once its closing brace arrives, so
+    a malformed or truncated tail only loses the element it belongs to.
+    Surrounding prose and markdown code fences are ignored.
+    """
+
+    def __init__(self, array_key: Optional[str] = None):
+        """
+        Initialize parser
+
+        Args:
+            array_key: Key whose array value holds the items (e.g. "questions").
+                A top-level array is used when no key is given, or when the
+                output itself starts with the array (after an optional code
+                fence).
+        """
+        self.array_key = array_key
+        self.buffer = ""
+        self.position = 0
+
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        self.last_string: Optional[str] = None
+        self.pending_key: Optional[str] = None
+        self.stack: List[str] = []
+
+        self.array_depth: Optional[int] = None  # Stack size just outside the target array
+        self.item_start: Optional[int] = None
+
+        self.items: List[Dict] = []
+        self.skipped = 0
+        self.complete = False
+
+    def feed(self, text: str) -> List[Dict]:
+        """
+        Add streamed text
+
+        Args:
+            text: Next fragment of the response
+
+        Returns:
+            Items completed by this fragment
+        """
+        self.buffer += text
+        completed = []
+
+        while self.position < len(self.buffer) and not self.complete:
+            char = self.buffer[self.position]
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    self.last_string = self.buffer[self.string_start + 1:self.position]
+            elif char == '"':
+                self.in_string = True
+                self.string_start = self.position
+            elif char == ':':
+                self.pending_key = self.last_string
+            elif char in '{[':
+                if char == '[' and self.array_depth is None and self._is_target_array():
+                    self.array_depth = len(self.stack)
+                elif char == '{' and self.array_depth is not None and len(self.stack) == self.array_depth + 1:
+                    self.item_start = self.position
+                self.stack.append(char)
+                self.pending_key = None
+            elif char in '}]':
+                if self.stack:
+                    self.stack.pop()
+                self.pending_key = None
+
+                if self.array_depth is not None:
+                    if char == '}' and self.item_start is not None and len(self.stack) == self.array_depth + 1:
+                        item = self._decode(self.buffer[self.item_start:self.position + 1])
+                        if item is not None:
+                            completed.append(item)
+                        self.item_start = None
+                    elif char == ']' and len(self.stack) == self.array_depth:
+                        self.complete = True
+            elif char == ',':
+                self.pending_key = None
+
+            self.position += 1
+
+        self.items.extend(completed)
+        return completed
+
+    def _is_target_array(self) -> bool:
+        """Whether a '[' at the current position opens the array we want"""
+        if self.array_key is None:
+            return True
+        if self.pending_key == self.array_key:
+            return True
+        # A bare array only counts if nothing but a code fence precedes it, so
+        # brackets in leading prose ("Here are [5] questions") are not taken for it
+        return not self.stack and not FENCE.sub("", self.buffer[:self.position]).strip()
+
+    def _decode(self, text: str) -> Optional[Dict]:
+        """Decode one element, counting it as skipped if malformed"""
+        try:
+            item = json.loads(text)
+        except ValueError:
+            self.skipped += 1
+            return None
+
+        if not isinstance(item, dict):
+            self.skipped += 1
+            return None
+
+        return item
+
+
+def salvage_json_array(response: str, array_key: Optional[str] = None) -> JsonArrayStreamParser:
+    """
+    Parse a complete response with the incremental parser
+
+    Args:
+        response: Raw LLM output
+        array_key: Key whose array value holds the items
+
+    Returns:
+        Parser holding the recovered items and completeness flags
+    """
+    parser = JsonArrayStreamParser(array_key)
+    parser.feed(response)
+    return parser
@@ -0,0 +1,88 @@
+"""
+Spherical k-means for clustering unit-normalized embeddings
+"""
+import numpy as np
+from typing import Tuple
+
+
+def choose_topic_count(num_rows: int, max_topics: int) -> int:
+    """
+    Number of clusters for a collection (rule of thumb sqrt(n / 2))
+
+    Args:
+        num_rows: Number of embeddings
+        max_topics: Upper bound
+
+    Returns:
+        Cluster count between 1 and min(num_rows, max_topics)
+    """
+    if num_rows <= 0:
+        return 0
+    return int(min(num_rows, max_topics, max(1, round(np.sqrt(num_rows / 2)))))
+
+
+def spherical_kmeans(
+    embeddings: np.ndarray,
+    k: int,
+    iterations: int = 25,
+    seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Cluster unit vectors by cosine similarity
+
+    Seeds with k-means++ and runs Lloyd iterations with one (n x k) matrix
+    product each. Centroids are re-normalized, so similarity to a centroid
+    is a dot product. Deterministic for a given seed.
+
+    Args:
+        embeddings: Unit-normalized rows (n x d)
+        k: Number of clusters (at most n)
+        iterations: Maximum Lloyd iterations
+        seed: Random seed
+
+    Returns:
+        (centroids (k x d), labels (n,), similarity of each row to its centroid (n,))
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    n = len(embeddings)
+    k = max(1, min(k, n))
+    rng = np.random.default_rng(seed)
+
+    # k-means++ seeding on cosine distance
+    centroids = np.empty((k, embeddings.shape[1]), dtype=np.float32)
+    centroids[0] = embeddings[rng.integers(n)]
+    distance = 1.0 - embeddings @ centroids[0]
+    for i in range(1, k):
+        weights = np.clip(distance, 0, None) ** 2
+        total = weights.sum()
+        pick = rng.choice(n, p=weights / total) if total > 0 else rng.integers(n)
+        centroids[i] = embeddings[pick]
+        distance = np.minimum(distance, 1.0 - embeddings @ centroids[i])
+
+    labels = np.full(n, -1, dtype=np.int64)
+    for _ in range(iterations):
+        similarities = embeddings @ centroids.T
+        new_labels = np.argmax(similarities, axis=1)
+
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, embeddings)
+        counts = np.bincount(labels, minlength=k)
+
+        # Re-seed empty clusters with the rows furthest from their centroid
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            furthest = np.argsort(similarities[np.arange(n), labels])[:len(empty)]
+            sums[empty] = embeddings[furthest]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.where(norms == 0, 1, norms)
+
+    similarities = embeddings @ centroids.T
+    labels = np.argmax(similarities, axis=1)
+    scores = similarities[np.arange(n), labels]
+
+    return centroids.astype(np.float32), labels, scores.astype(np.float32)
@@ -0,0 +1,41 @@
+"""
+Helpers for reading JSON out of LLM responses
+"""
+import json
+import re
+from typing import Dict
+
+
+def strip_code_fences(response: str) -> str:
+    """Remove a surrounding ```json ... ``` block if present"""
+    cleaned = response.strip()
+    if cleaned.startswith('```'):
+        match = re.search(r'```(?:json)?\s*\n?(.*?)\n?```', cleaned, re.DOTALL)
+        if match:
+            cleaned = match.group(1).strip()
+    return cleaned
+
+
+def extract_json_object(response: str) -> Dict:
+    """
+    Parse the outermost JSON object in an LLM response
+
+    Handles markdown code fences and text before or after the object.
+
+    Args:
+        response: Raw LLM output
+
+    Returns:
+        Parsed object
+
+    Raises:
+        ValueError: If no JSON object is found or it does not parse
+    """
+    cleaned = strip_code_fences(response)
+
+    json_start = cleaned.find('{')
+    json_end = cleaned.rfind('}') + 1
+    if json_start == -1 or json_end <= json_start:
+        raise ValueError("no JSON found")
+
+    return json.loads(cleaned[json_start:json_end])
@@ -2,59 +2,124 @@
 PDF processing utilities: text extraction and chunking
 """
 import PyPDF2
-from typing import List, Dict
+from typing import List, Dict, Optional
 import re
+from .extraction_cache import ExtractionCache, compute_file_hash
+
+
+class Chunk:
+    """
+    Lightweight text chunk record
+    
+    Uses __slots__ instead of a per-chunk dict; convert with to_dict()
+    only where a plain dictionary is needed (e.g. API responses).
+    """
+    
+    __slots__ = ("chunk_id", "text", "start_char", "end_char", "char_count", "page_number")
+    
+    def __init__(
+        self,
+        chunk_id: int,
+        text: str,
+        start_char: int,
+        end_char: int,
+        page_number: int = 0
+    ):
+        self.chunk_id = chunk_id
+        self.text = text
+        self.start_char = start_char
+        self.end_char = end_char
+        self.char_count = len(text)
+        self.page_number = page_number
+    
+    def to_dict(self) -> Dict[str, any]:
+        """Convert to a plain dictionary"""
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+    
+    def __repr__(self) -> str:
+        return f"Chunk(page={self.page_number}, id={self.chunk_id}, chars={self.char_count})"
 
 
 class PDFProcessor:
     """Handle PDF text extraction and chunking"""
     
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    # Bump when extraction output changes so stale cache entries are ignored
+    EXTRACTOR_VERSION = f"pypdf2-{PyPDF2.__version__}-1"
+    
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        extraction_cache: Optional[ExtractionCache] = None
+    ):
         """
         Initialize PDF processor
         
         Args:
             chunk_size: Maximum characters per chunk
             chunk_overlap: Overlap between consecutive chunks
+            extraction_cache: Optional on-disk cache for extracted page text
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.extraction_cache = extraction_cache
     
-    def extract_text(self, pdf_path: str) -> Dict[str, any]:
+    def extract_text(
+        self,
+        pdf_path: str,
+        file_hash: Optional[str] = None,
+        use_cache: bool = True
+    ) -> Dict[str, any]:
         """
         Extract text from PDF file
         
         Args:
             pdf_path: Path to PDF file
+            file_hash: Precomputed content hash (computed if omitted)
+            use_cache: Read/write the extraction cache when configured
             
         Returns:
             Dictionary with extracted text and metadata
         """
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                total_pages = len(pdf_reader.pages)
-                
-                # Extract text from all pages
-                full_text = ""
-                page_texts = []
-                
-                for page_num, page in enumerate(pdf_reader.pages):
-                    page_text = page.extract_text()
-                    page_texts.append({
-                        "page_number": page_num + 1,
-                        "text": page_text,
-                        "char_count": len(page_text)
-                    })
-                    full_text += page_text + "\n\n"
+            cache = self.extraction_cache if use_cache else None
+            
+            if cache and not file_hash:
+                file_hash = compute_file_hash(pdf_path)
+            
+            # Serve from cache when this file was already parsed
+            pages = cache.get(file_hash, self.EXTRACTOR_VERSION) if cache else None
+            from_cache = pages is not None
+            
+            if pages is None:
+                with open(pdf_path, 'rb') as file:
+                    pdf_reader = PyPDF2.PdfReader(file)
+                    pages = [page.extract_text() for page in pdf_reader.pages]
                 
-                return {
-                    "success": True,
-                    "total_pages": total_pages,
-                    "full_text": full_text,
-                    "page_texts": page_texts,
-                    "total_chars": len(full_text)
-                }
+                if cache:
+                    cache.set(file_hash, self.EXTRACTOR_VERSION, pages)
+            
+            # Build page-wise text and metadata
+            full_text = ""
+            page_texts = []
+            
+            for page_num, page_text in enumerate(pages):
+                page_texts.append({
+                    "page_number": page_num + 1,
+                    "text": page_text,
+                    "char_count": len(page_text)
+                })
+                full_text += page_text + "\n\n"
+            
+            return {
+                "success": True,
+                "total_pages": len(pages),
+                "full_text": full_text,
+                "page_texts": page_texts,
+                "total_chars": len(full_text),
+                "file_hash": file_hash,
+                "from_cache": from_cache
+            }
                 
         except Exception as e:
             return {
@@ -83,15 +148,16 @@ class PDFProcessor:
         
         return text
     
-    def create_chunks(self, text: str) -> List[Dict[str, any]]:
+    def create_chunks(self, text: str, page_number: int = 0) -> List[Chunk]:
         """
         Split text into overlapping chunks
         
         Args:
             text: Text to chunk
+            page_number: Page the text comes from
             
         Returns:
-            List of chunk dictionaries with metadata
+            List of chunk records with metadata
         """
         # Clean the text first
         text = self.clean_text(text)
@@ -116,13 +182,7 @@ class PDFProcessor:
             chunk_text = text[start:end].strip()
             
             if chunk_text:  # Only add non-empty chunks
-                chunks.append({
-                    "chunk_id": chunk_id,
-                    "text": chunk_text,
-                    "start_char": start,
-                    "end_char": end,
-                    "char_count": len(chunk_text)
-                })
+                chunks.append(Chunk(chunk_id, chunk_text, start, end, page_number))
                 chunk_id += 1
             
             # Move to next chunk with overlap
@@ -130,7 +190,7 @@ class PDFProcessor:
         
         return chunks
     
-    def create_page_chunks(self, page_texts: List[Dict]) -> List[Dict[str, any]]:
+    def create_page_chunks(self, page_texts: List[Dict]) -> List[Chunk]:
         """
         Create chunks from page-wise text
         
@@ -143,11 +203,6 @@ class PDFProcessor:
         all_chunks = []
         
         for page in page_texts:
-            page_chunks = self.create_chunks(page["text"])
-            
-            # Add page metadata to each chunk
-            for chunk in page_chunks:
-                chunk["page_number"] = page["page_number"]
-                all_chunks.append(chunk)
+            all_chunks.extend(self.create_chunks(page["text"], page["page_number"]))
         
         return all_chunks
@@ -0,0 +1,114 @@
+"""
+Single-flight coalescing of identical concurrent async calls
+"""
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict
+
+
+def make_flight_key(**parts: Any) -> str:
+    """
+    Stable hash of the values that make two calls identical
+
+    Args:
+        parts: JSON-serializable values (e.g. model, prompt, max_tokens)
+
+    Returns:
+        SHA-256 hex digest
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    """One upstream call and the callers waiting for it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Share one in-flight call between concurrent callers with the same key
+
+    The first caller starts the call as a task; callers arriving before it
+    finishes await the same task and receive its result or exception.
+    Nothing is kept once the call completes, so this is not a cache. A
+    caller that is cancelled stops waiting without cancelling the call for
+    the others; the call is cancelled only when every caller has gone.
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        Initialize single-flight group
+
+        Args:
+            enabled: If False, every call goes upstream
+        """
+        self.enabled = enabled
+        self._flights: Dict[str, _Flight] = {}
+
+        # Metrics
+        self.calls = 0
+        self.coalesced = 0
+        self.peak_waiters = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn, or join an identical call already in flight
+
+        Args:
+            key: Identity of the call (see make_flight_key)
+            fn: Coroutine function starting the call
+
+        Returns:
+            Result of the shared call
+        """
+        if not self.enabled:
+            self.calls += 1
+            return await fn()
+
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._finish(key, flight))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        self.peak_waiters = max(self.peak_waiters, flight.waiters)
+
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+                self._finish(key, flight)
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _finish(self, key: str, flight: _Flight):
+        """Forget a completed call so the next caller starts a fresh one"""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+        # Retrieve the exception so an abandoned failed call is not logged as unhandled
+        if flight.task.done() and not flight.task.cancelled():
+            flight.task.exception()
+
+    def stats(self) -> Dict:
+        """Snapshot of coalescing metrics"""
+        requests = self.calls + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._flights),
+            "upstream_calls": self.calls,
+            "coalesced": self.coalesced,
+            "coalesce_rate": round(self.coalesced / requests, 3) if requests else 0.0,
+            "peak_waiters": self.peak_waiters
+        }
@@ -0,0 +1,21 @@
+"""
+Token count estimates for prompt budgeting
+"""
+
+# Average characters per token for English text with the Gemini and GPT tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in text
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Approximate token count (at least 1 for non-empty text)
+    """
+    if not text:
+        return 0
+    return max(1, -(-len(text) // CHARS_PER_TOKEN))
@@ -2,6 +2,7 @@
 Test conversation memory in chat
 """
 import sys
+import asyncio
 import os
 sys.path.insert(0, os.path.dirname(__file__))
 
@@ -19,13 +20,13 @@ print("=" * 60)
 # First question
 print("\n1️⃣ First Question (no history):")
 question1 = "What is the main topic of this document?"
-response1 = rag.query(
+response1 = asyncio.run(rag.query(
     collection_name=collection_name,
     question=question1,
     n_results=5,
     include_sources=False,
     chat_history=[]
-)
+))
 print(f"Q: {question1}")
 print(f"A: {response1['answer']}\n")
 
@@ -38,13 +39,13 @@ chat_history = [
 # Second question with context reference
 print("\n2️⃣ Second Question (with history - using 'it'):")
 question2 = "Can you explain more about it?"
-response2 = rag.query(
+response2 = asyncio.run(rag.query(
     collection_name=collection_name,
     question=question2,
     n_results=5,
     include_sources=False,
     chat_history=chat_history
-)
+))
 print(f"Q: {question2}")
 print(f"A: {response2['answer']}\n")
 
@@ -57,13 +58,13 @@ chat_history.extend([
 # Third question - follow-up
 print("\n3️⃣ Third Question (with full history - another follow-up):")
 question3 = "What are the key features mentioned?"
-response3 = rag.query(
+response3 = asyncio.run(rag.query(
     collection_name=collection_name,
     question=question3,
     n_results=5,
     include_sources=False,
     chat_history=chat_history
-)
+))
 print(f"Q: {question3}")
 print(f"A: {response3['answer']}\n")
 
@@ -0,0 +1,76 @@
+"""
+Ingestion de-duplication: repeated header/footer lines and near-duplicate chunks
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.chunk_dedup import ChunkDeduplicator
+from app.utils.pdf_processor import Chunk
+
+dedup = ChunkDeduplicator(min_page_ratio=0.5, min_pages=3, similarity_threshold=0.85)
+
+BODIES = [
+    "Normalization removes redundancy by splitting tables along functional dependencies.",
+    "A transaction is atomic, consistent, isolated and durable across failures.",
+    "Indexes trade extra storage and slower writes for much faster lookups.",
+    "Joins combine rows of two tables that agree on the join columns.",
+    "Views are stored queries that present derived tables to their users.",
+]
+
+
+def slide(number, body):
+    return {
+        "page_number": number,
+        "text": f"CS101 Databases - Spring Term\n{body}\nPage {number} of {len(BODIES)}\n(c) 2026 University"
+    }
+
+
+print("1. Header, page-numbered footer and copyright repeated on every slide")
+pages, removed = dedup.strip_repeated_lines([slide(i + 1, body) for i, body in enumerate(BODIES)])
+print(f"   removed {removed} lines | page 2: {pages[1]['text']!r}")
+assert removed == 3 * len(BODIES)
+assert [page["text"] for page in pages] == BODIES
+assert all(page["char_count"] == len(page["text"]) for page in pages)
+
+print("2. Short documents are left alone")
+pages, removed = dedup.strip_repeated_lines([slide(i + 1, body) for i, body in enumerate(BODIES[:2])])
+print(f"   removed {removed} lines")
+assert removed == 0 and BODIES[0] in pages[0]["text"] and "CS101" in pages[0]["text"]
+
+print("3. A line repeated on a minority of pages is kept")
+page_texts = [slide(i + 1, body) for i, body in enumerate(BODIES)]
+page_texts[0]["text"] += "\nSee the appendix"
+page_texts[1]["text"] += "\nSee the appendix"
+pages, removed = dedup.strip_repeated_lines(page_texts)
+print(f"   removed {removed} lines | page 1 ends with: {pages[0]['text'].splitlines()[-1]!r}")
+assert "See the appendix" in pages[0]["text"]
+
+print("4. Near-duplicate chunks collapse to the first occurrence")
+paragraph = " ".join(f"Point {i}: {BODIES[i % len(BODIES)]}" for i in range(20))
+chunks = [
+    Chunk(0, paragraph, 0, len(paragraph), page_number=1),
+    Chunk(1, BODIES[2] + " " + BODIES[3], 0, 150, page_number=2),
+    Chunk(2, paragraph.replace("faster", "quicker", 1), 0, len(paragraph), page_number=3),
+    Chunk(3, paragraph, 0, len(paragraph), page_number=4),
+]
+kept, removed = dedup.remove_near_duplicates(chunks)
+print(f"   kept chunk IDs {[chunk.chunk_id for chunk in kept]} | removed {removed}")
+assert [chunk.chunk_id for chunk in kept] == [0, 1] and removed == 2
+
+print("5. Distinct chunks are all kept")
+kept, removed = dedup.remove_near_duplicates([
+    Chunk(i, body, 0, len(body), page_number=i + 1) for i, body in enumerate(BODIES)
+])
+print(f"   kept {len(kept)} | removed {removed}")
+assert len(kept) == len(BODIES) and removed == 0
+
+print("6. Chunks duplicating already indexed text are dropped")
+kept, removed = dedup.remove_near_duplicates(
+    [Chunk(0, paragraph, 0, len(paragraph), page_number=6), Chunk(1, BODIES[4], 0, len(BODIES[4]), page_number=7)],
+    existing_texts=[paragraph.replace("faster", "quicker", 1)]
+)
+print(f"   kept chunk IDs {[chunk.chunk_id for chunk in kept]} | removed {removed}")
+assert [chunk.chunk_id for chunk in kept] == [1] and removed == 1
+
+print("All passed")
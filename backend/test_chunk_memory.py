@@ -0,0 +1,56 @@
+"""
+Memory benchmark: slots-based Chunk records vs per-chunk dictionaries
+"""
+import sys
+import os
+import random
+import tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.pdf_processor import PDFProcessor
+
+NUM_PAGES = 300
+WORDS = ["normalization", "relation", "schema", "transaction", "index", "query",
+         "the", "of", "a", "is", "and", "key", "table", "join", "database"]
+
+random.seed(0)
+page_texts = [
+    {
+        "page_number": page + 1,
+        "text": ". ".join(" ".join(random.choices(WORDS, k=12)) for _ in range(40))
+    }
+    for page in range(NUM_PAGES)
+]
+
+processor = PDFProcessor()
+
+
+def measure(build):
+    """Return (result, retained bytes, peak bytes) for build()"""
+    tracemalloc.start()
+    result = build()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained, peak
+
+
+# Before: one dict per chunk (what create_page_chunks used to return)
+dicts, dict_retained, dict_peak = measure(
+    lambda: [chunk.to_dict() for chunk in processor.create_page_chunks(page_texts)]
+)
+
+# After: slots-based records
+chunks, chunk_retained, chunk_peak = measure(
+    lambda: processor.create_page_chunks(page_texts)
+)
+
+print("Chunk Record Memory Benchmark")
+print("=" * 60)
+print(f"Pages: {NUM_PAGES}, chunks: {len(chunks)}")
+print(f"dict records:  retained {dict_retained / 1e6:.2f} MB, peak {dict_peak / 1e6:.2f} MB")
+print(f"Chunk records: retained {chunk_retained / 1e6:.2f} MB, peak {chunk_peak / 1e6:.2f} MB")
+
+text_bytes = sum(sys.getsizeof(chunk.text) for chunk in chunks)
+print(f"(chunk text itself: {text_bytes / 1e6:.2f} MB in both cases)")
+print(f"Per-record overhead: dict {(dict_retained - text_bytes) / len(chunks):.0f} B, "
+      f"Chunk {(chunk_retained - text_bytes) / len(chunks):.0f} B")
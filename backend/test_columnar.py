@@ -0,0 +1,73 @@
+"""
+Columnar collections: per-row metadata arrays, compressed texts and the file format
+"""
+import sys
+import os
+import tempfile
+import numpy as np
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.columnar import ColumnarCollection, CompressedTextColumn
+
+ROWS = 150  # More than two text blocks
+TEXTS = [f"Chunk {i}: " + "normalization " * (i % 7) for i in range(ROWS)]
+rng = np.random.default_rng(0)
+
+collection = ColumnarCollection("all-MiniLM-L6-v2").append(
+    embeddings=rng.normal(size=(ROWS, 8)),
+    chunk_ids=list(range(ROWS)),
+    page_numbers=[i // 10 + 1 for i in range(ROWS)],
+    char_counts=[len(text) for text in TEXTS],
+    texts=TEXTS,
+    constants={"user_id": 1, "filename": "db.pdf"}
+)
+
+print("1. Rows, metadata and constants")
+print(f"   {len(collection)} rows | row 42: {collection.metadata(42)}")
+assert len(collection) == ROWS
+assert collection.metadata(42) == {"chunk_id": 42, "page_number": 5, "char_count": len(TEXTS[42]), "user_id": 1, "filename": "db.pdf"}
+assert np.allclose(np.linalg.norm(collection.embeddings, axis=1), 1.0)
+
+print("2. Texts are decoded per row, across blocks and in any order")
+rows = [149, 0, 64, 63, 100]
+assert collection.texts.get(rows) == [TEXTS[i] for i in rows]
+assert collection.texts.all() == TEXTS
+print(f"   {len(collection.texts.blob)} compressed bytes for {sum(len(t) for t in TEXTS)} characters")
+
+print("3. Appending leaves the original unchanged")
+grown = collection.append(
+    embeddings=rng.normal(size=(1, 8)), chunk_ids=[ROWS], page_numbers=[99],
+    char_counts=[3], texts=["new"]
+)
+assert len(collection) == ROWS and len(grown) == ROWS + 1 and grown.texts.get([ROWS]) == ["new"]
+
+print("4. take keeps the chosen rows in order")
+subset = collection.take(np.array([5, 120, 7]))
+assert subset.texts.all() == [TEXTS[5], TEXTS[120], TEXTS[7]]
+assert subset.chunk_ids.tolist() == [5, 120, 7] and subset.constants == collection.constants
+
+print("5. Save and load round trip")
+with tempfile.TemporaryDirectory() as directory:
+    path = os.path.join(directory, "doc.npz")
+    with open(path, "wb") as f:
+        collection.save(f)
+    loaded = ColumnarCollection.load(path)
+    print(f"   file size: {os.path.getsize(path)} bytes")
+assert loaded.embedding_model == "all-MiniLM-L6-v2" and loaded.constants == collection.constants
+assert loaded.texts.all() == TEXTS and np.array_equal(loaded.embeddings, collection.embeddings)
+assert loaded.page_numbers.tolist() == collection.page_numbers.tolist()
+
+print("6. Pickled collections convert without losing rows")
+legacy = ColumnarCollection.from_legacy({
+    "embeddings": rng.normal(size=(2, 8)).tolist(),
+    "documents": ["a", "b"],
+    "metadatas": [
+        {"chunk_id": 0, "page_number": 1, "char_count": 1, "user_id": 3, "filename": "old.pdf"},
+        {"chunk_id": 1, "page_number": 2, "char_count": 1, "user_id": 3, "filename": "old.pdf"}
+    ]
+}, "legacy-model")
+assert legacy.embedding_model == "legacy-model" and legacy.texts.all() == ["a", "b"]
+assert legacy.metadata(1) == {"chunk_id": 1, "page_number": 2, "char_count": 1, "user_id": 3, "filename": "old.pdf"}
+
+assert isinstance(CompressedTextColumn.from_texts([]).all(), list)
+print("All passed")
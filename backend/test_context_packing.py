@@ -0,0 +1,62 @@
+"""
+Context packing: overlap merging, duplicate removal and the token budget
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.context_packing import pack_context
+from app.utils.tokens import estimate_tokens
+
+# Three consecutive chunks of one page with a 40-character overlap, as PDFProcessor makes them
+PAGE = (
+    "Normalization organizes columns and tables to reduce redundancy. "
+    "First normal form requires atomic values in every column of a table. "
+    "Second normal form removes partial dependencies on a composite key. "
+    "Third normal form removes transitive dependencies between non-key columns. "
+)
+CHUNKS = [PAGE[0:110], PAGE[70:180], PAGE[140:]]
+
+
+def results(*rows):
+    """Search results for (text, page, chunk_id) rows in relevance order"""
+    return {
+        "documents": [text for text, _, _ in rows],
+        "metadatas": [{"page_number": page, "chunk_id": chunk_id} for _, page, chunk_id in rows],
+        "distances": [0.1 * i for i in range(len(rows))],
+        "count": len(rows)
+    }
+
+
+print("1. Adjacent chunks merge into one passage with the overlap once")
+packed = pack_context(results((CHUNKS[1], 1, 1), (CHUNKS[0], 1, 0), (CHUNKS[2], 1, 2)))
+print(f"   usage: {packed['usage']}")
+assert packed["context"] == PAGE
+assert packed["usage"]["passages"] == 1 and packed["usage"]["tokens_saved"] > 0
+
+print("2. Repeated and contained chunks are dropped")
+packed = pack_context(results((CHUNKS[0], 1, 0), (CHUNKS[0], 2, 5), (CHUNKS[0][10:60], 3, 9)))
+print(f"   chunks used: {packed['usage']['chunks_used']}")
+assert packed["results"]["count"] == 1 and packed["context"] == CHUNKS[0]
+
+print("3. Unrelated chunks stay separate, most relevant first")
+other = "Indexes trade extra storage and slower writes for much faster lookups on large tables."
+packed = pack_context(results((other, 4, 0), (CHUNKS[0], 1, 0)))
+print(f"   passages: {packed['context'].split(chr(10) + chr(10))[0][:30]!r}...")
+assert packed["context"] == other + "\n\n" + CHUNKS[0]
+
+print("4. Token budget skips chunks that don't fit but keeps the top one")
+big = "Relational algebra " * 60
+small = "A key identifies each row of a table uniquely."
+budget = estimate_tokens(CHUNKS[0]) + estimate_tokens(small)
+packed = pack_context(results((CHUNKS[0], 1, 0), (big, 6, 0), (small, 7, 0)), token_budget=budget)
+print(f"   budget {budget} | used {packed['usage']['context_tokens']} | chunks {packed['usage']['chunks_used']}")
+assert packed["results"]["documents"] == [CHUNKS[0], small]
+packed = pack_context(results((big, 6, 0), (small, 7, 0)), token_budget=5)
+assert packed["results"]["documents"] == [big]
+
+print("5. max_chunks caps the selection")
+packed = pack_context(results((CHUNKS[0], 1, 0), (other, 4, 0), (small, 7, 0)), max_chunks=2)
+assert packed["results"]["count"] == 2
+
+print("All passed")
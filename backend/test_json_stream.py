@@ -0,0 +1,50 @@
+"""
+Incremental quiz JSON parsing: fragments, leading prose, bare arrays and truncation
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.json_stream import JsonArrayStreamParser, salvage_json_array
+
+QUESTIONS = '{"questions": [{"question": "What is [1NF]?"}, {"question": "Why {keys}?"}]}'
+
+
+def feed_in_pieces(parser, text, size=3):
+    for start in range(0, len(text), size):
+        parser.feed(text[start:start + size])
+    return parser
+
+
+def check(name, parser, count, complete):
+    print(f"{name}: {len(parser.items)} items, complete={parser.complete}, skipped={parser.skipped}")
+    assert len(parser.items) == count and parser.complete == complete, name
+
+
+check("1. Keyed array in 3-char fragments", feed_in_pieces(JsonArrayStreamParser("questions"), QUESTIONS), 2, True)
+
+check(
+    "2. Leading prose with brackets",
+    salvage_json_array("Here are [5] questions:\n" + QUESTIONS, "questions"),
+    2, True
+)
+
+check(
+    "3. Bare top-level array",
+    salvage_json_array('[{"question": "a"}, {"question": "b"}]', "questions"),
+    2, True
+)
+
+check(
+    "4. Bare array in a code fence",
+    salvage_json_array('```json\n[{"question": "a"}]\n```', "questions"),
+    1, True
+)
+
+check(
+    "5. Truncated tail keeps finished items",
+    salvage_json_array(QUESTIONS[:-20], "questions"),
+    1, False
+)
+
+print("All passed")
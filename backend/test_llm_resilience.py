@@ -0,0 +1,124 @@
+"""
+Retry, hedging and circuit breaker behaviour against a local fake provider
+No network or API keys needed: the fake injects latency and errors per call
+"""
+import sys
+import os
+import asyncio
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+
+# Fast timings for the demo
+settings.LLM_MAX_RETRIES = 2
+settings.LLM_RETRY_BASE_DELAY = 0.01
+settings.LLM_RETRY_MAX_DELAY = 0.05
+settings.LLM_TIMEOUT = 0.5
+settings.LLM_BREAKER_FAILURES = 3
+settings.LLM_BREAKER_COOLDOWN = 0.2
+settings.LLM_HEDGE_MIN_SAMPLES = 5
+settings.LLM_HEDGE_PERCENTILE = 95
+
+from app.services.llm_providers import LLMProvider
+from app.services.llm_errors import (
+    LLMError, LLMRateLimitError, LLMRequestError, LLMCircuitOpenError, LLMTimeoutError,
+    error_for_status
+)
+
+
+class FakeProvider(LLMProvider):
+    """Provider whose calls follow a script of (latency seconds, HTTP status)"""
+
+    name = "fake"
+    default_model = "fake-1"
+
+    def __init__(self, script=None, max_concurrency=8):
+        super().__init__(max_concurrency=max_concurrency)
+        self.script = list(script or [])
+        self.upstream_calls = 0
+
+    def _ensure_client(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def _request(self, prompt, max_tokens, temperature):
+        self.upstream_calls += 1
+        latency, status = self.script.pop(0) if self.script else (0.01, 200)
+        await asyncio.sleep(latency)
+        if status != 200:
+            raise error_for_status(self.name, status, "injected failure", retry_after=None)
+        return f"ok after {latency}s"
+
+
+async def expect_error(provider, error_class):
+    try:
+        await provider.agenerate("prompt", 100, 0.0)
+    except error_class as e:
+        return e
+    raise AssertionError(f"expected {error_class.__name__}")
+
+
+async def main():
+    print("1. Transient 429 then 503, then success")
+    provider = FakeProvider([(0.01, 429), (0.01, 503), (0.01, 200)])
+    print("  ", await provider.agenerate("prompt", 100, 0.0), "| upstream calls:", provider.upstream_calls)
+
+    print("2. 400 is not retried")
+    provider = FakeProvider([(0.01, 400), (0.01, 200)])
+    error = await expect_error(provider, LLMRequestError)
+    print("  ", type(error).__name__, "| upstream calls:", provider.upstream_calls)
+
+    print("3. Persistent 429 exhausts retries")
+    provider = FakeProvider([(0.01, 429)] * 3)
+    error = await expect_error(provider, LLMRateLimitError)
+    print("  ", type(error).__name__, "| upstream calls:", provider.upstream_calls)
+
+    print("4. Timeouts")
+    provider = FakeProvider([(1.0, 200)] * 3)
+    error = await expect_error(provider, LLMTimeoutError)
+    print("  ", type(error).__name__, "| upstream calls:", provider.upstream_calls)
+
+    print("5. Circuit breaker opens, fails fast, then recovers")
+    provider = FakeProvider([(0.01, 503)] * 3)
+    await expect_error(provider, LLMError)
+    calls_before = provider.upstream_calls
+    error = await expect_error(provider, LLMCircuitOpenError)
+    print("  ", type(error).__name__, "| extra upstream calls:", provider.upstream_calls - calls_before)
+    await asyncio.sleep(settings.LLM_BREAKER_COOLDOWN)
+    await provider.agenerate("prompt", 100, 0.0)
+    print("   after cooldown:", provider.breaker.stats())
+
+    print("6. Hedged request after the p95 latency")
+    settings.LLM_HEDGE_ENABLED = True
+    provider = FakeProvider([(0.02, 200)] * 5 + [(0.4, 200), (0.02, 200)])
+    for _ in range(5):
+        await provider.agenerate("prompt", 100, 0.0)
+    started = time.perf_counter()
+    await provider.agenerate("prompt", 100, 0.0)
+    print(f"   slow call answered in {time.perf_counter() - started:.3f}s | hedges: {provider.hedges}")
+    settings.LLM_HEDGE_ENABLED = False
+
+    await asyncio.sleep(0.01)  # Let the cancelled backup call finish
+    print("Stats:", provider.stats())
+
+    print("7. Trial call cancelled while waiting for a slot hands the trial back")
+    provider = FakeProvider([(0.3, 200)], max_concurrency=1)
+    busy = asyncio.create_task(provider.agenerate("prompt", 100, 0.0))
+    await asyncio.sleep(0.01)
+    provider.breaker.state = "open"
+    provider.breaker.opened_at -= settings.LLM_BREAKER_COOLDOWN + 1
+    trial = asyncio.create_task(provider.agenerate("prompt", 100, 0.0))
+    await asyncio.sleep(0.01)
+    trial.cancel()
+    await asyncio.gather(trial, return_exceptions=True)
+    # Before the fix the breaker stayed half-open with the trial taken and this raised LLMCircuitOpenError
+    next_call = asyncio.create_task(provider.agenerate("prompt", 100, 0.0))
+    await busy
+    print("  ", await next_call, "| circuit:", provider.breaker.state)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+"""
+Task-based routing and failover across providers, using local fake backends
+No network or API keys needed: each fake answers with scripted latency and status
+"""
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+
+# Fast timings for the demo
+settings.LLM_MAX_RETRIES = 0
+settings.LLM_BREAKER_FAILURES = 2
+settings.LLM_BREAKER_COOLDOWN = 60
+
+from app.services.llm_providers import LLMProvider
+from app.services.llm_router import LLMRouter, trace_routes
+from app.services.llm_errors import LLMRequestError, error_for_status
+
+
+class FakeProvider(LLMProvider):
+    """Provider that answers after a fixed latency, or with a scripted HTTP status"""
+
+    def __init__(self, name, latency, statuses=None):
+        self.name = name
+        self.default_model = "fake"
+        super().__init__(max_concurrency=8)
+        self.fixed_latency = latency
+        self.statuses = list(statuses or [])
+        self.upstream_calls = 0
+
+    def _ensure_client(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def _request(self, prompt, max_tokens, temperature):
+        self.upstream_calls += 1
+        await asyncio.sleep(self.fixed_latency)
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status != 200:
+            raise error_for_status(self.name, status, "injected failure", retry_after=None)
+        return f"answer from {self.name}"
+
+    async def _stream(self, prompt, max_tokens, temperature):
+        yield await self._request(prompt, max_tokens, temperature)
+
+
+def make_router(slow, fast):
+    return LLMRouter(
+        policies={
+            "chat": {"strategy": "fastest", "backends": ["slow:fake", "fast:fake"]},
+            "default": {"strategy": "preferred", "backends": ["slow:fake", "fast:fake"]}
+        },
+        providers={"slow:fake": slow, "fast:fake": fast},
+        max_error_rate=0.5
+    )
+
+
+async def main():
+    print("1. 'fastest' policy picks the lower-latency backend once both are measured")
+    slow, fast = FakeProvider("slow", 0.05), FakeProvider("fast", 0.01)
+    router = make_router(slow, fast)
+    for _ in range(8):
+        await router.agenerate("chat", "prompt", 100, 0.0)
+    print("   routed:", router.routed["chat"])
+
+    print("2. 'preferred' policy keeps the first healthy backend regardless of latency")
+    for _ in range(3):
+        print("  ", await router.agenerate("default", "prompt", 100, 0.0))
+
+    print("3. Failover on 503, then the unhealthy backend is skipped until the cooldown passes")
+    slow, fast = FakeProvider("slow", 0.01, [503]), FakeProvider("fast", 0.01)
+    router = make_router(slow, fast)
+    for _ in range(3):
+        print("  ", await router.agenerate("default", "prompt", 100, 0.0))
+    print("   failovers:", router.failovers, "| slow circuit:", slow.breaker.state,
+          "| slow upstream calls:", slow.upstream_calls)
+    slow.last_failure_at -= settings.LLM_BREAKER_COOLDOWN
+    print("   after the cooldown:", await router.agenerate("default", "prompt", 100, 0.0))
+
+    print("4. Streaming fails over before the first fragment")
+    slow, fast = FakeProvider("slow", 0.01, [503]), FakeProvider("fast", 0.01)
+    router = make_router(slow, fast)
+    print("  ", [text async for text in router.astream("default", "prompt", 100, 0.0)])
+
+    print("5. 400 is raised without failover")
+    slow, fast = FakeProvider("slow", 0.01, [400]), FakeProvider("fast", 0.01)
+    router = make_router(slow, fast)
+    try:
+        await router.agenerate("default", "prompt", 100, 0.0)
+    except LLMRequestError as e:
+        print("  ", type(e).__name__, "| fast upstream calls:", fast.upstream_calls)
+
+    print("6. Fallback output is flagged so callers do not cache it")
+    slow, fast = FakeProvider("slow", 0.01, [503]), FakeProvider("fast", 0.01)
+    router = make_router(slow, fast)
+    with trace_routes() as route:
+        await router.agenerate("default", "prompt", 100, 0.0)
+    print("   failover:", route)
+    with trace_routes() as route:
+        await router.agenerate("default", "prompt", 100, 0.0)
+    print("   preferred backend still unhealthy:", route)
+    slow.last_failure_at -= settings.LLM_BREAKER_COOLDOWN
+    with trace_routes() as route:
+        await router.agenerate("default", "prompt", 100, 0.0)
+    print("   recovered:", route)
+
+    print("Last decision:", router.stats()["recent_decisions"][-1])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+"""
+Offline mock LLM: canned JSON for each feature and a small load test
+No network or API keys needed; run from backend/ with a DATABASE_URL set
+"""
+import sys
+import os
+import asyncio
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ["DEFAULT_LLM"] = "mock"
+
+from app.core.config import settings
+
+# Short latencies so the demo finishes quickly
+settings.MOCK_LLM_LATENCY_MS = 50
+settings.MOCK_LLM_TOKENS_PER_SECOND = 2000
+
+from app.services.llm_service import LLMService
+from app.services.llm_providers import get_provider
+from app.api.quiz import grade_short_answer, GradeAnswerRequest
+
+
+async def main():
+    llm = LLMService()
+    print("Provider:", llm.model_id)
+
+    print("1. Quiz")
+    quiz = await llm.agenerate_quiz("Photosynthesis converts light into chemical energy.", num_questions=4)
+    print("  ", [q["type"] for q in quiz["questions"]], "| error:", quiz.get("error"))
+
+    print("2. Study plan")
+    plan = await llm.agenerate_study_plan("Python basics", total_days=20, difficulty="easy", daily_hours=3)
+    print("  ", len(plan["weekly_breakdown"]), "weeks |", plan["key_dates"])
+
+    print("3. Grading")
+    result = await grade_short_answer(GradeAnswerRequest(
+        question="Which frameworks does the scraper use?",
+        expected_answer="BeautifulSoup and Scrapy",
+        key_points=["Uses BeautifulSoup", "Uses Scrapy"],
+        user_answer="It scrapes pages with BeautifulSoup."
+    ))
+    print("  ", result)
+
+    print("4. Sync path used by scripts")
+    print("  ", llm.generate("What is 2+2?")[:60], "...")
+
+    print("5. Same prompt, same answer")
+    first = await llm.agenerate("What is 2+2?")
+    print("  ", first == await llm.agenerate("What is 2+2?"), "|", first[:60], "...")
+
+    print("6. Streaming")
+    started = time.perf_counter()
+    fragments = [text async for text in llm.astream("Explain osmosis", max_tokens=200)]
+    print(f"   {len(fragments)} fragments in {time.perf_counter() - started:.3f}s")
+
+    print("7. 200 concurrent chat calls")
+    started = time.perf_counter()
+    await asyncio.gather(*(llm.agenerate(f"Question {i}") for i in range(200)))
+    elapsed = time.perf_counter() - started
+    stats = get_provider("mock").stats()
+    print(f"   {200 / elapsed:.0f} calls/s | p50 {stats['p50_ms']}ms | p95 {stats['p95_ms']}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,6 +2,7 @@
 Test quiz generation to debug the 500 error
 """
 import sys
+import asyncio
 import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -18,12 +19,12 @@ print(f"Testing quiz generation for collection: {collection_name}")
 print("=" * 60)
 
 try:
-    result = rag.generate_quiz(
+    result = asyncio.run(rag.generate_quiz(
         collection_name=collection_name,
         num_questions=5,
         difficulty="medium",
         topic=None
-    )
+    ))
     
     print("\n✓ Quiz generation completed!")
     print(f"\nResult keys: {result.keys()}")
@@ -1,5 +1,7 @@
 import sys
-sys.path.insert(0, 'D:\\studypilot\\backend')
+import os
+import asyncio
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app.services.rag_pipeline import RAGPipeline
 from app.services.llm_service import LLMService
@@ -17,11 +19,11 @@ print("\n=== Testing RAG Pipeline ===")
 rag = RAGPipeline()
 
 try:
-    result = rag.query(
+    result = asyncio.run(rag.query(
         collection_name="doc_80def9726fa34297",
         question="What is this document about?",
         n_results=3
-    )
+    ))
     print("RAG Result:", result)
 except Exception as e:
     print("ERROR:", str(e))
@@ -0,0 +1,69 @@
+"""
+Request coalescing: concurrent identical generations share one upstream call
+No network or API keys needed; run from backend/ with a DATABASE_URL set
+"""
+import sys
+import os
+import asyncio
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ["DEFAULT_LLM"] = "mock"
+
+from app.core.config import settings
+
+# Long enough that every request arrives while the first is in flight
+settings.MOCK_LLM_LATENCY_MS = 200
+settings.MOCK_LLM_TOKENS_PER_SECOND = 5000
+
+from app.services.llm_service import LLMService, generation_flights
+from app.services.llm_providers import get_provider
+
+TEXT = "Normalization removes redundancy from relational tables. " * 40
+
+
+def upstream_calls() -> int:
+    return get_provider("mock").stats()["completed"]
+
+
+async def main():
+    llm = LLMService()
+
+    print("1. 200 concurrent identical summaries")
+    before = upstream_calls()
+    summaries = await asyncio.gather(*(llm.agenerate_summary(TEXT, "concise") for _ in range(200)))
+    calls = upstream_calls() - before
+    print(f"   upstream calls: {calls} | distinct answers: {len(set(summaries))}")
+    assert calls == 1 and len(set(summaries)) == 1
+
+    print("2. 50 concurrent identical quizzes and study plans")
+    before = upstream_calls()
+    quizzes, plans = await asyncio.gather(
+        asyncio.gather(*(llm.agenerate_quiz(TEXT, num_questions=3) for _ in range(50))),
+        asyncio.gather(*(llm.agenerate_study_plan("Databases", total_days=14) for _ in range(50)))
+    )
+    calls = upstream_calls() - before
+    print(f"   upstream calls: {calls} | quizzes parsed: {sum(1 for q in quizzes if q['questions'])}")
+    assert calls == 2 and all(q == quizzes[0] for q in quizzes) and all(p == plans[0] for p in plans)
+
+    print("3. Different summary types are not coalesced")
+    before = upstream_calls()
+    await asyncio.gather(*(
+        llm.agenerate_summary(TEXT, summary_type)
+        for summary_type in ("concise", "detailed", "bullet_points")
+        for _ in range(10)
+    ))
+    calls = upstream_calls() - before
+    print(f"   upstream calls: {calls}")
+    assert calls == 3
+
+    print("4. Finished flights are not reused")
+    before = upstream_calls()
+    await llm.agenerate_summary(TEXT, "concise")
+    print(f"   upstream calls: {upstream_calls() - before}")
+    assert upstream_calls() - before == 1
+
+    print("Stats:", generation_flights.stats())
+    print("All passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,5 +1,7 @@
 import sys
-sys.path.insert(0, 'D:\\studypilot\\backend')
+import os
+import asyncio
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app.services.rag_pipeline import RAGPipeline
 
@@ -7,10 +9,10 @@ rag = RAGPipeline()
 
 print("=== Testing Summary Generation ===")
 try:
-    result = rag.generate_summary(
+    result = asyncio.run(rag.generate_summary(
         collection_name="doc_80def9726fa34297",
         summary_type="concise"
-    )
+    ))
     print("Summary Result:")
     print(result)
 except Exception as e:
@@ -2,6 +2,7 @@
 Direct test of summary generation to debug empty response issue
 """
 import sys
+import asyncio
 import os
 
 # Add the backend directory to Python path
@@ -19,11 +20,11 @@ print(f"Testing summary generation for collection: {collection_name}")
 print("=" * 60)
 
 try:
-    result = rag.generate_summary(
+    result = asyncio.run(rag.generate_summary(
         collection_name=collection_name,
         summary_type="concise",
         page_number=None
-    )
+    ))
     
     print("\n✓ Summary generation successful!")
     print(f"\nSummary Type: {result.get('summary_type', 'N/A')}")
@@ -1,7 +1,7 @@
 import { useState, useEffect, useRef } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
 import { Send, Loader, ArrowLeft, BookOpen } from 'lucide-react'
-import { getDocument, chatWithDocument } from '../services/api'
+import { getDocument, chatWithDocument, createChatSession } from '../services/api'
 import { TextToSpeechButton } from '../hooks/useTextToSpeech'
 
 function Chat() {
@@ -11,6 +11,7 @@ function Chat() {
   const [messages, setMessages] = useState([])
   const [input, setInput] = useState('')
   const [loading, setLoading] = useState(false)
+  const [sessionId, setSessionId] = useState(null)
   const messagesEndRef = useRef(null)
   
   useEffect(() => {
@@ -26,6 +27,14 @@ function Chat() {
       const doc = await getDocument(documentId)
       setDocument(doc)
       
+      // Server keeps the conversation; fall back to sending history if this fails
+      try {
+        const session = await createChatSession(doc.id)
+        setSessionId(session.session_id)
+      } catch (error) {
+        setSessionId(null)
+      }
+      
       // Add welcome message
       setMessages([{
         type: 'assistant',
@@ -64,7 +73,13 @@ function Chat() {
         content: msg.content
       }))
       
-      const response = await chatWithDocument(documentId, currentInput, true, chatHistory)
+      const response = await chatWithDocument(
+        documentId,
+        currentInput,
+        true,
+        sessionId ? [] : chatHistory,
+        sessionId
+      )
       
       const assistantMessage = {
         type: 'assistant',
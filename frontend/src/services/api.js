@@ -10,18 +10,58 @@ const api = axios.create({
 })
 
 // Documents API
-export const uploadDocument = async (file) => {
+// Resolves once the document is processed; pass a signal to stop waiting
+export const uploadDocument = async (file, { signal, timeoutMs } = {}) => {
   const formData = new FormData()
   formData.append('file', file)
   
   const response = await api.post('/documents/upload', formData, {
     headers: {
       'Content-Type': 'multipart/form-data'
-    }
+    },
+    signal
   })
+  return waitForIngestionJob(response.data.id, { signal, timeoutMs })
+}
+
+export const getIngestionJob = async (jobId, { signal } = {}) => {
+  const response = await api.get(`/documents/jobs/${jobId}`, { signal })
   return response.data
 }
 
+const sleep = (ms, signal) => new Promise((resolve, reject) => {
+  if (signal?.aborted) {
+    reject(new Error('Stopped waiting for document processing'))
+    return
+  }
+  const onAbort = () => {
+    clearTimeout(timer)
+    reject(new Error('Stopped waiting for document processing'))
+  }
+  const timer = setTimeout(() => {
+    signal?.removeEventListener('abort', onAbort)
+    resolve()
+  }, ms)
+  signal?.addEventListener('abort', onAbort, { once: true })
+})
+
+// Poll an ingestion job until it finishes, resolving with the document.
+// Gives up after timeoutMs, or as soon as the passed signal is aborted.
+export const waitForIngestionJob = async (jobId, { intervalMs = 1000, timeoutMs = 10 * 60 * 1000, signal } = {}) => {
+  const deadline = Date.now() + timeoutMs
+  while (Date.now() < deadline) {
+    const job = await getIngestionJob(jobId, { signal })
+    if (job.status === 'completed') {
+      return getDocument(job.document_id)
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Document processing failed')
+    }
+    await sleep(Math.min(intervalMs, Math.max(0, deadline - Date.now())), signal)
+  }
+  throw new Error('Document is still processing; check the documents list later')
+}
+
 export const getDocuments = async () => {
   const response = await api.get('/documents/')
   return response.data
@@ -37,38 +77,121 @@ export const deleteDocument = async (documentId) => {
 }
 
 // Chat API
-export const chatWithDocument = async (documentId, question, includeSources = true, chatHistory = []) => {
+// Server-side conversation: pass session_id instead of chat history
+export const createChatSession = async (documentId) => {
+  const response = await api.post('/chat/sessions', { document_id: documentId })
+  return response.data
+}
+
+export const chatWithDocument = async (documentId, question, includeSources = true, chatHistory = [], sessionId = null) => {
   const response = await api.post('/chat/', {
     document_id: documentId,
     question,
     include_sources: includeSources,
-    chat_history: chatHistory
+    chat_history: chatHistory,
+    session_id: sessionId
   })
   return response.data
 }
 
+// POST a JSON body and call onEvent(event, data) for each server-sent event.
+// Abort the passed signal to stop the stream (the server cancels generation).
+const postEventStream = async (path, body, onEvent, signal) => {
+  const response = await fetch(`${API_BASE_URL}${path}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body),
+    signal
+  })
+
+  if (!response.ok) {
+    const error = await response.json().catch(() => ({}))
+    throw new Error(error.detail || `Request failed with status ${response.status}`)
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+
+    buffer += decoder.decode(value, { stream: true })
+    const messages = buffer.split('\n\n')
+    buffer = messages.pop()
+
+    for (const message of messages) {
+      let event = 'message'
+      let data = ''
+      for (const line of message.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7)
+        else if (line.startsWith('data: ')) data += line.slice(6)
+      }
+      if (data) onEvent(event, JSON.parse(data))
+    }
+  }
+}
+
+// Streams the answer: onEvent('sources' | 'token' | 'done' | 'error', data)
+export const streamChatWithDocument = async (documentId, question, onEvent, { includeSources = true, chatHistory = [], sessionId = null, signal } = {}) => {
+  await postEventStream('/chat/stream', {
+    document_id: documentId,
+    question,
+    include_sources: includeSources,
+    chat_history: chatHistory,
+    session_id: sessionId
+  }, onEvent, signal)
+}
+
 // Summary API
-export const generateSummary = async (documentId, summaryType = 'concise', pageNumber = null) => {
+export const generateSummary = async (documentId, summaryType = 'concise', pageNumber = null, regenerate = false, mode = 'retrieval') => {
   const response = await api.post('/summary/', {
     document_id: documentId,
     summary_type: summaryType,
-    page_number: pageNumber
+    page_number: pageNumber,
+    regenerate,
+    mode
   })
   return response.data
 }
 
+// Streams a summary: onEvent('progress' | 'done' | 'error', data)
+export const streamSummary = async (documentId, onEvent, { summaryType = 'concise', pageNumber = null, regenerate = false, mode = 'map_reduce', signal } = {}) => {
+  await postEventStream('/summary/stream', {
+    document_id: documentId,
+    summary_type: summaryType,
+    page_number: pageNumber,
+    regenerate,
+    mode
+  }, onEvent, signal)
+}
+
 // Quiz API
-export const generateQuiz = async (documentId, numQuestions = 5, difficulty = 'medium', topic = null, questionTypes = null) => {
+export const generateQuiz = async (documentId, numQuestions = 5, difficulty = 'medium', topic = null, questionTypes = null, regenerate = false) => {
   const response = await api.post('/quiz/', {
     document_id: documentId,
     num_questions: numQuestions,
     difficulty,
     topic,
-    question_types: questionTypes
+    question_types: questionTypes,
+    regenerate
   })
   return response.data
 }
 
+// Streams questions: onEvent('start' | 'question' | 'done' | 'error', data)
+export const streamQuiz = async (documentId, onEvent, { numQuestions = 5, difficulty = 'medium', topic = null, questionTypes = null, regenerate = false, signal } = {}) => {
+  await postEventStream('/quiz/stream', {
+    document_id: documentId,
+    num_questions: numQuestions,
+    difficulty,
+    topic,
+    question_types: questionTypes,
+    regenerate
+  }, onEvent, signal)
+}
+
 export const gradeShortAnswer = async (userAnswer, expectedAnswer, keyPoints, question) => {
   const response = await api.post('/quiz/grade', {
     user_answer: userAnswer,